@@ -4,6 +4,8 @@ import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from app.utils.metrics import timed
+
 
 _DB_DIR = Path(__file__).resolve().parent.parent / "db"
 _DB_DIR.mkdir(parents=True, exist_ok=True)
@@ -33,6 +35,11 @@ def get_state(conversation_id: str) -> Dict[str, Any]:
     if not conversation_id:
         return {}
 
+    with timed("memory_get"):
+        return _get_state(conversation_id)
+
+
+def _get_state(conversation_id: str) -> Dict[str, Any]:
     con = _conn()
     try:
         cur = con.execute(
@@ -51,6 +58,11 @@ def save_state(conversation_id: str, state: Dict[str, Any]) -> None:
     if not conversation_id:
         return
 
+    with timed("memory_save"):
+        _save_state(conversation_id, state)
+
+
+def _save_state(conversation_id: str, state: Dict[str, Any]) -> None:
     now = int(time.time())
     payload = json.dumps(state or {}, ensure_ascii=False)
 
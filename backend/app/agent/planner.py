@@ -6,6 +6,7 @@ from app.agent.router import (
     _looks_like_sql,
     _looks_like_web,
     _extract_expression,
+    _extract_rag_filters,
 )
 
 _MATH_PATTERN = re.compile(r"\d\s*[\+\-\*\/]\s*\d")
@@ -27,7 +28,11 @@ def make_plan(user_message: str, memory_state: Optional[Dict[str, Any]] = None)
     # 1) RAG (docs first rule)
     if _looks_like_rag(msg) or prefer_rag_first:
         plan.append("Check user documents for relevant information (docs-first preference).")
-        calls.append({"tool": "rag", "input": {"query": msg, "top_k": 4}})
+        rag_input: Dict[str, Any] = {"query": msg, "top_k": 4}
+        rag_filters = _extract_rag_filters(msg)
+        if rag_filters:
+            rag_input["filters"] = rag_filters
+        calls.append({"tool": "rag", "input": rag_input})
 
     # 2) SQL
     if _looks_like_sql(msg):
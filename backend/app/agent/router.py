@@ -74,6 +74,35 @@ _MATH_EXPR_RE = re.compile(
 )
 
 
+# /// Stage 8+: RAG metadata filters named in the message ("in resume.pdf", "pages 2-4")
+_DOC_NAME_RE = re.compile(r"\b([\w\-]+(?:\.[\w\-]+)*\.(?:pdf|txt|md))\b", re.I)
+_PAGE_RANGE_RE = re.compile(r"\bpages?\s+(\d+)(?:\s*(?:-|to|through)\s*(\d+))?", re.I)
+
+
+def _extract_rag_filters(message: str) -> dict:
+    """
+    Pull source/page filters out of a free-text question.
+    Example: 'in resume.pdf, page 2' -> {'sources': ['resume.pdf'], 'page_min': 2, 'page_max': 2}
+    """
+    text = message or ""
+    filters: dict = {}
+
+    names = []
+    for m in _DOC_NAME_RE.finditer(text):
+        if m.group(1) not in names:
+            names.append(m.group(1))
+    if names:
+        filters["sources"] = names
+
+    m = _PAGE_RANGE_RE.search(text)
+    if m:
+        lo = int(m.group(1))
+        hi = int(m.group(2)) if m.group(2) else lo
+        filters["page_min"], filters["page_max"] = min(lo, hi), max(lo, hi)
+
+    return filters
+
+
 def _extract_expression(message: str) -> str | None:
     """
     Extract ONLY the first math expression from a mixed sentence.
@@ -7,7 +7,7 @@ from app.tools.calculator import calculator_tool
 
 # Stage 4 imports (RAG)
 from app.rag.embeddings import embed_texts
-from app.rag.store import get_chroma_collection
+from app.rag.retrieval import has_filters, hydrate_passages, retrieve
 
 # Stage 5 imports (SQL)
 from app.tools.sql_tool import SQLTool
@@ -19,12 +19,18 @@ from app.tools.web_tool import WebTool
 from app.agent.planner import make_plan
 
 # Stage 8 memory
+from app.agent import working_set
 from app.agent.memory import (
     get_state,
     update_state,
     extract_preferences_from_user_message,
     update_retrieved_sources,
 )
+from app.utils import metrics
+from app.utils.admission import Overloaded, admit
+from app.utils.logger import conversation_context, event_span
+from app.utils import tracing
+from app.utils.tracing import span
 
 sql_tool = SQLTool()
 web_tool = WebTool()
@@ -53,35 +59,65 @@ def _format_citations(passages: list[dict]) -> List[str]:
     return uniq
 
 
-def _run_rag(query: str, top_k: int = 4) -> Dict[str, Any]:
-    col = get_chroma_collection()
-    q_emb = embed_texts([query])[0]
+def _run_rag(
+    query: str,
+    top_k: int = 4,
+    filters: Optional[Dict[str, Any]] = None,
+    collections: Optional[List[str]] = None,
+    conversation_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    q_emb = None
+    ws_info: Dict[str, Any] | None = None
 
-    res = col.query(
-        query_embeddings=[q_emb],
-        n_results=int(top_k),
-        include=["documents", "metadatas", "distances"],
+    # /// follow-ups: try the conversation's working set before the full index
+    if conversation_id:
+        q_emb = embed_texts([query])[0]
+        with span("rag.working_set") as sp:
+            hit = working_set.lookup(conversation_id, q_emb, top_k, collections=collections, filters=filters)
+            sp.set(size=hit["size"] if hit else 0, best_score=hit["best_score"] if hit else None)
+        if hit is None or hit["best_score"] < working_set.MIN_SCORE:
+            metrics.cache_misses.inc("working_set")
+        else:
+            metrics.cache_hits.inc("working_set")
+        if hit is not None:
+            ws_info = {
+                "hit": hit["best_score"] >= working_set.MIN_SCORE,
+                "best_score": hit["best_score"],
+                "size": hit["size"],
+            }
+            if ws_info["hit"]:
+                # /// still a RAG call: admitted, logged and counted like one served by retrieve()
+                with admit("rag"), event_span(
+                    "tool.rag", "rag", top_k=int(top_k), filtered=has_filters(filters), working_set=True
+                ) as meta:
+                    out = {"passages": hit["passages"], "candidates": None, "doc_bytes": 0, "shards": []}
+                    with span("rag.hydrate"):
+                        out["doc_bytes"] += hydrate_passages(out["passages"][:3])
+                    meta.update(matches=len(out["passages"]), shards=0, candidates=None)
+                out["working_set"] = ws_info
+                return out
+
+    # /// two-phase: ids/distances/metadata for all matches, preview text only for the ones we render
+    out = retrieve(
+        query,
+        top_k=top_k,
+        filters=filters,
+        lazy=True,
+        collections=collections,
+        query_embedding=q_emb,
+        with_embeddings=bool(conversation_id),
     )
+    with span("rag.hydrate"):
+        out["doc_bytes"] += hydrate_passages(out["passages"][:3])
 
-    docs = res.get("documents", [[]])[0]
-    metas = res.get("metadatas", [[]])[0]
-    ids = res.get("ids", [[]])[0]
-    dists = res.get("distances", [[]])[0]
-
-    passages: list[dict] = []
-    for doc, meta, cid, dist in zip(docs, metas, ids, dists):
-        passages.append(
-            {
-                "chunk_id": cid,
-                "source": (meta or {}).get("source", "unknown"),
-                "page": (meta or {}).get("page", None),
-                "distance": dist,
-                "text_preview": (doc[:220] + "...") if doc and len(doc) > 220 else doc,
-                "text": doc,
-            }
-        )
+    if conversation_id:
+        with span("rag.remember"):
+            working_set.remember(conversation_id, out["passages"])
+        for p in out["passages"]:
+            p.pop("embedding", None)
+        out["working_set"] = ws_info or {"hit": False, "best_score": None, "size": 0}
 
-    return {"passages": passages}
+    return out
 
 
 def _run_web(query: str, max_results: int = 5) -> Dict[str, Any]:
@@ -100,7 +136,7 @@ SELECT c.id, c.name, COUNT(o.id) AS total_orders
 FROM customers c
 JOIN orders o ON o.customer_id = c.id
 GROUP BY c.id, c.name
-ORDER BY total_orders DESC
+ORDER BY total_orders DESC, c.id
 LIMIT {limit}
         """.strip()
 
@@ -110,7 +146,7 @@ SELECT c.id, c.name, COALESCE(SUM(o.total_amount), 0) AS total_spent
 FROM customers c
 JOIN orders o ON o.customer_id = c.id
 GROUP BY c.id, c.name
-ORDER BY total_spent DESC
+ORDER BY total_spent DESC, c.id
 LIMIT {limit}
         """.strip()
 
@@ -119,7 +155,7 @@ LIMIT {limit}
 SELECT status, COUNT(*) AS total
 FROM tickets
 GROUP BY status
-ORDER BY total DESC
+ORDER BY total DESC, status
 LIMIT 50
         """.strip()
 
@@ -137,7 +173,16 @@ def _run_calculator(expression: str) -> Dict[str, Any]:
     return calculator_tool({"expression": expression})
 
 
-def run_agent(message: str, conversation_id: str | None = None) -> dict:
+def run_agent(message: str, conversation_id: str | None = None, collections: List[str] | None = None) -> dict:
+    # /// one "agent.run" event per request; tool events inside inherit the conversation id
+    with conversation_context(conversation_id), event_span("agent.run", chars=len(message or "")) as meta:
+        out = _run_agent(message, conversation_id, collections)
+        meta["tools"] = [t["tool"] for t in out["trace"]]
+        meta["tool_errors"] = sum(1 for t in out["trace"] if str(t.get("output_summary", "")).startswith("ERROR"))
+        return out
+
+
+def _run_agent(message: str, conversation_id: str | None, collections: List[str] | None) -> dict:
     trace: list[dict] = []
     citations: List[str] = []
     thoughtless_plan: List[str] = []
@@ -165,10 +210,19 @@ def run_agent(message: str, conversation_id: str | None = None) -> dict:
         tool = (call.get("tool") or "").strip()
         tool_input = call.get("input") or {}
 
+        extra: Dict[str, Any] = {}  # tool-specific trace fields
+        # /// one span per planned call; the tools' own spans nest under it
+        tool_span = tracing.start("agent.call", {"tool": tool})
         t0 = time.perf_counter()
         try:
             if tool == "rag":
-                out = _run_rag(tool_input.get("query", message), top_k=int(tool_input.get("top_k", 4)))
+                out = _run_rag(
+                    tool_input.get("query", message),
+                    top_k=int(tool_input.get("top_k", 4)),
+                    filters=tool_input.get("filters"),
+                    collections=collections,
+                    conversation_id=conversation_id,
+                )
                 rag_passages = out.get("passages", [])
                 rag_citations = _format_citations(rag_passages[:3])
                 citations.extend(rag_citations)
@@ -180,12 +234,23 @@ def run_agent(message: str, conversation_id: str | None = None) -> dict:
                         srcs.append(str(p.get("source", "unknown")))
                     update_retrieved_sources(conversation_id, srcs)
 
-                out_summary = f"matches={len(rag_passages)}"
+                out_summary = f"matches={len(rag_passages)} doc_bytes={out.get('doc_bytes', 0)}"
+                if out.get("candidates") is not None:
+                    out_summary += f" candidates={out['candidates']}"
+                extra["shards"] = out.get("shards", [])
+                if "working_set" in out:
+                    out_summary += " working_set=" + ("hit" if out["working_set"]["hit"] else "miss")
+                    extra["working_set"] = out["working_set"]
 
             elif tool == "sql":
                 out = _run_sql(tool_input.get("question", message))
                 sql_out = out
                 out_summary = f"row_count={out.get('row_count')}"
+                if out.get("cache"):
+                    out_summary += " cache=" + ("hit" if out["cache"]["hit"] else "miss")
+                    extra["cache"] = out["cache"]
+                if out.get("materialized"):
+                    out_summary += f" materialized={out['materialized']['table']}"
 
             elif tool == "calculator":
                 out = _run_calculator(tool_input.get("expression", ""))
@@ -201,11 +266,20 @@ def run_agent(message: str, conversation_id: str | None = None) -> dict:
                 out_summary = "skipped"
 
             elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            trace.append({"tool": tool, "input": tool_input, "output_summary": out_summary, "elapsed_ms": elapsed_ms})
+            trace.append(
+                {"tool": tool, "input": tool_input, "output_summary": out_summary, "elapsed_ms": elapsed_ms, **extra}
+            )
+            tracing.finish(tool_span)
+
+        except Overloaded as e:
+            # /// shed the whole request (429) rather than answer without the tool
+            tracing.finish(tool_span, type(e))
+            raise
 
         except Exception as e:
             elapsed_ms = int((time.perf_counter() - t0) * 1000)
             trace.append({"tool": tool, "input": tool_input, "output_summary": f"ERROR: {str(e)}", "elapsed_ms": elapsed_ms})
+            tracing.finish(tool_span, type(e))
 
     # Build final answer
     parts: List[str] = []
@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.rag.metadata_index import RagFilters
+from app.rag.store import DEFAULT_COLLECTION
+
+# /// Per-conversation cache of recently retrieved passages (ids + embeddings).
+# Follow-up questions are scored against it before touching the full index.
+MIN_SCORE = float(os.getenv("RAG_WORKING_SET_MIN_SCORE", "0.6"))
+_MAX_PASSAGES = int(os.getenv("RAG_WORKING_SET_SIZE", "20"))
+_MAX_CONVERSATIONS = int(os.getenv("RAG_WORKING_SET_CONVERSATIONS", "1000"))
+
+_sets: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _sq_l2(a: List[float], b: List[float]) -> float:
+    return sum((x - y) * (x - y) for x, y in zip(a, b))
+
+
+def _score(dist: float) -> float:
+    # /// cosine similarity for unit vectors: ||a-b||^2 = 2 - 2cos
+    return max(-1.0, min(1.0, 1.0 - dist / 2.0))
+
+
+def remember(conversation_id: str, passages: List[Dict[str, Any]]) -> None:
+    """
+    Add freshly retrieved passages (must carry "embedding") to the working set.
+    Newest first, de-duped by (collection, chunk_id), capped.
+    """
+    if not conversation_id:
+        return
+
+    fresh = [
+        {
+            "chunk_id": p["chunk_id"],
+            "collection": p.get("collection", DEFAULT_COLLECTION),
+            "source": p.get("source", "unknown"),
+            "page": p.get("page"),
+            "embedding": p["embedding"],
+        }
+        for p in passages
+        if p.get("embedding") is not None
+    ]
+    if not fresh:
+        return
+
+    with _lock:
+        old = _sets.pop(conversation_id, [])
+        keys = {(e["collection"], e["chunk_id"]) for e in fresh}
+        merged = fresh + [e for e in old if (e["collection"], e["chunk_id"]) not in keys]
+        _sets[conversation_id] = merged[:_MAX_PASSAGES]
+        while len(_sets) > _MAX_CONVERSATIONS:
+            _sets.popitem(last=False)
+
+
+def lookup(
+    conversation_id: str,
+    q_emb: List[float],
+    top_k: int,
+    collections: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Score the query against the conversation's working set.
+    Returns None when there is nothing usable (empty set, or filters we can't apply locally).
+    """
+    if not conversation_id:
+        return None
+
+    flt = RagFilters.from_dict(filters)
+    if flt.uploaded_after is not None or flt.uploaded_before is not None:
+        return None  # upload time isn't kept in the working set
+
+    with _lock:
+        entries = _sets.get(conversation_id)
+        if not entries:
+            return None
+        _sets.move_to_end(conversation_id)
+        entries = list(entries)
+
+    names = set(collections or [DEFAULT_COLLECTION])
+    scored: List[Dict[str, Any]] = []
+    for e in entries:
+        if e["collection"] not in names:
+            continue
+        if flt.sources and e["source"] not in flt.sources:
+            continue
+        if flt.page_min is not None and (e["page"] is None or e["page"] < flt.page_min):
+            continue
+        if flt.page_max is not None and (e["page"] is None or e["page"] > flt.page_max):
+            continue
+        dist = _sq_l2(q_emb, e["embedding"])
+        scored.append(
+            {
+                "chunk_id": e["chunk_id"],
+                "collection": e["collection"],
+                "source": e["source"],
+                "page": e["page"],
+                "distance": dist,
+                "text_preview": None,
+                "text": None,
+            }
+        )
+
+    if not scored:
+        return None
+
+    scored.sort(key=lambda p: p["distance"])
+    return {
+        "passages": scored[: int(top_k)],
+        "best_score": round(_score(scored[0]["distance"]), 4),
+        "size": len(entries),
+    }
+
+
+def clear(conversation_id: str | None = None) -> None:
+    with _lock:
+        if conversation_id is None:
+            _sets.clear()
+        else:
+            _sets.pop(conversation_id, None)
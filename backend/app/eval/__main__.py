@@ -0,0 +1,98 @@
+# /// python -m app.eval [--concurrency N] [--repeats R] [--executor thread|process] [--baseline PATH] [--save-baseline]
+# ///   datasets: [--cases FILE.jsonl | --synthetic N [--seed S] [--mix calculator=2,sql=1]] [--dump-cases FILE.jsonl]
+# ///   soak:     --stream reports/soak.jsonl [--fresh] [--limit N]   (JSONL results + .summary.json, resumable)
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.eval.datasets import generate_cases, load_cases_jsonl, parse_mix, write_cases_jsonl
+from app.eval.evaluator import (
+    BASELINE_PATH,
+    LATENCY_SLACK_MS,
+    MAX_ACCURACY_DROP,
+    MAX_LATENCY_REGRESSION,
+    REPORT_PATH,
+    compare_to_baseline,
+    load_report,
+    run_evaluation,
+    write_report,
+)
+from app.eval.streaming import run_evaluation_stream, summary_path
+from app.eval.test_cases import TEST_CASES
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.eval", description="Run the agent eval suite.")
+    ap.add_argument("--concurrency", type=int, default=1)
+    ap.add_argument("--repeats", type=int, default=1)
+    ap.add_argument("--executor", choices=["thread", "process"], default="thread")
+    ap.add_argument("--out", default=str(REPORT_PATH))
+    ap.add_argument("--baseline", default=None, help=f"compare against this report if it exists (default {BASELINE_PATH}; streaming: none)")
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    ap.add_argument("--max-latency-regression", type=float, default=MAX_LATENCY_REGRESSION)
+    ap.add_argument("--latency-slack-ms", type=float, default=LATENCY_SLACK_MS)
+    ap.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP)
+    ap.add_argument("--cases", help="JSONL case file (default: built-in TEST_CASES)")
+    ap.add_argument("--synthetic", type=int, default=0, help="generate N cases from templates instead")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--mix", help="tool weights for --synthetic, e.g. calculator=2,sql=1,rag=1,web=1")
+    ap.add_argument("--dump-cases", help="write the selected cases to this JSONL file and exit")
+    ap.add_argument("--stream", help="append results to this JSONL report (constant memory, resumable)")
+    ap.add_argument("--fresh", action="store_true", help="with --stream: discard an existing report instead of resuming")
+    ap.add_argument("--limit", type=int, default=None, help="with --stream: stop after N new results")
+    args = ap.parse_args(argv)
+
+    def cases():
+        if args.synthetic:
+            return generate_cases(args.synthetic, seed=args.seed, mix=parse_mix(args.mix))
+        if args.cases:
+            return load_cases_jsonl(Path(args.cases))
+        return iter(TEST_CASES)
+
+    if args.dump_cases:
+        n = write_cases_jsonl(cases(), Path(args.dump_cases))
+        print(json.dumps({"cases": n, "path": args.dump_cases}))
+        return 0
+
+    if args.stream:
+        report = run_evaluation_stream(
+            cases(),
+            Path(args.stream),
+            concurrency=args.concurrency,
+            executor=args.executor,
+            resume=not args.fresh,
+            limit=args.limit,
+        )
+        out = summary_path(Path(args.stream))
+    else:
+        report = run_evaluation(
+            cases=list(cases()), concurrency=args.concurrency, repeats=args.repeats, executor=args.executor
+        )
+        out = Path(args.out)
+
+    baseline_path = args.baseline or (None if args.stream else BASELINE_PATH)
+    baseline = load_report(baseline_path) if baseline_path else None
+    if baseline is not None and not args.save_baseline:
+        report["gate"] = compare_to_baseline(
+            report,
+            baseline,
+            max_latency_regression=args.max_latency_regression,
+            latency_slack_ms=args.latency_slack_ms,
+            max_accuracy_drop=args.max_accuracy_drop,
+        )
+
+    write_report(report, out)
+    if args.save_baseline:
+        write_report(report, baseline_path or BASELINE_PATH)
+
+    summary = {k: report[k] for k in ("total", "passed", "accuracy", "runs", "ran", "resumed_from", "wall_ms") if k in report}
+    summary["latency_p95"] = {n: s["p95"] for n, s in report["latency"]["cases"].items()}
+    if "gate" in report:
+        summary["gate"] = report["gate"]
+    print(json.dumps(summary, indent=2))
+    return 0 if report.get("gate", {"ok": True})["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# /// Eval datasets: JSONL case files and a seeded synthetic generator (both lazy iterators)
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+TOOLS = ("calculator", "sql", "rag", "web")
+
+# /// phrasing stays clear of other tools' router hints where it can ("top"/"total" are SQL, "policy" is RAG);
+# /// "summary"/"resume" contain "sum", so those RAG cases also plan a SQL call, like rag_docs_question
+_CALC_TEMPLATES = [
+    "calculate {a}*{b}",
+    "calculate {a} + {b} * {c}",
+    "what is ({a} + {b}) * {c}",
+    "solve {a} - {b} / {c}",
+    "evaluate {a}.5 * {b}",
+    "please compute ({a} - {b}) * ({c} + {a})",
+]
+_SQL_TEMPLATES = [
+    "Show top {k} customers by total orders",
+    "Which customers have the most orders? top {k}",
+    "Top {k} customers by total spent",
+    "List the top {k} customers by revenue",
+    "Count tickets by status",
+    "How many open tickets are there per status?",
+]
+_RAG_TEMPLATES = [
+    "According to my documents, what is my {topic}?",
+    "What does my document say about {topic}?",
+    "In my docs, find the {topic}",
+    "According to the resume, describe the {topic}",
+]
+_RAG_TOPICS = ["professional summary", "work experience", "skills", "education", "projects", "certifications"]
+_WEB_TEMPLATES = [
+    "latest news about {topic}",
+    "recent developments in {topic}",
+    "what's new with {topic} today",
+    "search web: {topic} release notes",
+]
+_WEB_TOPICS = ["OpenAI", "Python", "FastAPI", "vector search", "Django", "LLM agents", "Rust", "Kubernetes"]
+
+
+def _case(name: str, message: str, tool: str) -> Dict[str, Any]:
+    expect: Dict[str, Any] = {"tool": tool}
+    if tool == "rag":
+        expect["citations_required"] = True
+    else:
+        expect["has_answer"] = True
+    return {"name": name, "group": tool, "message": message, "expect": expect}
+
+
+def generate_cases(
+    n: int,
+    seed: int = 0,
+    mix: Optional[Dict[str, float]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield `n` varied cases drawn from per-tool templates. Same seed -> same sequence,
+    so a resumed run sees exactly the cases it saw before.
+    """
+    rng = random.Random(seed)
+    mix = mix or {t: 1.0 for t in TOOLS}
+    tools = [t for t in TOOLS if mix.get(t, 0) > 0]
+    weights = [mix[t] for t in tools]
+
+    for i in range(n):
+        tool = rng.choices(tools, weights)[0]
+        if tool == "calculator":
+            msg = rng.choice(_CALC_TEMPLATES).format(
+                a=rng.randint(1, 999), b=rng.randint(1, 999), c=rng.randint(1, 99)
+            )
+        elif tool == "sql":
+            msg = rng.choice(_SQL_TEMPLATES).format(k=rng.randint(1, 10))
+        elif tool == "rag":
+            msg = rng.choice(_RAG_TEMPLATES).format(topic=rng.choice(_RAG_TOPICS))
+        else:
+            msg = rng.choice(_WEB_TEMPLATES).format(topic=rng.choice(_WEB_TOPICS))
+        yield _case(f"{tool}-{seed}-{i:07d}", msg, tool)
+
+
+def _validate(case: Any, where: str) -> Dict[str, Any]:
+    if not isinstance(case, dict):
+        raise ValueError(f"{where}: expected a JSON object")
+    for key in ("name", "message"):
+        if not isinstance(case.get(key), str) or not case[key].strip():
+            raise ValueError(f"{where}: '{key}' must be a non-empty string")
+    expect = case.get("expect")
+    if not isinstance(expect, dict) or expect.get("tool") not in TOOLS:
+        raise ValueError(f"{where}: 'expect.tool' must be one of {', '.join(TOOLS)}")
+    case.setdefault("group", expect["tool"])
+    return case
+
+
+def load_cases_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream cases from a JSONL file (one case per line; blank lines and '#' comments skipped).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON ({e.msg})") from None
+            yield _validate(obj, f"{path}:{lineno}")
+
+
+def write_cases_jsonl(cases: Iterable[Dict[str, Any]], path: Path) -> int:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for case in cases:
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def parse_mix(spec: Optional[str]) -> Optional[Dict[str, float]]:
+    """
+    "calculator=2,sql=1,rag=1,web=0" -> weights; None/empty -> uniform.
+    """
+    if not spec:
+        return None
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        tool, _, w = part.partition("=")
+        tool = tool.strip()
+        if tool not in TOOLS:
+            raise ValueError(f"unknown tool in mix: {tool}")
+        mix[tool] = float(w or 1)
+    return mix
+
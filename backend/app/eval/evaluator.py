@@ -1,9 +1,23 @@
+import json
+import math
+import os
 import time
-from typing import Dict, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 
 from app.agent.runner import run_agent
 from app.eval.test_cases import TEST_CASES
 
+REPORTS_DIR = Path("reports")
+REPORT_PATH = REPORTS_DIR / "eval.json"
+BASELINE_PATH = REPORTS_DIR / "eval_baseline.json"
+
+# /// regression gate: p95 may grow by this fraction (and by at least the absolute slack) before failing
+MAX_LATENCY_REGRESSION = float(os.getenv("EVAL_MAX_LATENCY_REGRESSION", "0.25"))
+LATENCY_SLACK_MS = float(os.getenv("EVAL_LATENCY_SLACK_MS", "5"))
+MAX_ACCURACY_DROP = float(os.getenv("EVAL_MAX_ACCURACY_DROP", "0.0"))
+
 
 def _rag_has_matches(response: Dict[str, Any]) -> bool:
     """
@@ -14,57 +28,217 @@ def _rag_has_matches(response: Dict[str, Any]) -> bool:
     for t in traces:
         if t.get("tool") == "rag":
             summary = str(t.get("output_summary", ""))
-            # output_summary looks like: "matches=2"
+            # output_summary looks like: "matches=2" (optionally followed by more key=value pairs)
             if "matches=" in summary:
                 try:
-                    n = int(summary.split("matches=")[-1].strip())
+                    n = int(summary.split("matches=")[-1].split()[0])
                     return n > 0
                 except Exception:
                     return False
     return False
 
 
-def run_evaluation() -> Dict[str, Any]:
-    results = []
-    passed = 0
+def _percentile(values: List[float], q: float) -> float:
+    """
+    Linear interpolation between closest ranks (numpy's default method).
+    """
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    pos = (len(xs) - 1) * q / 100
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
 
-    for case in TEST_CASES:
-        start = time.time()
-        response = run_agent(
-            message=case["message"],
-            conversation_id=f"eval-{case['name']}",
-        )
-        latency_ms = int((time.time() - start) * 1000)
 
-        tools_used = [t.get("tool") for t in response.get("trace", [])]
-        expect_tool = case["expect"].get("tool")
+def _latency_stats(values: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "p50": round(_percentile(values, 50), 3),
+        "p95": round(_percentile(values, 95), 3),
+        "p99": round(_percentile(values, 99), 3),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "max": round(max(values), 3) if values else 0.0,
+    }
+
+
+def _check_case(case: Dict[str, Any], response: Dict[str, Any]) -> bool:
+    tools_used = [t.get("tool") for t in response.get("trace", [])]
+    ok = case["expect"].get("tool") in tools_used
+
+    # /// Stage 9: citations required ONLY if RAG actually retrieved matches
+    if case["expect"].get("citations_required"):
+        if _rag_has_matches(response):
+            ok = ok and bool(response.get("citations"))
+        else:
+            # No matches -> don't fail (index/model availability issue)
+            ok = ok and True
+    return ok
+
+
+def run_case(case: Dict[str, Any], repeat: int = 0, repeats: int = 1) -> Dict[str, Any]:
+    """
+    One timed run of one case. Top-level so process pools can pickle it.
+    """
+    conversation_id = f"eval-{case['name']}" if repeats == 1 else f"eval-{case['name']}-{repeat}"
+    start = time.perf_counter()
+    try:
+        response = run_agent(message=case["message"], conversation_id=conversation_id)
+        error = None
+    except Exception as e:
+        response, error = {}, f"{type(e).__name__}: {e}"
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    trace = response.get("trace", [])
+    tool_ms: Dict[str, float] = {}
+    for t in trace:
+        tool = t.get("tool") or "unknown"
+        tool_ms[tool] = tool_ms.get(tool, 0.0) + float(t.get("elapsed_ms") or 0)
+
+    out = {
+        "test": case["name"],
+        "repeat": repeat,
+        "expected_tool": case["expect"].get("tool"),
+        "tools_used": [t.get("tool") for t in trace],
+        "latency_ms": round(latency_ms, 3),
+        "tool_ms": tool_ms,
+        "pass": error is None and _check_case(case, response),
+    }
+    if error:
+        out["error"] = error
+    return out
+
 
-        ok = expect_tool in tools_used
+def run_evaluation(
+    cases: Optional[List[Dict[str, Any]]] = None,
+    concurrency: int = 1,
+    repeats: int = 1,
+    executor: str = "thread",
+) -> Dict[str, Any]:
+    """
+    Run every case `repeats` times on a thread or process pool and aggregate
+    pass rates and p50/p95/p99 latency per case and per tool (from the trace).
+    """
+    cases = cases if cases is not None else TEST_CASES
+    repeats = max(1, int(repeats))
+    jobs = [(case, r) for r in range(repeats) for case in cases]
+
+    t0 = time.perf_counter()
+    if concurrency <= 1:
+        runs = [run_case(case, r, repeats) for case, r in jobs]
+    else:
+        pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        with pool_cls(max_workers=concurrency) as pool:
+            futures = [pool.submit(run_case, case, r, repeats) for case, r in jobs]
+            runs = [f.result() for f in futures]
+    wall_ms = (time.perf_counter() - t0) * 1000
 
-        # /// Stage 9: citations required ONLY if RAG actually retrieved matches
-        if case["expect"].get("citations_required"):
-            if _rag_has_matches(response):
-                ok = ok and bool(response.get("citations"))
-            else:
-                # No matches -> don't fail (index/model availability issue)
-                ok = ok and True
+    by_case: Dict[str, List[Dict[str, Any]]] = {}
+    tool_samples: Dict[str, List[float]] = {}
+    for run in runs:
+        by_case.setdefault(run["test"], []).append(run)
+        for tool, ms in run["tool_ms"].items():
+            tool_samples.setdefault(tool, []).append(ms)
 
+    results = []
+    passed = 0
+    for case in cases:
+        case_runs = by_case.get(case["name"], [])
+        ok_runs = sum(1 for r in case_runs if r["pass"])
+        ok = bool(case_runs) and ok_runs == len(case_runs)
         if ok:
             passed += 1
-
+        stats = _latency_stats([r["latency_ms"] for r in case_runs])
         results.append(
             {
                 "test": case["name"],
-                "expected_tool": expect_tool,
-                "tools_used": tools_used,
-                "latency_ms": latency_ms,
+                "expected_tool": case["expect"].get("tool"),
+                "tools_used": case_runs[0]["tools_used"] if case_runs else [],
+                "latency_ms": stats["p50"],
                 "pass": ok,
+                "pass_rate": round(ok_runs / len(case_runs), 4) if case_runs else 0.0,
+                "latency": stats,
+                "errors": [r["error"] for r in case_runs if r.get("error")][:3],
             }
         )
 
+    total = len(cases)
     return {
-        "total": len(TEST_CASES),
+        "total": total,
         "passed": passed,
-        "accuracy": round(passed / len(TEST_CASES), 2),
+        "accuracy": round(passed / total, 2) if total else 0.0,
         "results": results,
+        "config": {"concurrency": concurrency, "repeats": repeats, "executor": executor},
+        "runs": len(runs),
+        "wall_ms": round(wall_ms, 3),
+        "throughput_rps": round(len(runs) / (wall_ms / 1000), 3) if wall_ms else 0.0,
+        "latency": {
+            "overall": _latency_stats([r["latency_ms"] for r in runs]),
+            "cases": {name: _latency_stats([r["latency_ms"] for r in rs]) for name, rs in by_case.items()},
+            "tools": {tool: _latency_stats(ms) for tool, ms in sorted(tool_samples.items())},
+        },
+    }
+
+
+def compare_to_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    max_latency_regression: float = MAX_LATENCY_REGRESSION,
+    latency_slack_ms: float = LATENCY_SLACK_MS,
+    max_accuracy_drop: float = MAX_ACCURACY_DROP,
+) -> Dict[str, Any]:
+    """
+    Regressions = accuracy drop beyond max_accuracy_drop, a case that passed in
+    the baseline and now fails, or a case/tool p95 above
+    baseline * (1 + max_latency_regression) + latency_slack_ms.
+    """
+    regressions: List[Dict[str, Any]] = []
+
+    drop = float(baseline.get("accuracy", 0)) - float(report.get("accuracy", 0))
+    if drop > max_accuracy_drop:
+        regressions.append({"kind": "accuracy", "baseline": baseline.get("accuracy"), "current": report.get("accuracy")})
+
+    base_pass = {r["test"]: r.get("pass") for r in baseline.get("results", [])}
+    for r in report.get("results", []):
+        if base_pass.get(r["test"]) and not r.get("pass"):
+            regressions.append({"kind": "case_failed", "name": r["test"]})
+
+    for scope in ("cases", "tools"):
+        base = (baseline.get("latency") or {}).get(scope, {})
+        for name, cur in (report.get("latency") or {}).get(scope, {}).items():
+            if name not in base:
+                continue
+            limit = base[name]["p95"] * (1 + max_latency_regression) + latency_slack_ms
+            if cur["p95"] > limit:
+                regressions.append({
+                    "kind": f"{scope[:-1]}_latency",
+                    "name": name,
+                    "baseline_p95": base[name]["p95"],
+                    "current_p95": cur["p95"],
+                    "limit_ms": round(limit, 3),
+                })
+
+    return {
+        "ok": not regressions,
+        "regressions": regressions,
+        "thresholds": {
+            "max_latency_regression": max_latency_regression,
+            "latency_slack_ms": latency_slack_ms,
+            "max_accuracy_drop": max_accuracy_drop,
+        },
     }
+
+
+def write_report(report: Dict[str, Any], path: Path = REPORT_PATH) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_report(path: Path = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,232 @@
+# /// Streaming eval: results appended to JSONL as they finish, summary kept in fixed-size histograms, resumable
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from app.eval.evaluator import run_case
+
+# /// bucket i covers [MIN_MS * GROWTH**i, MIN_MS * GROWTH**(i+1)): ~2.5% relative error, <500 buckets up to hours
+HIST_MIN_MS = 0.001
+HIST_GROWTH = 1.05
+SUMMARY_EVERY = int(os.getenv("EVAL_SUMMARY_EVERY", "100"))
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram: O(1) add, memory bounded by the value range
+    (not the sample count), quantiles within half a bucket of the true value.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.n = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        ms = max(float(ms), 0.0)
+        i = int(math.log(ms / HIST_MIN_MS) / math.log(HIST_GROWTH)) if ms > HIST_MIN_MS else 0
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+        self.n += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        if not self.n:
+            return 0.0
+        rank = q / 100 * (self.n - 1)
+        seen = 0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen > rank:
+                mid = HIST_MIN_MS * HIST_GROWTH ** (i + 0.5)
+                return min(max(mid, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "n": self.n,
+            "p50": round(self.quantile(50), 3),
+            "p95": round(self.quantile(95), 3),
+            "p99": round(self.quantile(99), 3),
+            "mean": round(self.total / self.n, 3) if self.n else 0.0,
+            "max": round(self.max, 3),
+        }
+
+
+class StreamSummary:
+    """
+    Running aggregate over result records. Groups (default: expected tool) stand in for
+    per-case stats, which do not stay bounded once there are thousands of distinct cases.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.passed = 0
+        self.errors = 0
+        self.overall = LatencyHistogram()
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.tools: Dict[str, LatencyHistogram] = {}
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        self.total += 1
+        self.passed += bool(rec.get("pass"))
+        self.errors += "error" in rec
+        self.overall.add(rec["latency_ms"])
+        g = self.groups.get(rec.get("group") or "default")
+        if g is None:
+            g = self.groups[rec.get("group") or "default"] = {"n": 0, "passed": 0, "hist": LatencyHistogram()}
+        g["n"] += 1
+        g["passed"] += bool(rec.get("pass"))
+        g["hist"].add(rec["latency_ms"])
+        for tool, ms in (rec.get("tool_ms") or {}).items():
+            self.tools.setdefault(tool, LatencyHistogram()).add(ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # /// same top-level shape as run_evaluation(), so compare_to_baseline() works on either
+        return {
+            "total": self.total,
+            "passed": self.passed,
+            "accuracy": round(self.passed / self.total, 4) if self.total else 0.0,
+            "errors": self.errors,
+            "groups": {
+                name: {"n": g["n"], "passed": g["passed"], "pass_rate": round(g["passed"] / g["n"], 4)}
+                for name, g in sorted(self.groups.items())
+            },
+            "latency": {
+                "overall": self.overall.to_dict(),
+                "cases": {name: g["hist"].to_dict() for name, g in sorted(self.groups.items())},
+                "tools": {name: h.to_dict() for name, h in sorted(self.tools.items())},
+            },
+        }
+
+
+def summary_path(out_path: Path) -> Path:
+    out_path = Path(out_path)
+    return out_path.with_name(out_path.name + ".summary.json")
+
+
+def _write_summary(path: Path, summary: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _replay(out_path: Path, summary: StreamSummary) -> Iterator[Dict[str, Any]]:
+    """
+    Re-read a previous (possibly interrupted) report into `summary`, one record at a time.
+    A torn last line is truncated away so appends continue from a clean record boundary.
+    """
+    good = 0
+    with open(out_path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                rec = json.loads(raw)
+            except json.JSONDecodeError:
+                break
+            good += len(raw)
+            summary.add(rec)
+            yield rec
+    if good != out_path.stat().st_size:
+        with open(out_path, "r+b") as f:
+            f.truncate(good)
+
+
+def run_evaluation_stream(
+    cases: Iterable[Dict[str, Any]],
+    out_path: Path,
+    concurrency: int = 1,
+    executor: str = "thread",
+    resume: bool = True,
+    summary_every: int = SUMMARY_EVERY,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Run cases lazily and append one JSON line per result to `out_path`, in case order.
+    At most 2 * concurrency cases are in flight, so memory stays flat however long the
+    case stream is. With resume=True an existing report is replayed into the summary and
+    the cases it already covers are skipped (their names must match, in order).
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    summary = StreamSummary()
+    cases = iter(cases)
+
+    skipped = 0
+    if resume and out_path.exists():
+        for rec in _replay(out_path, summary):
+            case = next(cases, None)
+            if case is None or case["name"] != rec.get("test"):
+                raise ValueError(
+                    f"{out_path}: record {skipped} is '{rec.get('test')}' but the case stream has "
+                    f"'{case['name'] if case else None}'; use a fresh report for a different dataset"
+                )
+            skipped += 1
+    elif out_path.exists():
+        out_path.unlink()
+
+    spath = summary_path(out_path)
+    config = {"concurrency": concurrency, "executor": executor, "report": str(out_path)}
+    t0 = time.perf_counter()
+    ran = 0
+
+    def snapshot() -> Dict[str, Any]:
+        wall_s = time.perf_counter() - t0
+        return {
+            **summary.to_dict(),
+            "config": config,
+            "resumed_from": skipped,
+            "ran": ran,
+            "wall_ms": round(wall_s * 1000, 3),
+            "throughput_rps": round(ran / wall_s, 3) if wall_s else 0.0,
+        }
+
+    def record(f, i: int, case: Dict[str, Any], rec: Dict[str, Any]) -> None:
+        nonlocal ran
+        rec = {"i": i, "group": case.get("group") or case["expect"].get("tool"), **rec}
+        rec.pop("repeat", None)
+        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.flush()
+        summary.add(rec)
+        ran += 1
+        if summary_every and ran % summary_every == 0:
+            _write_summary(spath, snapshot())
+
+    window = max(1, concurrency) * 2
+    with open(out_path, "a", encoding="utf-8") as f:
+        if concurrency <= 1:
+            for i, case in enumerate(cases, skipped):
+                if limit is not None and ran >= limit:
+                    break
+                record(f, i, case, run_case(case))
+        else:
+            pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+            with pool_cls(max_workers=concurrency) as pool:
+                inflight: deque = deque()
+                submitted = 0
+                for i, case in enumerate(cases, skipped):
+                    if limit is not None and submitted >= limit:
+                        break
+                    inflight.append((i, case, pool.submit(run_case, case)))
+                    submitted += 1
+                    # /// write in submission order: the report is always a clean prefix of the case stream
+                    while len(inflight) >= window or (inflight and inflight[0][2].done()):
+                        j, c, fut = inflight.popleft()
+                        record(f, j, c, fut.result())
+                while inflight:
+                    j, c, fut = inflight.popleft()
+                    record(f, j, c, fut.result())
+
+    final = snapshot()
+    _write_summary(spath, final)
+    return final
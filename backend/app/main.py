@@ -1,9 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from app.routes.health import router as health_router
 from app.routes.agent import router as agent_router
 from app.routes.rag import router as rag_router
 from app.routes import sql as sql_routes 
 from app.routes import eval as eval_route
+from app.routes import tools as tools_routes
+from app.routes import metrics as metrics_routes
+from app.utils.admission import AdmissionMiddleware, Overloaded, overloaded_response
+
+
+async def _overloaded(request: Request, exc: Overloaded):
+    # /// a tool bulkhead was full mid-request
+    return overloaded_response(exc)
 
 
 def create_app() -> FastAPI:
@@ -14,6 +22,12 @@ def create_app() -> FastAPI:
     app.include_router(rag_router, tags=["rag"])
     app.include_router(sql_routes.router)  
     app.include_router(eval_route.router)
+    app.include_router(tools_routes.router)
+    app.include_router(metrics_routes.router)
+    # /// last added = outermost: metrics also see requests that admission turns away
+    app.add_middleware(AdmissionMiddleware)
+    app.add_middleware(metrics_routes.MetricsMiddleware)
+    app.add_exception_handler(Overloaded, _overloaded)
  
 
     return app
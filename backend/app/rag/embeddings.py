@@ -1,7 +1,11 @@
 import os
 import math
 import hashlib
-from typing import List, Optional
+import time
+from typing import Any, Dict, List, Optional
+
+from app.utils import metrics
+from app.utils.tracing import span
 
 # /// Make HuggingFace more tolerant on slow networks (applies before imports use it)
 os.environ.setdefault("HF_HUB_DISABLE_TELEMETRY", "1")
@@ -22,6 +26,10 @@ _BACKEND = os.getenv("EMBED_BACKEND", "hf").strip().lower()  # hf | hash
 _LOCAL_ONLY = os.getenv("EMBED_LOCAL_ONLY", "0") == "1"
 
 
+_batch_size = metrics.registry.histogram(
+    "embed_batch_size", "Texts per embed_texts() call.", ("backend",), buckets=metrics.SIZE_BUCKETS
+)
+
 _st_model = None
 
 
@@ -69,6 +77,24 @@ def _load_sentence_transformer() -> Optional[object]:
         return None
 
 
+def preload() -> Dict[str, Any]:
+    """
+    Load the model now instead of on the first request (see app.serve: done once in the
+    parent before forking, so workers share the weights copy-on-write).
+    Only loads; running encode() here would start torch/OpenMP thread pools that do not
+    survive fork().
+    """
+    if _BACKEND == "hash":
+        return {"backend": "hash", "loaded": False, "load_s": 0.0}
+    t0 = time.perf_counter()
+    model = _load_sentence_transformer()
+    return {
+        "backend": "hf" if model is not None else "hash (hf unavailable)",
+        "loaded": model is not None,
+        "load_s": round(time.perf_counter() - t0, 3),
+    }
+
+
 def embed_texts(texts: List[str]) -> List[List[float]]:
     """
     Returns embeddings for a list of texts.
@@ -76,17 +102,29 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
     Fallback: deterministic hash vectors (offline)
     """
     texts = texts or []
+    with metrics.timed("embed"):
+        return _embed(texts)
 
+
+def _embed(texts: List[str]) -> List[List[float]]:
     # /// If forced hash backend
     if _BACKEND == "hash":
-        return [_hash_embed(t) for t in texts]
+        _batch_size.observe(len(texts), "hash")
+        with span("embed.hash", texts=len(texts)):
+            return [_hash_embed(t) for t in texts]
 
     # /// Try HF backend
-    model = _load_sentence_transformer()
+    with span("embed.load_model"):
+        model = _load_sentence_transformer()
     if model is None:
         # /// fallback if HF blocked
-        return [_hash_embed(t) for t in texts]
+        _batch_size.observe(len(texts), "hash")
+        with span("embed.hash", texts=len(texts)):
+            return [_hash_embed(t) for t in texts]
 
+    _batch_size.observe(len(texts), "hf")
     # SentenceTransformer returns numpy arrays -> convert to list for JSON friendliness
-    vecs = model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
-    return [v.tolist() for v in vecs]
+    with span("embed.encode", texts=len(texts)):
+        vecs = model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+    with span("embed.tolist"):
+        return [v.tolist() for v in vecs]
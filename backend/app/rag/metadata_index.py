@@ -0,0 +1,183 @@
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+_DB_DIR = Path(__file__).resolve().parent.parent / "db"
+_DB_DIR.mkdir(parents=True, exist_ok=True)
+
+_META_DB = _DB_DIR / "rag_metadata.sqlite"
+
+# /// collections already checked for a backfill in this process
+_backfilled: set[str] = set()
+
+
+@dataclass
+class RagFilters:
+    """
+    Metadata filters applied before similarity search.
+    All fields are optional; an empty filter means "search everything".
+    """
+    sources: List[str] = field(default_factory=list)
+    page_min: Optional[int] = None
+    page_max: Optional[int] = None
+    uploaded_after: Optional[int] = None   # epoch seconds, inclusive
+    uploaded_before: Optional[int] = None  # epoch seconds, inclusive
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "RagFilters":
+        data = data or {}
+        sources = data.get("sources") or []
+        if data.get("source"):
+            sources = [data["source"], *sources]
+        return cls(
+            sources=[str(s).strip() for s in sources if str(s).strip()],
+            page_min=data.get("page_min"),
+            page_max=data.get("page_max"),
+            uploaded_after=data.get("uploaded_after"),
+            uploaded_before=data.get("uploaded_before"),
+        )
+
+    def is_empty(self) -> bool:
+        return not self.sources and all(
+            v is None for v in (self.page_min, self.page_max, self.uploaded_after, self.uploaded_before)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        if self.sources:
+            out["sources"] = list(self.sources)
+        for k in ("page_min", "page_max", "uploaded_after", "uploaded_before"):
+            v = getattr(self, k)
+            if v is not None:
+                out[k] = v
+        return out
+
+    def to_where(self) -> Optional[Dict[str, Any]]:
+        """
+        Same filter expressed as a Chroma `where` clause (used for large slices).
+        """
+        clauses: List[Dict[str, Any]] = []
+        if self.sources:
+            clauses.append({"source": {"$in": list(self.sources)}})
+        if self.page_min is not None:
+            clauses.append({"page": {"$gte": int(self.page_min)}})
+        if self.page_max is not None:
+            clauses.append({"page": {"$lte": int(self.page_max)}})
+        if self.uploaded_after is not None:
+            clauses.append({"uploaded_at": {"$gte": int(self.uploaded_after)}})
+        if self.uploaded_before is not None:
+            clauses.append({"uploaded_at": {"$lte": int(self.uploaded_before)}})
+
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+
+def _conn() -> sqlite3.Connection:
+    con = sqlite3.connect(str(_META_DB))
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chunks (
+            chunk_id TEXT NOT NULL,
+            collection TEXT NOT NULL,
+            source TEXT NOT NULL,
+            page INTEGER,
+            uploaded_at INTEGER,
+            PRIMARY KEY (collection, chunk_id)
+        )
+        """
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (collection, source, page)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_chunks_uploaded ON chunks (collection, uploaded_at)")
+    con.commit()
+    return con
+
+
+def record_chunks(ids: List[str], metas: List[Dict[str, Any]], collection: str = "docs") -> None:
+    """
+    Called at ingest time, next to the Chroma upsert.
+    """
+    rows = [
+        (
+            cid,
+            collection,
+            str((m or {}).get("source", "unknown")),
+            (m or {}).get("page"),
+            (m or {}).get("uploaded_at"),
+        )
+        for cid, m in zip(ids, metas)
+    ]
+    if not rows:
+        return
+
+    con = _conn()
+    try:
+        con.executemany(
+            """
+            INSERT INTO chunks (chunk_id, collection, source, page, uploaded_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(collection, chunk_id) DO UPDATE SET
+              source = excluded.source,
+              page = excluded.page,
+              uploaded_at = excluded.uploaded_at
+            """,
+            rows,
+        )
+        con.commit()
+    finally:
+        con.close()
+
+
+def ensure_backfilled(col, collection: str = "docs") -> None:
+    """
+    Chunks indexed before the metadata index existed are only in Chroma.
+    Copy their metadata over once per process if our side is empty.
+    """
+    if collection in _backfilled:
+        return
+
+    con = _conn()
+    try:
+        have = con.execute("SELECT COUNT(*) FROM chunks WHERE collection = ?", (collection,)).fetchone()[0]
+    finally:
+        con.close()
+
+    if not have and col.count():
+        res = col.get(include=["metadatas"])
+        record_chunks(res.get("ids", []), res.get("metadatas", []) or [], collection=collection)
+
+    _backfilled.add(collection)
+
+
+def candidate_ids(filters: RagFilters, collection: str = "docs") -> List[str]:
+    """
+    Resolve filters to the chunk ids that may be searched.
+    """
+    sql = ["SELECT chunk_id FROM chunks WHERE collection = ?"]
+    params: List[Any] = [collection]
+
+    if filters.sources:
+        sql.append(f"AND source IN ({', '.join('?' for _ in filters.sources)})")
+        params.extend(filters.sources)
+    if filters.page_min is not None:
+        sql.append("AND page >= ?")
+        params.append(int(filters.page_min))
+    if filters.page_max is not None:
+        sql.append("AND page <= ?")
+        params.append(int(filters.page_max))
+    if filters.uploaded_after is not None:
+        sql.append("AND uploaded_at >= ?")
+        params.append(int(filters.uploaded_after))
+    if filters.uploaded_before is not None:
+        sql.append("AND uploaded_at <= ?")
+        params.append(int(filters.uploaded_before))
+
+    con = _conn()
+    try:
+        return [r[0] for r in con.execute(" ".join(sql), params).fetchall()]
+    finally:
+        con.close()
@@ -0,0 +1,315 @@
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+from app.rag.embeddings import embed_texts
+from app.rag.metadata_index import RagFilters, candidate_ids, ensure_backfilled
+from app.rag.store import DEFAULT_COLLECTION, get_chroma_collection
+from app.utils.admission import admit
+from app.utils.logger import event_span
+from app.utils.metrics import timed
+from app.utils.tracing import propagate, span
+
+# /// Filtered slices up to this size are scored exactly over just their own embeddings.
+# Bigger slices go to Chroma with an equivalent `where` pre-filter.
+_EXACT_SCAN_MAX = 2000
+
+# /// shared pool for fanning a query out over several collections (shards)
+_SHARD_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-shard")
+
+
+def _preview(doc: str | None) -> str | None:
+    return (doc[:220] + "...") if doc and len(doc) > 220 else doc
+
+
+def _include(lazy: bool, with_embeddings: bool = False) -> List[str]:
+    # /// phase 1 of two-phase retrieval skips document text entirely
+    include = ["metadatas", "distances"] if lazy else ["documents", "metadatas", "distances"]
+    if with_embeddings:
+        include.append("embeddings")
+    return include
+
+
+def _doc_bytes(docs) -> int:
+    return sum(len(d.encode("utf-8")) for d in (docs or []) if d)
+
+
+def _to_passages(ids, docs, metas, dists, collection: str = DEFAULT_COLLECTION, embs=None) -> List[Dict[str, Any]]:
+    passages: List[Dict[str, Any]] = []
+    docs = docs if docs is not None else [None] * len(ids)
+    for i, (doc, meta, cid, dist) in enumerate(zip(docs, metas, ids, dists)):
+        p = {
+            "chunk_id": cid,
+            "collection": collection,
+            "source": (meta or {}).get("source", "unknown"),
+            "page": (meta or {}).get("page", None),
+            "distance": dist,
+            "text_preview": _preview(doc),
+            "text": doc,
+        }
+        if embs is not None:
+            p["embedding"] = [float(x) for x in embs[i]]
+        passages.append(p)
+    return passages
+
+
+def _exact_scan(
+    col,
+    q_emb: List[float],
+    ids: List[str],
+    top_k: int,
+    lazy: bool = False,
+    collection: str = DEFAULT_COLLECTION,
+    with_embeddings: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Brute-force squared L2 (Chroma's default space) over a small candidate slice.
+    """
+    import numpy as np
+
+    include = ["embeddings", "metadatas"] if lazy else ["embeddings", "documents", "metadatas"]
+    with timed("chroma_get"):
+        res = col.get(ids=ids, include=include)
+    embs = res.get("embeddings")
+    if embs is None or len(embs) == 0:
+        return []
+
+    mat = np.asarray(embs, dtype=np.float32)
+    q = np.asarray(q_emb, dtype=np.float32)
+    dists = ((mat - q) ** 2).sum(axis=1)
+
+    k = min(int(top_k), len(dists))
+    order = np.argsort(dists, kind="stable")[:k]
+
+    got_ids = res.get("ids", [])
+    docs = res.get("documents") or [None] * len(got_ids)
+    metas = res.get("metadatas") or [None] * len(got_ids)
+    return _to_passages(
+        [got_ids[i] for i in order],
+        [docs[i] for i in order],
+        [metas[i] for i in order],
+        [float(dists[i]) for i in order],
+        collection=collection,
+        embs=[mat[i] for i in order] if with_embeddings else None,
+    )
+
+
+def _collection_names(collections: Optional[List[str]]) -> List[str]:
+    names: List[str] = []
+    for c in collections or [DEFAULT_COLLECTION]:
+        if c not in names:
+            names.append(c)
+    return names
+
+
+def _search_shard(
+    name: str, q_emb: List[float], top_k: int, flt: RagFilters, lazy: bool, with_embeddings: bool = False
+) -> Dict[str, Any]:
+    """
+    Search one collection. Passages come back sorted by distance.
+    """
+    t0 = time.perf_counter()
+    col = get_chroma_collection(name)
+    cands: Optional[int] = None
+
+    if flt.is_empty():
+        with timed("chroma_query"):
+            res = col.query(query_embeddings=[q_emb], n_results=int(top_k), include=_include(lazy, with_embeddings))
+    else:
+        ensure_backfilled(col, collection=name)
+        ids = candidate_ids(flt, collection=name)
+        cands = len(ids)
+        res = None
+        if not ids:
+            passages: List[Dict[str, Any]] = []
+        elif len(ids) <= _EXACT_SCAN_MAX:
+            passages = _exact_scan(
+                col, q_emb, ids, top_k, lazy=lazy, collection=name, with_embeddings=with_embeddings
+            )
+        else:
+            with timed("chroma_query"):
+                res = col.query(
+                    query_embeddings=[q_emb],
+                    n_results=min(int(top_k), len(ids)),
+                    where=flt.to_where(),
+                    include=_include(lazy, with_embeddings),
+                )
+
+    if res is not None:
+        passages = _to_passages(
+            res.get("ids", [[]])[0],
+            (res.get("documents") or [None])[0],
+            res.get("metadatas", [[]])[0],
+            res.get("distances", [[]])[0],
+            collection=name,
+            embs=res["embeddings"][0] if with_embeddings else None,
+        )
+
+    return {
+        "passages": passages,
+        "candidates": cands,
+        "shard": {
+            "collection": name,
+            "matches": len(passages),
+            "elapsed_ms": int((time.perf_counter() - t0) * 1000),
+        },
+    }
+
+
+def has_filters(filters: Optional[Dict[str, Any]]) -> bool:
+    # /// routes always pass every filter key, mostly None: look at the values, not the dict
+    return not RagFilters.from_dict(filters).is_empty()
+
+
+def retrieve(
+    query: str,
+    top_k: int = 4,
+    filters: Optional[Dict[str, Any]] = None,
+    lazy: bool = False,
+    collections: Optional[List[str]] = None,
+    query_embedding: Optional[List[float]] = None,
+    with_embeddings: bool = False,
+) -> Dict[str, Any]:
+    """
+    Embed the query and return the closest passages.
+    When filters are given, the metadata index narrows the search to
+    the matching slice before any similarity scoring happens.
+    With lazy=True only ids, distances and metadata are fetched; call
+    hydrate_passages() for the passages that are actually rendered.
+    Several collections are searched in parallel and merged by distance.
+    with_embeddings=True attaches each passage's stored vector as "embedding".
+    """
+    with admit("rag"), event_span("tool.rag", "rag", top_k=int(top_k), filtered=has_filters(filters)) as meta:
+        out = _retrieve(query, top_k, filters, lazy, collections, query_embedding, with_embeddings)
+        meta.update(matches=len(out["passages"]), shards=len(out["shards"]), candidates=out["candidates"])
+        return out
+
+
+def _retrieve(
+    query: str,
+    top_k: int,
+    filters: Optional[Dict[str, Any]],
+    lazy: bool,
+    collections: Optional[List[str]],
+    query_embedding: Optional[List[float]],
+    with_embeddings: bool,
+) -> Dict[str, Any]:
+    names = _collection_names(collections)
+    flt = RagFilters.from_dict(filters)
+
+    # Prevent ONNX auto-embedding by supplying query embeddings ourselves
+    q_emb = query_embedding if query_embedding is not None else embed_texts([query])[0]
+
+    if len(names) == 1:
+        shard_outs = [_search_shard(names[0], q_emb, top_k, flt, lazy, with_embeddings)]
+    else:
+        futures = [_SHARD_POOL.submit(propagate(_search_shard), n, q_emb, top_k, flt, lazy, with_embeddings) for n in names]
+        shard_outs = [f.result() for f in futures]
+
+    # /// each shard list is already sorted -> k-way heap merge, stop after top_k
+    with span("rag.merge", shards=len(shard_outs)):
+        merged = heapq.merge(*[s["passages"] for s in shard_outs], key=lambda p: p["distance"])
+        passages = list(islice(merged, int(top_k)))
+
+    out: Dict[str, Any] = {
+        "passages": passages,
+        "candidates": None,
+        "doc_bytes": _doc_bytes(p["text"] for p in passages),
+        "shards": [s["shard"] for s in shard_outs],
+    }
+    if not flt.is_empty():
+        out["candidates"] = sum(s["candidates"] or 0 for s in shard_outs)
+        out["filters"] = flt.to_dict()
+    return out
+
+
+def hydrate_passages(passages: List[Dict[str, Any]], full: bool = False) -> int:
+    """
+    Phase 2 of lazy retrieval: load document text for just these passages.
+    Fills text_preview (and text when full=True) in place.
+    Returns the number of document bytes fetched.
+    """
+    need: Dict[str, List[str]] = {}
+    for p in passages:
+        if p.get("text_preview") is None:
+            need.setdefault(p.get("collection", DEFAULT_COLLECTION), []).append(p["chunk_id"])
+    if not need:
+        return 0
+
+    fetched = 0
+    for name, ids in need.items():
+        with timed("chroma_get"):
+            res = get_chroma_collection(name).get(ids=ids, include=["documents"])
+        by_id = dict(zip(res.get("ids", []), res.get("documents") or []))
+        fetched += _doc_bytes(by_id.values())
+
+        for p in passages:
+            if p.get("collection", DEFAULT_COLLECTION) != name:
+                continue
+            doc = by_id.get(p["chunk_id"])
+            if doc is None:
+                continue
+            p["text_preview"] = _preview(doc)
+            p["text"] = doc if full else None
+
+    return fetched
+
+
+def _batch_shard(name: str, texts: List[str], embs: List[List[float]], n_results: int) -> List[List[Dict[str, Any]]]:
+    col = get_chroma_collection(name)
+    with timed("chroma_query"):
+        res = col.query(
+            query_embeddings=embs,
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"],
+        )
+
+    ids = res.get("ids") or [[] for _ in texts]
+    docs = res.get("documents") or [[] for _ in texts]
+    metas = res.get("metadatas") or [[] for _ in texts]
+    dists = res.get("distances") or [[] for _ in texts]
+    return [_to_passages(ids[i], docs[i], metas[i], dists[i], collection=name) for i in range(len(texts))]
+
+
+def retrieve_batch(queries: List[Dict[str, Any]], collections: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Many queries in one round-trip:
+    - duplicate query strings are coalesced (largest top_k wins, then sliced)
+    - one embed_texts call for all unique queries
+    - one multi-embedding col.query per collection, sized for the largest top_k
+    Returns passages keyed by query string.
+    """
+    with admit("rag"), event_span("tool.rag_batch", "rag", queries=len(queries)) as meta:
+        out = _retrieve_batch(queries, collections)
+        meta["unique_queries"] = out["unique_queries"]
+        return out
+
+
+def _retrieve_batch(queries: List[Dict[str, Any]], collections: Optional[List[str]]) -> Dict[str, Any]:
+    wanted: Dict[str, int] = {}
+    for q in queries:
+        text = q.get("query", "")
+        wanted[text] = max(wanted.get(text, 0), int(q.get("top_k", 4)))
+
+    if not wanted:
+        return {"results": {}, "unique_queries": 0}
+
+    names = _collection_names(collections)
+    texts = list(wanted.keys())
+    embs = embed_texts(texts)
+    n_results = max(wanted.values())
+
+    if len(names) == 1:
+        per_shard = [_batch_shard(names[0], texts, embs, n_results)]
+    else:
+        futures = [_SHARD_POOL.submit(propagate(_batch_shard), n, texts, embs, n_results) for n in names]
+        per_shard = [f.result() for f in futures]
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for i, text in enumerate(texts):
+        merged = heapq.merge(*[shard[i] for shard in per_shard], key=lambda p: p["distance"])
+        results[text] = list(islice(merged, wanted[text]))
+
+    return {"results": results, "unique_queries": len(texts)}
@@ -1,5 +1,8 @@
 import os
+import re
+import threading
 from pathlib import Path
+from typing import Any, Dict
 
 # /// IMPORTANT: Disable Chroma telemetry BEFORE importing chromadb
 os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")  # /// Chroma checks this
@@ -8,14 +11,41 @@ os.environ.setdefault("CHROMA_ANONYMIZED_TELEMETRY", "0")
 
 import chromadb  # noqa: E402
 from chromadb.config import Settings  # noqa: E402
+from chromadb.errors import InvalidCollectionException  # noqa: E402
 
 
 _DB_DIR = Path(__file__).resolve().parent.parent / "db"
 _CHROMA_DIR = _DB_DIR / "chroma"
 
 
+DEFAULT_COLLECTION = "docs"
+
+# /// Chroma's own naming rule: 3-63 chars, alphanumeric ends, [a-zA-Z0-9_-] inside
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_\-]{1,61}[A-Za-z0-9]$")
+
 _client = None
-_collection = None
+_collections: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _after_fork() -> None:
+    """
+    A persistent client (SQLite + HNSW files, background threads) must not be used from
+    a forked child: drop it and reopen lazily. An in-memory client (tests, benchmark
+    fixtures) is kept, so a pre-fork parent can share its read-only index copy-on-write.
+    """
+    global _client, _lock
+    _lock = threading.Lock()
+    if _client is not None and _client.get_settings().is_persistent:
+        from chromadb.api.client import SharedSystemClient
+
+        SharedSystemClient.clear_system_cache()
+        _client = None
+        _collections.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
 
 
 def get_chroma_client():
@@ -35,11 +65,48 @@ def get_chroma_client():
     return _client
 
 
-def get_chroma_collection(name: str = "docs"):
-    global _collection
-    if _collection is not None:
-        return _collection
+def validate_collection_name(name: str) -> str:
+    name = (name or "").strip()
+    if not _NAME_RE.match(name):
+        raise ValueError(
+            f"Invalid collection name {name!r}: use 3-63 letters, digits, '_' or '-', "
+            "starting and ending with a letter or digit."
+        )
+    return name
+
+
+class UnknownCollection(LookupError):
+    """
+    Raised on the read path for a collection that was never indexed.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(f"Unknown collection {name!r}: index documents into it first (POST /rag/index).")
+        self.name = name
+
+
+def get_chroma_collection(name: str = DEFAULT_COLLECTION, create: bool = False):
+    """
+    One cached handle per named collection (per tenant / per corpus).
+    Only the indexer creates collections (create=True); reading a name that does not
+    exist raises UnknownCollection instead of silently creating an empty one. The
+    default collection is the exception: it always exists.
+    """
+    col = _collections.get(name)
+    if col is not None:
+        return col
 
-    client = get_chroma_client()
-    _collection = client.get_or_create_collection(name=name)
-    return _collection
+    name = validate_collection_name(name)
+    with _lock:
+        col = _collections.get(name)
+        if col is None:
+            client = get_chroma_client()
+            if create or name == DEFAULT_COLLECTION:
+                col = client.get_or_create_collection(name=name)
+            else:
+                try:
+                    col = client.get_collection(name=name)
+                except (InvalidCollectionException, ValueError):
+                    raise UnknownCollection(name) from None
+            _collections[name] = col
+    return col
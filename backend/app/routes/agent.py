@@ -1,8 +1,13 @@
-from fastapi import APIRouter
+import os
+from contextlib import nullcontext
+
+from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
 
 from app.agent.runner import run_agent
+from app.rag.store import UnknownCollection, get_chroma_collection, validate_collection_name
+from app.utils import tracing
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -10,6 +15,7 @@ router = APIRouter(prefix="/agent", tags=["agent"])
 class AgentChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    collections: Optional[List[str]] = None  # RAG collections to search (default: "docs")
 
 
 class AgentChatResponse(BaseModel):
@@ -17,9 +23,49 @@ class AgentChatResponse(BaseModel):
     trace: List[Dict[str, Any]]
     citations: List[str] = []
     thoughtless_plan: List[str] = []
+    # /// only with X-Trace / X-Profile request headers
+    trace_id: Optional[str] = None
+    spans: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, Any]] = None
+
+
+@router.post("/chat", response_model=AgentChatResponse, response_model_exclude_none=True)
+def agent_chat(
+    payload: AgentChatRequest,
+    x_trace: Optional[str] = Header(None, description="1 = nested span tree, chrome = Chrome trace-event JSON"),
+    x_profile: Optional[str] = Header(None, description="1 = cProfile this request"),
+):
+    try:
+        for name in payload.collections or []:
+            validate_collection_name(name)
+            get_chroma_collection(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownCollection as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    want_profile = x_profile not in (None, "", "0")
+    if want_profile and not tracing.PROFILE_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled (PROFILE_ENABLED=0).")
+
+    if not x_trace and not want_profile:
+        return run_agent(
+            message=payload.message,
+            conversation_id=payload.conversation_id,
+            collections=payload.collections,
+        )
 
+    trace_id = os.urandom(8).hex()
+    prof = tracing.profile(trace_id) if want_profile else nullcontext()
+    with tracing.trace("agent.chat", trace_id=trace_id) as root, prof:
+        result = run_agent(
+            message=payload.message,
+            conversation_id=payload.conversation_id,
+            collections=payload.collections,
+        )
 
-@router.post("/chat", response_model=AgentChatResponse)
-def agent_chat(payload: AgentChatRequest):
-    result = run_agent(message=payload.message, conversation_id=payload.conversation_id)
+    result = {**result, "trace_id": trace_id}
+    if x_trace:
+        result["spans"] = root.to_chrome() if x_trace.lower() == "chrome" else root.to_dict()
+    if want_profile:
+        result["profile"] = prof.summary()
     return result
@@ -1,16 +1,38 @@
-import json
+from typing import Literal, Optional
+
 from fastapi import APIRouter
+from pydantic import BaseModel, Field
 
-from app.eval.evaluator import run_evaluation
+from app.eval.evaluator import (
+    BASELINE_PATH,
+    compare_to_baseline,
+    load_report,
+    run_evaluation,
+    write_report,
+)
 
 router = APIRouter(prefix="/eval", tags=["eval"])
 
 
+class EvalRunIn(BaseModel):
+    concurrency: int = Field(1, ge=1, le=32)
+    repeats: int = Field(1, ge=1, le=100)
+    executor: Literal["thread", "process"] = "thread"
+    compare_baseline: bool = True
+    save_baseline: bool = False
+
+
 @router.post("/run")
-def run_eval():
-    report = run_evaluation()
+def run_eval(payload: Optional[EvalRunIn] = None):
+    payload = payload or EvalRunIn()
+    report = run_evaluation(concurrency=payload.concurrency, repeats=payload.repeats, executor=payload.executor)
+
+    baseline = load_report(BASELINE_PATH) if payload.compare_baseline and not payload.save_baseline else None
+    if baseline is not None:
+        report["gate"] = compare_to_baseline(report, baseline)
 
-    with open("reports/eval.json", "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2)
+    write_report(report)
+    if payload.save_baseline:
+        write_report(report, BASELINE_PATH)
 
     return report
@@ -0,0 +1,92 @@
+# /// Prometheus scrape endpoint + ASGI middleware timing every HTTP request
+from __future__ import annotations
+
+import time
+from typing import Iterable
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.tools import web_tool
+from app.tools.calculator import cache_info
+from app.tools.sql_cache import result_cache
+from app.utils import metrics
+from app.utils.event_sink import sink
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+http_latency = metrics.registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency (until the response body is sent).", ("method", "route")
+)
+http_requests = metrics.registry.counter("http_requests_total", "HTTP requests.", ("method", "route", "status"))
+http_in_flight = metrics.registry.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+metrics.registry.counter("event_log_written_total", "Events written by the event sink.")
+metrics.registry.counter("event_log_dropped_total", "Events dropped because the sink queue was full.")
+metrics.registry.counter("event_log_sampled_out_total", "Successful events skipped by sampling.")
+metrics.registry.gauge("event_log_queue_depth", "Events waiting for the sink writer.")
+
+
+def _cache_samples() -> Iterable[metrics.Sample]:
+    # /// read the caches' own counters at scrape time; nothing extra on their hot paths
+    for name, info in cache_info().items():
+        yield from metrics.cache_samples(f"calculator_{name}", info["hits"], info["misses"], info["size"])
+    sql = result_cache.stats()
+    yield from metrics.cache_samples("sql_result", sql["hits"], sql["misses"], sql["entries"])
+    # /// attributes, not stats(): stats() counts rows and would open the store's DB on first scrape
+    live = web_tool._live_store
+    yield from metrics.cache_samples("web_live", live.hits + live.stale_hits, live.misses)
+
+
+def _sink_samples() -> Iterable[metrics.Sample]:
+    s = sink.stats()
+    yield ("event_log_written_total", {}, s["written"])
+    yield ("event_log_dropped_total", {}, s["dropped"])
+    yield ("event_log_sampled_out_total", {}, s["sampled_out"])
+    yield ("event_log_queue_depth", {}, s["queued"])
+
+
+metrics.registry.register_collector(_cache_samples)
+metrics.registry.register_collector(_sink_samples)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI (not BaseHTTPMiddleware: no extra task or body buffering per request).
+    The route label is the matched path template ("/rag/index"), never the raw URL,
+    so label cardinality stays bounded; unmatched paths are counted as "other".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            # /// the router writes the matched route into this same scope dict
+            route = getattr(scope.get("route"), "path", None) or scope.get("admission_route") or "other"
+            method = scope["method"]
+            http_in_flight.dec()
+            http_latency.observe(time.perf_counter() - t0, method, route)
+            http_requests.inc(method, route, str(status))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def scrape():
+    return PlainTextResponse(metrics.registry.render(), media_type=CONTENT_TYPE)
@@ -1,12 +1,18 @@
 import os
+import time
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
 from app.rag.ingest import read_text_file, read_pdf_file
 from app.rag.chunking import chunk_text
 from app.rag.embeddings import embed_texts
-from app.rag.store import get_chroma_collection
+from app.rag.metadata_index import record_chunks
+from app.rag.retrieval import retrieve, retrieve_batch
+from app.rag.store import DEFAULT_COLLECTION, UnknownCollection, get_chroma_collection, validate_collection_name
+from app.utils.logger import event_span
 
 router = APIRouter()
 
@@ -16,17 +22,73 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 class RagQueryRequest(BaseModel):
     query: str = Field(..., min_length=1)
     top_k: int = Field(4, ge=1, le=10)
+    # /// "none" = ids/distances/metadata only (no document text is read)
+    text: Literal["preview", "full", "none"] = "preview"
+    # /// metadata pre-filters (all optional)
+    source: Optional[str] = None
+    sources: Optional[List[str]] = None
+    page_min: Optional[int] = Field(None, ge=1)
+    page_max: Optional[int] = Field(None, ge=1)
+    uploaded_after: Optional[int] = None   # epoch seconds
+    uploaded_before: Optional[int] = None  # epoch seconds
+    # /// named collections (tenants / corpora); several = parallel fan-out
+    collections: Optional[List[str]] = None
+
+
+class RagBatchQueryItem(BaseModel):
+    query: str = Field(..., min_length=1)
+    top_k: int = Field(4, ge=1, le=10)
+
+
+class RagBatchQueryRequest(BaseModel):
+    queries: List[RagBatchQueryItem] = Field(..., min_length=1, max_length=1000)
+    collections: Optional[List[str]] = None
+
+
+def _check_collections(names: Optional[List[str]], must_exist: bool = True) -> None:
+    try:
+        for n in names or []:
+            validate_collection_name(n)
+            if must_exist:
+                get_chroma_collection(n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownCollection as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def _chunk_meta(source: str, page: int | None, uploaded_at: int) -> dict:
+    # Chroma rejects None metadata values, so only set page when known
+    meta = {"source": source, "uploaded_at": uploaded_at}
+    if page is not None:
+        meta["page"] = page
+    return meta
+
 
 @router.post("/rag/index")
-async def rag_index(files: list[UploadFile] = File(...)):
-    col = get_chroma_collection()
+async def rag_index(files: list[UploadFile] = File(...), collection: str = Form(DEFAULT_COLLECTION)):
+    _check_collections([collection], must_exist=False)
+    with event_span("rag.index", "rag", collection=collection, files=len(files)) as meta:
+        out = await _index_files(files, collection)
+        meta.update(chunks=out.get("chunks_added", 0), ok=out["ok"])
+        return out
+
+
+async def _index_files(files: list[UploadFile], collection: str) -> dict:
+    uploads = [(f.filename or "uploaded", await f.read()) for f in files]
+    # /// parsing, embedding and upserting are CPU/IO bound: keep them off the event loop
+    # (concurrency is bounded by the /rag/index route bulkhead, see utils.admission)
+    return await run_in_threadpool(_index_uploads, uploads, collection)
+
+
+def _index_uploads(uploads: List[Tuple[str, bytes]], collection: str) -> dict:
+    col = get_chroma_collection(collection, create=True)
 
     all_ids, all_docs, all_metas = [], [], []
+    uploaded_at = int(time.time())
 
-    for f in files:
-        filename = f.filename or "uploaded"
+    for filename, content in uploads:
         save_path = UPLOAD_DIR / filename
-        content = await f.read()
         save_path.write_bytes(content)
 
         ext = save_path.suffix.lower()
@@ -38,14 +100,14 @@ async def rag_index(files: list[UploadFile] = File(...)):
                 for ch in chunks:
                     all_ids.append(ch.chunk_id)
                     all_docs.append(ch.text)
-                    all_metas.append({"source": ch.source, "page": ch.page})
+                    all_metas.append(_chunk_meta(ch.source, ch.page, uploaded_at))
         else:
             text = read_text_file(save_path)
             chunks = chunk_text(text, source=filename, page=None)
             for ch in chunks:
                 all_ids.append(ch.chunk_id)
                 all_docs.append(ch.text)
-                all_metas.append({"source": ch.source, "page": ch.page})
+                all_metas.append(_chunk_meta(ch.source, ch.page, uploaded_at))
 
     if not all_docs:
         return {"ok": False, "message": "No text extracted from uploaded files."}
@@ -53,37 +115,51 @@ async def rag_index(files: list[UploadFile] = File(...)):
     # We control embeddings ourselves (no Chroma ONNX auto-download)
     embeddings = embed_texts(all_docs)
     col.upsert(ids=all_ids, documents=all_docs, metadatas=all_metas, embeddings=embeddings)
+    record_chunks(all_ids, all_metas, collection=collection)
 
-    return {"ok": True, "files_indexed": len(files), "chunks_added": len(all_docs)}
+    return {"ok": True, "collection": collection, "files_indexed": len(uploads), "chunks_added": len(all_docs)}
 
 @router.post("/rag/query")
 def rag_query(payload: RagQueryRequest):
-    col = get_chroma_collection()
-
-    # Prevent ONNX auto-embedding by supplying query embeddings ourselves
-    q_emb = embed_texts([payload.query])[0]
-
-    res = col.query(
-        query_embeddings=[q_emb],
-        n_results=payload.top_k,
-        include=["documents", "metadatas", "distances"],  # ✅ valid in Chroma 0.5.x
+    filters = payload.model_dump(include={"source", "sources", "page_min", "page_max", "uploaded_after", "uploaded_before"})
+    _check_collections(payload.collections)
+    res = retrieve(
+        payload.query,
+        top_k=payload.top_k,
+        filters=filters,
+        lazy=payload.text == "none",
+        collections=payload.collections,
     )
 
-    docs = res.get("documents", [[]])[0]
-    metas = res.get("metadatas", [[]])[0]
-    ids = res.get("ids", [[]])[0]  # ✅ ids are returned automatically (don’t include it)
-    dists = res.get("distances", [[]])[0]
-
     out = []
-    for doc, meta, cid, dist in zip(docs, metas, ids, dists):
-        out.append(
-            {
-                "chunk_id": cid,
-                "source": (meta or {}).get("source", "unknown"),
-                "page": (meta or {}).get("page", None),
-                "distance": dist,
-                "text_preview": (doc[:220] + "...") if doc and len(doc) > 220 else doc,
-            }
-        )
-
-    return {"matches": out}
+    for p in res["passages"]:
+        if payload.text == "full":
+            out.append(dict(p))
+        else:
+            out.append({k: v for k, v in p.items() if k != "text"})
+
+    body = {"matches": out, "shards": res["shards"]}
+    if res.get("candidates") is not None:
+        body["candidates"] = res["candidates"]
+        body["filters"] = res.get("filters", {})
+    return body
+
+
+@router.post("/rag/query/batch")
+def rag_query_batch(payload: RagBatchQueryRequest):
+    _check_collections(payload.collections)
+    t0 = time.perf_counter()
+    res = retrieve_batch([q.model_dump() for q in payload.queries], collections=payload.collections)
+
+    results = {
+        query: [{k: v for k, v in p.items() if k != "text"} for p in passages]
+        for query, passages in res["results"].items()
+    }
+    elapsed_ms = int((time.perf_counter() - t0) * 1000)
+
+    return {
+        "results": results,
+        "total_queries": len(payload.queries),
+        "unique_queries": res["unique_queries"],
+        "elapsed_ms": elapsed_ms,
+    }
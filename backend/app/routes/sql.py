@@ -1,10 +1,16 @@
 # /// Stage 5: debug endpoint for SQL tool
 from __future__ import annotations
 
+from typing import Literal, Optional
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
-from app.tools.sql_tool import SQLTool
+from app.tools.sql_catalog import get_catalog
+from app.tools.sql_guard import SQLGuardError
+from app.tools.sql_tool import SQLTool, _shape_rows
+from app.utils.admission import Overloaded
 
 router = APIRouter(prefix="/sql", tags=["sql"])
 tool = SQLTool()
@@ -12,11 +18,55 @@ tool = SQLTool()
 
 class SQLQueryIn(BaseModel):
     sql: str
+    # /// pagination / streaming (legacy behaviour when none are set)
+    page_size: Optional[int] = Field(None, ge=1, le=10_000)
+    page_token: Optional[str] = None
+    keyset: Optional[str] = None
+    format: Literal["objects", "rows", "columnar"] = "objects"
+    stream: bool = False
 
 
 @router.post("/query")
 def query_sql(payload: SQLQueryIn):
     try:
-        return tool.run({"sql": payload.sql})
+        if payload.stream:
+            return StreamingResponse(tool.stream_ndjson(payload.sql), media_type="application/x-ndjson")
+
+        if payload.page_size or payload.page_token:
+            return tool.page(
+                payload.sql,
+                page_size=payload.page_size or 100,
+                page_token=payload.page_token,
+                fmt=payload.format,
+                keyset=payload.keyset,
+            )
+
+        out = tool.run({"sql": payload.sql})
+        if payload.format != "objects":
+            cols = out["columns"]
+            out.update(_shape_rows(cols, [tuple(r[c] for c in cols) for r in out["rows"]], payload.format))
+            if payload.format == "columnar":
+                out.pop("rows", None)
+        return out
+    except SQLGuardError as e:
+        raise HTTPException(status_code=400, detail=e.to_dict())
+    except Overloaded:
+        raise  # -> 429 (app exception handler)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/schema")
+def sql_schema():
+    try:
+        return get_catalog(tool.db_path).snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/advice")
+def sql_advice():
+    try:
+        return get_catalog(tool.db_path).advice()
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,31 @@
+# /// Direct tool endpoints (batch calculator)
+from __future__ import annotations
+
+import time
+from typing import List
+
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+
+from app.tools.calculator import cache_info, evaluate_batch
+from app.utils.logger import event_span
+
+router = APIRouter(prefix="/tools", tags=["tools"])
+
+MAX_BATCH = 10_000
+
+
+class CalculatorBatchIn(BaseModel):
+    expressions: List[str] = Field(..., min_length=1, max_length=MAX_BATCH)
+    vectorize: bool = True
+
+
+@router.post("/calculator/batch")
+def calculator_batch(payload: CalculatorBatchIn):
+    t0 = time.perf_counter()
+    with event_span("tool.calculator_batch", "calculator", count=len(payload.expressions)) as meta:
+        out = evaluate_batch(payload.expressions, vectorize=payload.vectorize)
+        meta.update(errors=out["errors"], vectorized=out["vectorized"])
+    out["elapsed_ms"] = int((time.perf_counter() - t0) * 1000)
+    out["compile_cache"] = cache_info()
+    return out
@@ -0,0 +1,182 @@
+# /// Pre-fork server: load the app + embedding model once in a parent, fork N uvicorn workers on a shared socket
+"""
+uvicorn --workers N spawns fresh interpreters, so each worker imports everything and
+loads its own copy of the sentence-transformer (and opens its own Chroma client) on
+its first embedding call. Here the parent does that work once, freezes the heap out
+of the GC and forks; workers share those pages copy-on-write.
+
+Run from backend/:
+    python -m app.serve --workers 4 --port 8000
+    python -m app.serve --workers 4 --no-preload          # fork without preloading (comparison)
+    python -m app.serve --factory --app benchmarks.loadgen:fixture_app --workers 2
+"""
+import argparse
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Any, Dict
+
+import uvicorn
+
+
+def _log(msg: str) -> None:
+    print(f"[serve {os.getpid()}] {msg}", file=sys.stderr, flush=True)
+
+
+def load_app(target: str, factory: bool) -> Any:
+    module, _, attr = target.partition(":")
+    obj = getattr(importlib.import_module(module), attr or "app")
+    return obj() if factory else obj
+
+
+def preload(target: str, factory: bool) -> Dict[str, Any]:
+    """
+    Everything workers would otherwise each do at startup: imports (FastAPI, Chroma,
+    NumPy, every route module), app construction, the embedding model, the bundled
+    web cache. Per-process handles (SQLite connections, persistent Chroma clients) are
+    re-opened in each child by the modules' own at-fork hooks.
+    """
+    t0 = time.perf_counter()
+    app = load_app(target, factory)
+    from app.rag import embeddings
+    from app.tools import web_tool
+
+    model = embeddings.preload()
+    web_tool._cache_index.snapshot()
+    return {"app": app, "model": model, "preload_s": round(time.perf_counter() - t0, 3)}
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(sock: socket.socket, app: Any, args) -> None:
+    if app is None:
+        # /// --no-preload: each worker pays for imports + app setup itself, as with uvicorn --workers
+        app = load_app(args.app, args.factory)
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(args) -> int:
+    sock = bind(args.host, args.port)
+    app = None
+    if args.preload:
+        info = preload(args.app, args.factory)
+        app = info["app"]
+        _log(f"preloaded in {info['preload_s']}s (embedding model: {info['model']})")
+        # /// keep preloaded objects out of GC passes: collecting would write to their headers
+        # and un-share the pages in every worker
+        gc.collect()
+        gc.freeze()
+
+    children: Dict[int, int] = {}
+    started: Dict[int, float] = {}
+    # /// per slot: consecutive exits within --min-uptime of being forked
+    fast_exits: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                _worker(sock, app, args)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = slot
+        started[pid] = time.monotonic()
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(args.workers):
+        spawn(slot)
+    _log(f"{args.workers} workers on http://{args.host}:{args.port} (pids {sorted(children)})")
+
+    code = 0
+    # /// slot -> monotonic time of a delayed restart; the parent keeps reaping meanwhile
+    due: Dict[int, float] = {}
+    while children or (due and not stopping):
+        if due:
+            now = time.monotonic()
+            for slot, at in list(due.items()):
+                if stopping or at <= now:
+                    del due[slot]
+                    if not stopping:
+                        spawn(slot)
+            pid, status = os.waitpid(-1, os.WNOHANG) if children else (0, 0)
+            if pid == 0:
+                time.sleep(0.05)
+                continue
+        else:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+        slot = children.pop(pid, None)
+        uptime = time.monotonic() - started.pop(pid, time.monotonic())
+        if slot is None or stopping:
+            continue
+        if uptime >= args.min_uptime:
+            fast_exits[slot] = 0
+            _log(f"worker {pid} exited ({status}) after {uptime:.1f}s; restarting")
+            spawn(slot)
+            continue
+        # /// crashed during startup (broken import, port, model): back off, then give up
+        # instead of fork-looping
+        fast_exits[slot] = fast_exits.get(slot, 0) + 1
+        if fast_exits[slot] >= args.max_fast_restarts:
+            _log(f"worker slot {slot} failed {fast_exits[slot]} times within {args.min_uptime}s of starting; giving up")
+            code = 1
+            stop(signal.SIGTERM, None)
+            continue
+        delay = min(0.5 * 2 ** (fast_exits[slot] - 1), 30.0)
+        _log(f"worker {pid} exited ({status}) after {uptime:.1f}s; restarting in {delay:.1f}s")
+        due[slot] = time.monotonic() + delay
+    sock.close()
+    return code
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--app", default="app.main:app", help="module:attr (app object, or factory with --factory)")
+    ap.add_argument("--factory", action="store_true")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    ap.add_argument("--preload", action=argparse.BooleanOptionalAction, default=True)
+    ap.add_argument("--keep-alive", type=int, default=5)
+    ap.add_argument("--log-level", default="warning")
+    ap.add_argument("--min-uptime", type=float, default=5.0, help="exits sooner than this count as startup failures")
+    ap.add_argument("--max-fast-restarts", type=int, default=5, help="give up after this many startup failures in a row")
+    args = ap.parse_args()
+    sys.exit(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,368 @@
-import ast
+import math
 import operator as op
+import os
 import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+from app.utils.admission import admit
+from app.utils.logger import event_span
 
 # Stage 3: safe calculator (no eval)
-_ALLOWED = {
-    ast.Add: op.add,
-    ast.Sub: op.sub,
-    ast.Mult: op.mul,
-    ast.Div: op.truediv,
-    ast.USub: op.neg,
-    ast.UAdd: op.pos,
-}
+# /// expressions are compiled once to flat postfix bytecode and run on an explicit stack,
+# so nesting depth is bounded by input size, not the Python recursion limit
+
+MAX_EXPR_CHARS = int(os.getenv("CALC_MAX_EXPR_CHARS", "10000"))
+MAX_LITERAL_CHARS = int(os.getenv("CALC_MAX_LITERAL_CHARS", "64"))
+# /// integer results (and intermediates) larger than this many bits are rejected
+MAX_INT_BITS = int(os.getenv("CALC_MAX_INT_BITS", "4096"))
+COMPILE_CACHE_SIZE = int(os.getenv("CALC_COMPILE_CACHE", "4096"))
+# /// same-shape groups at least this large are evaluated with NumPy in one pass
+VECTOR_MIN_GROUP = int(os.getenv("CALC_VECTOR_MIN_GROUP", "32"))
+
+_FLOAT_RE = re.compile(r"\d+\.\d*|\.\d+")
+_INT_RE = re.compile(r"\d+")
+_NUMBER_RE = re.compile(r"\d+\.?\d*|\.\d+")
+_TEMPLATE_TOKEN_RE = re.compile(r"\*\*|[-+*/()if]| ")
+# /// "007" is a syntax error in Python ("00" and "007.5" are not)
+_LEADING_ZERO_RE = re.compile(r"(?<![\d.])0+[1-9]\d*(?![\d.])")
+_BAD_CHAR_RE = re.compile(r"[^0-9.+\-*/()\s]")
+_FLOAT_EXACT = 2 ** 53
+
+# opcodes
+PUSH, NEG, POS, ADD, SUB, MUL, DIV, POW = range(8)
+
+_BINARY = {"+": ADD, "-": SUB, "*": MUL, "/": DIV, "**": POW}
+# /// (precedence, right-associative); unary +/- sit between * and ** like in Python
+_PREC = {ADD: (1, False), SUB: (1, False), MUL: (2, False), DIV: (2, False), NEG: (3, True), POS: (3, True), POW: (4, True)}
+_SCALAR_OPS = {ADD: op.add, SUB: op.sub, MUL: op.mul, DIV: op.truediv}
+
+
+@dataclass(frozen=True)
+class Program:
+    """
+    Compiled form of one expression *shape*: every literal is replaced by i (int)
+    or f (float), so "2*3+1" and "7*9+4" share a Program; PUSH args index into
+    the constants bound per call.
+    """
+    code: Tuple[Tuple[int, int], ...]
+    shape: Tuple[Any, ...]
+
 
 def _sanitize(expr: str) -> str:
     expr = expr.strip()
+    if len(expr) > MAX_EXPR_CHARS:
+        raise ValueError(f"Expression is too long (max {MAX_EXPR_CHARS} characters).")
     # allow only digits, operators, parentheses, decimal dots, spaces
     if not re.fullmatch(r"[0-9\.\+\-\*\/\(\)\s]+", expr):
         raise ValueError("Expression contains invalid characters.")
     return expr
 
-def _eval(node):
-    if isinstance(node, ast.Expression):
-        return _eval(node.body)
 
-    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
-        return node.value
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def split_expression(expr: str) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    (normalized template, literal values). All scanning is regex (C) work; repeated
+    expressions skip it entirely. The template is the compile cache key.
+    """
+    expr = _sanitize(expr)
+    if _LEADING_ZERO_RE.search(expr):
+        raise ValueError("Invalid expression.")
+    numbers = _NUMBER_RE.findall(expr)
+    if numbers and max(map(len, numbers)) > MAX_LITERAL_CHARS:
+        raise ValueError(f"Number literal is too long (max {MAX_LITERAL_CHARS} characters).")
+    template = " ".join(_INT_RE.sub("i", _FLOAT_RE.sub("f", expr)).split())
+    return template, tuple(float(n) if "." in n else int(n) for n in numbers)
 
-    if isinstance(node, ast.UnaryOp) and type(node.op) in _ALLOWED:
-        return _ALLOWED[type(node.op)](_eval(node.operand))
 
-    if isinstance(node, ast.BinOp) and type(node.op) in _ALLOWED:
-        left = _eval(node.left)
-        right = _eval(node.right)
-        return _ALLOWED[type(node.op)](left, right)
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_template(template: str) -> Program:
+    """
+    Shunting-yard over the template tokens (no recursion) -> postfix code.
+    """
+    code: List[Tuple[int, int]] = []
+    ops: List[Any] = []  # opcodes or "("
+    expect_operand = True
+    n_consts = 0
+    shape: List[Any] = []
 
-    raise ValueError("Unsupported expression.")
+    def reduce_while(pred) -> None:
+        while ops and ops[-1] != "(" and pred(ops[-1]):
+            o = ops.pop()
+            code.append((o, 0))
+            shape.append(o)
 
-def calculator_tool(inp: dict) -> dict:
-    expr = inp.get("expression", "")
-    expr = _sanitize(expr)
+    for tok in _TEMPLATE_TOKEN_RE.findall(template):
+        if tok == " ":
+            continue
+        if tok in ("i", "f"):
+            if not expect_operand:
+                raise ValueError("Invalid expression.")  # "1 2", "1.2.3"
+            code.append((PUSH, n_consts))
+            shape.append(tok)
+            n_consts += 1
+            expect_operand = False
+        elif tok == "(":
+            if not expect_operand:
+                raise ValueError("Invalid expression.")
+            ops.append("(")
+        elif tok == ")":
+            if expect_operand:
+                raise ValueError("Invalid expression.")
+            reduce_while(lambda o: True)
+            if not ops:
+                raise ValueError("Invalid expression.")
+            ops.pop()
+        elif expect_operand:
+            if tok not in ("+", "-"):
+                raise ValueError("Invalid expression.")
+            ops.append(NEG if tok == "-" else POS)
+        else:
+            opcode = _BINARY[tok]
+            prec, right = _PREC[opcode]
+            reduce_while(lambda o: _PREC[o][0] > prec or (_PREC[o][0] == prec and not right))
+            ops.append(opcode)
+            expect_operand = True
+
+    if expect_operand:
+        raise ValueError("Invalid expression.")
+    if "(" in ops:
+        raise ValueError("Invalid expression.")
+    reduce_while(lambda o: True)
+    return Program(tuple(code), tuple(shape))
+
+
+def _check_int(v: Any) -> Any:
+    if isinstance(v, int) and v.bit_length() > MAX_INT_BITS:
+        raise ValueError(f"Result is too large (over {MAX_INT_BITS} bits).")
+    return v
 
-    tree = ast.parse(expr, mode="eval")
-    result = _eval(tree)
 
+def _pow(base: Any, exp: Any) -> Any:
+    if isinstance(base, int) and isinstance(exp, int) and exp > 0:
+        # /// reject before computing: 9**9**9 would otherwise run for minutes
+        if abs(base) > 1 and exp * (abs(base).bit_length() - 1) > MAX_INT_BITS:
+            raise ValueError(f"Result is too large (over {MAX_INT_BITS} bits).")
+    try:
+        out = base ** exp
+    except OverflowError:
+        raise ValueError("Result is too large.")
+    if isinstance(out, complex):
+        raise ValueError("Result is not a real number.")
+    return out
+
+
+def execute(program: Program, consts: Tuple[Any, ...]) -> Any:
+    stack: List[Any] = []
+    push, pop = stack.append, stack.pop
+    for opcode, arg in program.code:
+        if opcode == PUSH:
+            push(consts[arg])
+        elif opcode == NEG:
+            push(-pop())
+        elif opcode == POS:
+            push(+pop())
+        else:
+            b = pop()
+            a = pop()
+            if opcode == POW:
+                push(_check_int(_pow(a, b)))
+                continue
+            try:
+                push(_check_int(_SCALAR_OPS[opcode](a, b)))
+            except OverflowError:
+                raise ValueError("Result is too large.")
+    return stack[0]
+
+
+def _normalize_result(result: Any) -> Any:
     # Normalize floats like 1.0 -> 1
     if isinstance(result, float) and result.is_integer():
-        result = int(result)
+        return int(result)
+    return result
+
+
+def calculator_tool(inp: dict) -> dict:
+    expr = inp.get("expression", "")
+    with admit("calculator"), event_span("tool.calculator", "calculator", chars=len(expr)):
+        template, consts = split_expression(expr)
+        result = execute(compile_template(template), consts)
+        return {"result": _normalize_result(result)}
+
+
+# ---- batch ------------------------------------------------------------
+
+
+def _vector_eval(shape: Tuple[Any, ...], consts: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray", bool]:
+    """
+    Run one shape over a (rows x constants) float64 matrix.
+    Returns (values, rows that must be re-run on the scalar path, result is int-typed).
+    Float64 matches Python exactly for + - * / as long as every int-typed value stays
+    below 2**53; rows that leave that range, or divide by zero, are flagged instead.
+    """
+    n = consts.shape[0]
+    fallback = np.zeros(n, dtype=bool)
+    stack: List[Tuple["np.ndarray", bool]] = []  # (values, int-typed)
+    k = 0
+    for item in shape:
+        if item in ("i", "f"):
+            v = consts[:, k]
+            if item == "i":
+                fallback |= ~(np.abs(v) < _FLOAT_EXACT)
+            stack.append((v, item == "i"))
+            k += 1
+        elif item == NEG:
+            v, is_int = stack.pop()
+            stack.append((-v, is_int))
+        elif item == POS:
+            pass
+        else:
+            b, b_int = stack.pop()
+            a, a_int = stack.pop()
+            if item == DIV:
+                zero = b == 0
+                fallback |= zero
+                out = np.divide(a, np.where(zero, 1.0, b))
+                is_int = False
+            else:
+                out = {ADD: np.add, SUB: np.subtract, MUL: np.multiply}[item](a, b)
+                is_int = a_int and b_int
+            if is_int:
+                fallback |= ~(np.abs(out) < _FLOAT_EXACT)
+            stack.append((out, is_int))
+    values, is_int = stack[0]
+    return values, fallback, is_int
+
+
+def _split_many(expressions: List[str]) -> Optional[Tuple[List[str], List[int], List[str], Dict[int, Any]]]:
+    """
+    Batch form of split_expression: every regex runs once over all expressions joined
+    by newlines. Returns (templates, literal offsets, flat literal strings, per-item
+    results for lines that needed the one-by-one path), or None if any item contains a newline.
+    """
+    if any("\n" in e for e in expressions):
+        return None
+    joined = "\n".join(expressions)
+    starts = [0]
+    for e in expressions[:-1]:
+        starts.append(starts[-1] + len(e) + 1)
+
+    # /// lines with bad chars, leading zeros or long literals go through split_expression one by one
+    numbers = _NUMBER_RE.findall(joined)
+    hits = list(_BAD_CHAR_RE.finditer(joined)) + list(_LEADING_ZERO_RE.finditer(joined))
+    if numbers and max(map(len, numbers)) > MAX_LITERAL_CHARS:
+        hits += [m for m in _NUMBER_RE.finditer(joined) if len(m.group()) > MAX_LITERAL_CHARS]
+    special = {bisect_right(starts, m.start()) - 1 for m in hits}
+    templates = [" ".join(t.split()) for t in _INT_RE.sub("i", _FLOAT_RE.sub("f", joined)).split("\n")]
+
+    offsets: List[int] = []
+    pos = 0
+    slow: Dict[int, Any] = {}
+    for i, t in enumerate(templates):
+        offsets.append(pos)
+        if i in special or not t or len(expressions[i]) > MAX_EXPR_CHARS:
+            pos += len(_NUMBER_RE.findall(expressions[i]))
+            try:
+                slow[i] = split_expression.__wrapped__(expressions[i])
+            except ValueError as e:
+                slow[i] = e
+        else:
+            pos += t.count("i") + t.count("f")
+    return templates, offsets, numbers, slow
+
+
+def evaluate_batch(expressions: List[str], vectorize: bool = True) -> Dict[str, Any]:
+    """
+    Split all expressions into (template, literals) in a few regex passes, group
+    by template, and evaluate large same-shape groups with NumPy; everything
+    else goes through `execute`. Batch items bypass the per-expression LRU so
+    one-off batches do not evict the agent's hot entries.
+    """
+    n = len(expressions)
+    results: List[Optional[Dict[str, Any]]] = [None] * n
+    groups: Dict[str, List[int]] = {}
+    split = _split_many(expressions) if n else None
+    if split is None:
+        split = ([""] * n, [0] * n, [], {})
+        for i, expr in enumerate(expressions):
+            try:
+                split[3][i] = split_expression.__wrapped__(expr)
+            except ValueError as e:
+                split[3][i] = e
+    templates, offsets, numbers, slow = split
+
+    def consts_of(i: int, k: int) -> Tuple[Any, ...]:
+        if i in slow:
+            return slow[i][1]
+        return tuple(float(x) if "." in x else int(x) for x in numbers[offsets[i]: offsets[i] + k])
+
+    for i in range(n):
+        item = slow.get(i)
+        if isinstance(item, ValueError):
+            results[i] = {"expression": expressions[i], "error": str(item)}
+            continue
+        groups.setdefault(item[0] if item else templates[i], []).append(i)
+
+    vectorized = 0
+    flat = None
+    scalar: List[Tuple[int, Program]] = []
+    for template, idxs in groups.items():
+        try:
+            prog = compile_template(template)
+        except ValueError as e:
+            for i in idxs:
+                results[i] = {"expression": expressions[i], "error": str(e)}
+            continue
+        k = sum(1 for x in prog.shape if x in ("i", "f"))
+        if not (vectorize and np is not None and len(idxs) >= VECTOR_MIN_GROUP and POW not in prog.shape):
+            scalar.extend((i, prog) for i in idxs)
+            continue
+        if any(i in slow for i in idxs):
+            consts = np.array([consts_of(i, k) for i in idxs], dtype=np.float64).reshape(len(idxs), k)
+        else:
+            if flat is None:
+                flat = np.array(numbers, dtype=np.float64)
+            rows = np.fromiter((offsets[i] for i in idxs), dtype=np.int64, count=len(idxs))
+            consts = flat[rows[:, None] + np.arange(k)]
+        with np.errstate(all="ignore"):
+            values, fallback, is_int = _vector_eval(prog.shape, consts)
+        out = values.tolist()
+        for j, i in enumerate(idxs):
+            if fallback[j]:
+                scalar.append((i, prog))
+                continue
+            v = out[j]
+            results[i] = {"expression": expressions[i], "result": int(v) if is_int else _normalize_result(v)}
+            vectorized += 1
+
+    for i, prog in scalar:
+        try:
+            value = execute(prog, consts_of(i, sum(1 for x in prog.shape if x in ("i", "f"))))
+            results[i] = {"expression": expressions[i], "result": _normalize_result(value)}
+        except (ValueError, ZeroDivisionError) as e:
+            results[i] = {"expression": expressions[i], "error": str(e)}
+
+    # /// inf/nan are not valid JSON
+    for r in results:
+        v = r.get("result")
+        if isinstance(v, float) and not math.isfinite(v):
+            del r["result"]
+            r["error"] = "Result is not finite."
+
+    errors = sum(1 for r in results if "error" in r)
+    return {"results": results, "count": n, "errors": errors, "vectorized": vectorized, "shapes": len(groups)}
+
 
-    return {"result": result}
+def cache_info() -> Dict[str, Dict[str, int]]:
+    out = {}
+    for name, fn in (("expressions", split_expression), ("templates", compile_template)):
+        info = fn.cache_info()
+        out[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+    return out
@@ -0,0 +1,237 @@
+# /// Materialized aggregates for the agent's SQL templates (kept fresh by triggers)
+from __future__ import annotations
+
+import re
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+AGG_TABLES = ("agg_customer_orders", "agg_ticket_status", "agg_ticket_null")
+
+# /// Side tables + triggers. Every write to orders/tickets adjusts the aggregates
+# in the same transaction, so refresh is incremental and never stale.
+# Tickets with a NULL status are counted in the one-row agg_ticket_null instead: a NULL key
+# never conflicts, so upserting it into agg_ticket_status would add a new (NULL, 1) row each time.
+# total_spent is re-summed for the affected customer instead of adjusted by +/-: adding
+# and subtracting REALs drifts from a fresh SUM() over time. The customer_id index keeps
+# that re-sum to one customer's orders, visited in the same order as the raw query does.
+_SPENT = "(SELECT COALESCE(SUM(total_amount), 0) FROM orders WHERE customer_id = {cid})"
+
+_DDL = f"""
+CREATE TABLE IF NOT EXISTS agg_customer_orders (
+    customer_id INTEGER PRIMARY KEY,
+    total_orders INTEGER NOT NULL DEFAULT 0,
+    total_spent REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_agg_co_orders ON agg_customer_orders (total_orders DESC, customer_id);
+CREATE INDEX IF NOT EXISTS idx_agg_co_spent ON agg_customer_orders (total_spent DESC, customer_id);
+CREATE INDEX IF NOT EXISTS idx_agg_orders_customer ON orders (customer_id);
+
+CREATE TABLE IF NOT EXISTS agg_ticket_status (
+    status TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS agg_ticket_null (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_orders_ins AFTER INSERT ON orders BEGIN
+    INSERT INTO agg_customer_orders (customer_id, total_orders, total_spent)
+    VALUES (NEW.customer_id, 1, 0)
+    ON CONFLICT(customer_id) DO UPDATE SET total_orders = total_orders + 1;
+    UPDATE agg_customer_orders SET total_spent = {_SPENT.format(cid="NEW.customer_id")}
+    WHERE customer_id = NEW.customer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_orders_del AFTER DELETE ON orders BEGIN
+    UPDATE agg_customer_orders
+    SET total_orders = total_orders - 1,
+        total_spent = {_SPENT.format(cid="OLD.customer_id")}
+    WHERE customer_id = OLD.customer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_orders_upd AFTER UPDATE OF customer_id, total_amount ON orders BEGIN
+    UPDATE agg_customer_orders
+    SET total_orders = total_orders - 1,
+        total_spent = {_SPENT.format(cid="OLD.customer_id")}
+    WHERE customer_id = OLD.customer_id;
+    INSERT INTO agg_customer_orders (customer_id, total_orders, total_spent)
+    VALUES (NEW.customer_id, 1, 0)
+    ON CONFLICT(customer_id) DO UPDATE SET total_orders = total_orders + 1;
+    UPDATE agg_customer_orders SET total_spent = {_SPENT.format(cid="NEW.customer_id")}
+    WHERE customer_id = NEW.customer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_tickets_ins AFTER INSERT ON tickets WHEN NEW.status IS NOT NULL BEGIN
+    INSERT INTO agg_ticket_status (status, total) VALUES (NEW.status, 1)
+    ON CONFLICT(status) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_tickets_ins_null AFTER INSERT ON tickets WHEN NEW.status IS NULL BEGIN
+    UPDATE agg_ticket_null SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_tickets_del AFTER DELETE ON tickets WHEN OLD.status IS NOT NULL BEGIN
+    UPDATE agg_ticket_status SET total = total - 1 WHERE status = OLD.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_tickets_del_null AFTER DELETE ON tickets WHEN OLD.status IS NULL BEGIN
+    UPDATE agg_ticket_null SET total = total - 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agg_tickets_upd AFTER UPDATE OF status ON tickets
+WHEN OLD.status IS NOT NEW.status BEGIN
+    UPDATE agg_ticket_status SET total = total - 1 WHERE status = OLD.status;
+    UPDATE agg_ticket_null SET total = total - (OLD.status IS NULL) + (NEW.status IS NULL);
+    INSERT INTO agg_ticket_status (status, total) SELECT NEW.status, 1 WHERE NEW.status IS NOT NULL
+    ON CONFLICT(status) DO UPDATE SET total = total + 1;
+END;
+"""
+
+_REBUILD = """
+DELETE FROM agg_customer_orders;
+INSERT INTO agg_customer_orders (customer_id, total_orders, total_spent)
+SELECT customer_id, COUNT(id), COALESCE(SUM(total_amount), 0) FROM orders GROUP BY customer_id;
+DELETE FROM agg_ticket_status;
+INSERT INTO agg_ticket_status (status, total)
+SELECT status, COUNT(*) FROM tickets WHERE status IS NOT NULL GROUP BY status;
+DELETE FROM agg_ticket_null;
+INSERT INTO agg_ticket_null (id, total) SELECT 1, COUNT(*) FROM tickets WHERE status IS NULL;
+"""
+
+# /// normalized template SQL (see runner._deterministic_sql_from_question) -> aggregate query
+_REWRITES = [
+    (
+        re.compile(
+            r"^SELECT c\.id, c\.name, COUNT\(o\.id\) AS total_orders FROM customers c "
+            r"JOIN orders o ON o\.customer_id = c\.id GROUP BY c\.id, c\.name "
+            r"ORDER BY total_orders DESC, c\.id LIMIT (\d+)$",
+            re.I,
+        ),
+        "SELECT c.id, c.name, a.total_orders AS total_orders FROM agg_customer_orders a "
+        "JOIN customers c ON c.id = a.customer_id WHERE a.total_orders > 0 "
+        "ORDER BY a.total_orders DESC, a.customer_id LIMIT {limit}",
+        "agg_customer_orders",
+    ),
+    (
+        re.compile(
+            r"^SELECT c\.id, c\.name, COALESCE\(SUM\(o\.total_amount\), 0\) AS total_spent FROM customers c "
+            r"JOIN orders o ON o\.customer_id = c\.id GROUP BY c\.id, c\.name "
+            r"ORDER BY total_spent DESC, c\.id LIMIT (\d+)$",
+            re.I,
+        ),
+        "SELECT c.id, c.name, a.total_spent AS total_spent FROM agg_customer_orders a "
+        "JOIN customers c ON c.id = a.customer_id WHERE a.total_orders > 0 "
+        "ORDER BY a.total_spent DESC, a.customer_id LIMIT {limit}",
+        "agg_customer_orders",
+    ),
+    (
+        re.compile(
+            r"^SELECT status, COUNT\(\*\) AS total FROM tickets GROUP BY status "
+            r"ORDER BY total DESC, status LIMIT (\d+)$",
+            re.I,
+        ),
+        # /// the NULL bucket comes from agg_ticket_null; GROUP BY status reports it as one group
+        "SELECT status, total FROM (SELECT status, total FROM agg_ticket_status "
+        "UNION ALL SELECT NULL, total FROM agg_ticket_null) "
+        "WHERE total > 0 ORDER BY total DESC, status LIMIT {limit}",
+        "agg_ticket_status",
+    ),
+]
+
+_TRIGGERS = _DDL.count("CREATE TRIGGER")
+
+# /// (db path) -> (schema_version, aggregates installed?)
+_installed: Dict[str, Tuple[int, bool]] = {}
+_lock = threading.Lock()
+
+
+def install(db_path: Path) -> None:
+    """
+    Create side tables and triggers, then do one full rebuild.
+    Idempotent; safe to re-run (e.g. after a bulk load with triggers dropped).
+    """
+    conn = sqlite3.connect(str(db_path))
+    try:
+        # /// drop triggers from an earlier install first: CREATE ... IF NOT EXISTS would keep their old bodies
+        _drop_triggers(conn)
+        conn.executescript(_DDL)
+        refresh(conn)
+    finally:
+        conn.close()
+
+
+def refresh(conn: sqlite3.Connection) -> None:
+    """
+    Full recompute from the raw tables (only needed for recovery / first install).
+    """
+    conn.executescript("BEGIN;" + _REBUILD + "COMMIT;")
+
+
+def _drop_triggers(conn: sqlite3.Connection) -> None:
+    names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE 'trg_agg_%'")]
+    for n in names:
+        conn.execute(f'DROP TRIGGER IF EXISTS "{n}"')
+    conn.commit()
+
+
+def uninstall(db_path: Path) -> None:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        _drop_triggers(conn)
+        for t in AGG_TABLES:
+            conn.execute(f'DROP TABLE IF EXISTS "{t}"')
+        conn.execute("DROP INDEX IF EXISTS idx_agg_orders_customer")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _available(conn: sqlite3.Connection, db_path: Path) -> bool:
+    key = str(db_path)
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    cached = _installed.get(key)
+    if cached and cached[0] == schema_version:
+        return cached[1]
+
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'agg_%' OR name LIKE 'trg_agg_%'")}
+    ok = set(AGG_TABLES) <= names and sum(1 for n in names if n.startswith("trg_agg_")) == _TRIGGERS
+    with _lock:
+        _installed[key] = (schema_version, ok)
+    return ok
+
+
+def rewrite(conn: sqlite3.Connection, db_path: Path, sql: str) -> Tuple[str, Optional[str]]:
+    """
+    Map a normalized template query onto its aggregate table when installed.
+    Returns (sql to execute, aggregate table used or None).
+    """
+    for pattern, target, table in _REWRITES:
+        m = pattern.match(sql)
+        if m:
+            if not _available(conn, db_path):
+                return sql, None
+            return target.format(limit=int(m.group(1))), table
+    return sql, None
+
+
+if __name__ == "__main__":
+    # python -m app.tools.sql_aggregates [install|refresh|uninstall] [db_path]
+    from app.tools.sql_tool import DB_PATH
+
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "install"
+    path = Path(sys.argv[2]) if len(sys.argv) > 2 else DB_PATH
+    if cmd == "install":
+        install(path)
+    elif cmd == "refresh":
+        c = sqlite3.connect(str(path))
+        refresh(c)
+        c.close()
+    elif cmd == "uninstall":
+        uninstall(path)
+    else:
+        raise SystemExit(f"unknown command: {cmd}")
+    print(f"{cmd}: ok ({path})")
@@ -0,0 +1,151 @@
+# /// Result cache for SQLTool, invalidated when the database changes
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.tools.sqlite_pool import open_readonly
+
+MAX_ENTRIES = int(os.getenv("SQL_CACHE_ENTRIES", "256"))
+MAX_BYTES = int(os.getenv("SQL_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+
+@dataclass
+class CachedResult:
+    version: Tuple[int, ...]
+    columns: List[str]
+    rows: List[Dict[str, Any]]
+    nbytes: int
+    compute_ms: float
+
+
+def _estimate_bytes(rows: List[Dict[str, Any]]) -> int:
+    # /// rough but cheap: per-value text size + per-value overhead
+    return sum(sum(len(str(v)) + 16 for v in r.values()) + 64 for r in rows)
+
+
+class DataVersionWatcher:
+    """
+    Version token for a SQLite file.
+    - PRAGMA data_version on one long-lived connection changes on every commit
+      made through any other connection or process.
+    - File mtime/size (db and -wal) cover replacing the file outright.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _stat(self, p: Path) -> Tuple[int, int]:
+        try:
+            st = p.stat()
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return 0, 0
+
+    def version(self) -> Tuple[int, ...]:
+        file_token = self._stat(self.db_path) + self._stat(Path(f"{self.db_path}-wal"))
+        with self._lock:
+            if self._conn is None:
+                self._conn = open_readonly(self.db_path)
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return (data_version, *file_token)
+
+
+class SQLResultCache:
+    """
+    LRU keyed on (db path, normalized SQL) with entry-count and byte-size limits.
+    Entries whose version token no longer matches the DB are treated as misses.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], CachedResult]" = OrderedDict()
+        self._watchers: Dict[str, DataVersionWatcher] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # /// watchers hold a SQLite connection, which must not cross fork(); cached rows can
+        self._lock = threading.Lock()
+        self._watchers = {}
+
+    def _watcher(self, db_path: Path) -> DataVersionWatcher:
+        key = str(db_path)
+        with self._lock:
+            w = self._watchers.get(key)
+            if w is None:
+                w = DataVersionWatcher(db_path)
+                self._watchers[key] = w
+        return w
+
+    def version(self, db_path: Path) -> Tuple[int, ...]:
+        return self._watcher(db_path).version()
+
+    def get(self, db_path: Path, sql: str, version: Tuple[int, ...]) -> Optional[CachedResult]:
+        key = (str(db_path), sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        db_path: Path,
+        sql: str,
+        version: Tuple[int, ...],
+        columns: List[str],
+        rows: List[Dict[str, Any]],
+        compute_ms: float,
+    ) -> None:
+        nbytes = _estimate_bytes(rows)
+        if nbytes > self.max_bytes:
+            return
+
+        key = (str(db_path), sql)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = CachedResult(version, columns, rows, nbytes, compute_ms)
+            self._bytes += nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+result_cache = SQLResultCache()
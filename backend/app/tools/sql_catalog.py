@@ -0,0 +1,218 @@
+# /// Schema catalog (cached, invalidated by schema_version) + query-shape log and index advisor
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.tools.sql_cache import result_cache
+from app.tools.sql_guard import _alias_map
+from app.tools.sqlite_pool import get_pool
+
+MAX_SHAPES = 500
+# /// tables smaller than this never get an index recommendation
+ADVICE_MIN_ROWS = 1000
+
+_NUM_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_QUALIFIED_PRED_RE = re.compile(r"\b(\w+)\.(\w+)\s*(?:=|<=|>=|<>|!=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b)", re.I)
+_QUALIFIED_RHS_RE = re.compile(r"(?:=|<=|>=|<|>)\s*(\w+)\.(\w+)\b")
+_WHERE_RE = re.compile(r"\bwhere\b(.*?)(?=\bgroup\b|\border\b|\blimit\b|\bhaving\b|$)", re.I | re.S)
+_BARE_PRED_RE = re.compile(r"(?<![.\w])(\w+)\s*(?:=|<=|>=|<>|!=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b)", re.I)
+
+
+def query_shape(sql: str) -> str:
+    """
+    Literal-free form of a query, so 'LIMIT 3' and 'LIMIT 5' count as one shape.
+    """
+    s = _STR_RE.sub("?", sql)
+    s = _NUM_RE.sub("?", s)
+    return " ".join(s.split())
+
+
+class SchemaCatalog:
+    """
+    Tables, columns, indexes and approximate row counts for one SQLite file.
+    - structure is re-read only when PRAGMA schema_version changes
+    - row estimates are re-read when the data version token changes
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._schema_version: Optional[int] = None
+        self._data_version: Optional[Tuple[int, ...]] = None
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._shapes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.reloads = 0
+
+    # ---- catalog -------------------------------------------------------
+
+    def _load(self, conn) -> None:
+        tables: Dict[str, Dict[str, Any]] = {}
+        names = [
+            r[0]
+            for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        ]
+        for t in names:
+            cols = conn.execute(f'PRAGMA table_info("{t}")').fetchall()  # (cid, name, type, notnull, dflt_value, pk)
+            indexes = []
+            for idx in conn.execute(f'PRAGMA index_list("{t}")').fetchall():  # (seq, name, unique, origin, partial)
+                idx_cols = [c[2] for c in conn.execute(f'PRAGMA index_info("{idx[1]}")').fetchall()]
+                indexes.append({"name": idx[1], "columns": idx_cols, "unique": bool(idx[2])})
+            tables[t] = {
+                "name": t,
+                "columns": [{"name": c[1], "type": c[2], "notnull": bool(c[3]), "pk": bool(c[5])} for c in cols],
+                "indexes": indexes,
+                "row_estimate": 0,
+            }
+        self._tables = tables
+        self.reloads += 1
+
+    def _refresh_counts(self, conn) -> None:
+        for t, info in self._tables.items():
+            try:
+                # /// MAX(rowid) is O(log n); exact COUNT(*) would scan
+                info["row_estimate"] = int(conn.execute(f'SELECT MAX(rowid) FROM "{t}"').fetchone()[0] or 0)
+            except Exception:
+                info["row_estimate"] = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        data_version = result_cache.version(self.db_path)
+        with get_pool(self.db_path).connection() as conn:
+            schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+            with self._lock:
+                if schema_version != self._schema_version:
+                    self._load(conn)
+                    self._schema_version = schema_version
+                    self._data_version = None
+                if data_version != self._data_version:
+                    self._refresh_counts(conn)
+                    self._data_version = data_version
+                tables = [dict(t) for t in self._tables.values()]
+        return {"db": self.db_path.name, "schema_version": schema_version, "tables": tables}
+
+    def schema_text(self) -> str:
+        lines = []
+        for t in self.snapshot()["tables"]:
+            col_str = ", ".join(f"{c['name']} {c['type']}" for c in t["columns"])
+            lines.append(f"{t['name']}({col_str})")
+        return "\n".join(lines)
+
+    # ---- query shapes --------------------------------------------------
+
+    def record_query(self, sql: str, elapsed_ms: float) -> None:
+        shape = query_shape(sql)
+        with self._lock:
+            entry = self._shapes.pop(shape, None) or {"shape": shape, "sample_sql": sql, "count": 0, "total_ms": 0.0}
+            entry["count"] += 1
+            entry["total_ms"] += float(elapsed_ms)
+            self._shapes[shape] = entry
+            while len(self._shapes) > MAX_SHAPES:
+                self._shapes.popitem(last=False)
+
+    def shapes(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [dict(e) for e in self._shapes.values()]
+        for e in items:
+            e["total_ms"] = round(e["total_ms"], 3)
+        return sorted(items, key=lambda e: e["total_ms"], reverse=True)
+
+    # ---- advisor -------------------------------------------------------
+
+    def _indexed_leading(self, table: str) -> set:
+        info = self._tables.get(table) or {}
+        lead = {i["columns"][0] for i in info.get("indexes", []) if i["columns"]}
+        lead |= {c["name"] for c in info.get("columns", []) if c["pk"] and c["type"].upper() == "INTEGER"}
+        lead.add("rowid")
+        return lead
+
+    def _predicate_columns(self, sql: str, aliases: Dict[str, str]) -> List[Tuple[str, str]]:
+        found: List[Tuple[str, str]] = []
+        for m in list(_QUALIFIED_PRED_RE.finditer(sql)) + list(_QUALIFIED_RHS_RE.finditer(sql)):
+            alias, col = m.group(1), m.group(2)
+            if alias in aliases:
+                found.append((aliases[alias], col))
+
+        # /// unqualified WHERE columns only make sense for single-table queries
+        tables = set(aliases.values())
+        if len(tables) == 1:
+            table = next(iter(tables))
+            cols = {c["name"] for c in (self._tables.get(table) or {}).get("columns", [])}
+            for clause in _WHERE_RE.findall(sql):
+                for m in _BARE_PRED_RE.finditer(clause):
+                    if m.group(1) in cols:
+                        found.append((table, m.group(1)))
+        return found
+
+    def advice(self) -> Dict[str, Any]:
+        """
+        Recommend single-column indexes for join/filter columns of tables that
+        the logged queries scan (or index automatically on every run).
+        """
+        self.snapshot()
+        shapes = self.shapes()
+        recs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+        with get_pool(self.db_path).connection() as conn:
+            for entry in shapes:
+                sql = entry["sample_sql"]
+                try:
+                    plan = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+                except Exception:
+                    continue
+                aliases = _alias_map(sql)
+
+                scanned = set()
+                for detail in plan:
+                    m = re.match(r"^(?:SCAN|SEARCH) (\w+)", detail)
+                    if not m or m.group(1) not in aliases:
+                        continue
+                    if detail.startswith("SCAN") or "AUTOMATIC" in detail:
+                        scanned.add(aliases[m.group(1)])
+
+                with self._lock:
+                    for table, col in self._predicate_columns(sql, aliases):
+                        info = self._tables.get(table)
+                        if table not in scanned or not info or info["row_estimate"] < ADVICE_MIN_ROWS:
+                            continue
+                        if col in self._indexed_leading(table):
+                            continue
+                        rec = recs.setdefault(
+                            (table, col),
+                            {
+                                "table": table,
+                                "columns": [col],
+                                "create_sql": f'CREATE INDEX idx_{table}_{col} ON "{table}" ("{col}")',
+                                "row_estimate": info["row_estimate"],
+                                "query_shapes": 0,
+                                "total_ms": 0.0,
+                                "examples": [],
+                            },
+                        )
+                        rec["query_shapes"] += 1
+                        rec["total_ms"] = round(rec["total_ms"] + entry["total_ms"], 3)
+                        if len(rec["examples"]) < 3:
+                            rec["examples"].append(entry["shape"])
+
+        ranked = sorted(recs.values(), key=lambda r: r["total_ms"], reverse=True)
+        return {"db": self.db_path.name, "query_shapes": shapes[:20], "recommendations": ranked}
+
+
+_catalogs: Dict[str, SchemaCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(db_path: Path) -> SchemaCatalog:
+    key = str(Path(db_path).resolve())
+    cat = _catalogs.get(key)
+    if cat is not None:
+        return cat
+    with _catalogs_lock:
+        cat = _catalogs.get(key)
+        if cat is None:
+            cat = SchemaCatalog(Path(key))
+            _catalogs[key] = cat
+    return cat
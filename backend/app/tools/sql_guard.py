@@ -0,0 +1,260 @@
+# /// Execution-time guardrails for SQLTool (on top of the regex checks in sql_tool)
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from time import perf_counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# /// read-only actions the authorizer lets through; everything else is denied at prepare time
+_ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+}
+_BLOCKED_FUNCTIONS = {"load_extension", "zeroblob", "randomblob", "readfile", "writefile", "edit"}
+# /// PRAGMAs the pool itself (setup, catalog, cache and aggregate checks) runs on its connections;
+# user SQL can never start with PRAGMA (sql_tool's SELECT-only check)
+_ALLOWED_PRAGMAS = {
+    "query_only", "cache_size", "mmap_size", "schema_version", "data_version",
+    "table_info", "index_list", "index_info",
+}
+# /// plan verdicts per (db, schema_version, sql, max_scan_rows); row estimates are upper bounds
+PLAN_CACHE_SIZE = int(os.getenv("SQL_PLAN_CACHE_SIZE", "1024"))
+
+_FROM_CLAUSE_RE = re.compile(
+    r"\bfrom\s+(.*?)(?=\bwhere\b|\bgroup\b|\border\b|\blimit\b|\bhaving\b|\bunion\b|[()]|$)", re.I | re.S
+)
+_TABLE_REF_RE = re.compile(r"^\s*([A-Za-z_]\w*)(?:\s+(?:as\s+)?([A-Za-z_]\w*))?", re.I)
+_REF_SPLIT_RE = re.compile(r",|\bjoin\b", re.I)
+# /// full table scans and full index scans both touch every row
+_SCAN_RE = re.compile(r"^SCAN (\w+)\b")
+_KEYWORDS = {
+    "where", "join", "inner", "left", "right", "outer", "cross", "on", "group",
+    "order", "limit", "natural", "using", "select",
+}
+
+
+@dataclass
+class GuardLimits:
+    max_scan_rows: int = int(os.getenv("SQL_MAX_SCAN_ROWS", "5000000"))
+    max_vm_steps: Optional[int] = int(os.getenv("SQL_MAX_VM_STEPS", "200000000"))
+    max_ms: Optional[float] = float(os.getenv("SQL_MAX_QUERY_MS", "5000"))
+    step_interval: int = 10_000
+
+
+DEFAULT_LIMITS = GuardLimits()
+# /// streams are meant to be long: a large VM-step budget and no wall-clock one. The progress
+# handler only runs inside fetchmany, so steps count SQLite's work and not the time a slow
+# client takes to read the response (which would otherwise eat the budget)
+STREAM_LIMITS = GuardLimits(max_vm_steps=int(os.getenv("SQL_STREAM_MAX_VM_STEPS", "2000000000")), max_ms=None)
+
+
+class SQLGuardError(ValueError):
+    """
+    Structured rejection/abort. code is one of:
+    not_authorized | plan_rejected | budget_exceeded
+    """
+
+    def __init__(self, code: str, message: str, elapsed_ms: float, detail: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.code = code
+        self.elapsed_ms = int(elapsed_ms)
+        self.detail = detail or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"error": self.code, "message": str(self), "elapsed_ms": self.elapsed_ms, **self.detail}
+
+
+def install_authorizer(conn: sqlite3.Connection) -> None:
+    """
+    Once per pooled connection (sqlite_pool.open_readonly). set_authorizer() expires every
+    prepared statement on the connection, so toggling it per query would throw away the
+    pool's statement cache.
+    """
+    conn.set_authorizer(_authorizer)
+
+
+def _authorizer(action: int, arg1, arg2, dbname, source) -> int:
+    if action == sqlite3.SQLITE_PRAGMA:
+        name = (arg1 or "").lower()
+        if name == "query_only" and arg2 is not None and str(arg2).lower() not in ("on", "1", "true"):
+            return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK if name in _ALLOWED_PRAGMAS else sqlite3.SQLITE_DENY
+    if action not in _ALLOWED_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_FUNCTION and (arg2 or "").lower() in _BLOCKED_FUNCTIONS:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+def _alias_map(sql: str) -> Dict[str, str]:
+    """
+    alias -> table for every table reference in FROM clauses (comma lists and JOINs).
+    """
+    out: Dict[str, str] = {}
+    for clause in _FROM_CLAUSE_RE.findall(sql):
+        for ref in _REF_SPLIT_RE.split(clause):
+            m = _TABLE_REF_RE.match(ref)
+            if not m or m.group(1).lower() in _KEYWORDS:
+                continue
+            table, alias = m.group(1), m.group(2)
+            out.setdefault(table, table)
+            if alias and alias.lower() not in _KEYWORDS:
+                out[alias] = table
+    return out
+
+
+def _row_estimate(conn: sqlite3.Connection, table: str, cache: Dict[str, int]) -> int:
+    if table not in cache:
+        try:
+            # /// O(log n) on rowid tables; good enough as an upper bound
+            cache[table] = int(conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0)
+        except sqlite3.DatabaseError:
+            cache[table] = 0
+    return cache[table]
+
+
+def check_plan(conn: sqlite3.Connection, sql: str, max_scan_rows: int, params=()) -> Dict[str, Any]:
+    """
+    EXPLAIN QUERY PLAN pre-check.
+    Sibling loops under the same parent are nested, so their full-scan sizes multiply;
+    index SEARCH steps count as 1. Rejects when the worst group exceeds max_scan_rows.
+    """
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    aliases = _alias_map(sql)
+    estimates: Dict[str, int] = {}
+
+    groups: Dict[int, int] = {}
+    scans: List[Dict[str, Any]] = []
+    for row in plan:
+        parent, detail = row[1], row[3]
+        m = _SCAN_RE.match(detail)
+        if not m or m.group(1) not in aliases:
+            continue
+        table = aliases[m.group(1)]
+        est = _row_estimate(conn, table, estimates)
+        scans.append({"table": table, "rows": est})
+        groups[parent] = groups.get(parent, 1) * max(est, 1)
+
+    cost = max(groups.values(), default=0)
+    info = {"plan": [r[3] for r in plan], "full_scans": scans, "estimated_rows": cost}
+    if cost > max_scan_rows:
+        raise SQLGuardError(
+            "plan_rejected",
+            f"Query plan would scan ~{cost} rows (limit {max_scan_rows}). Add a filter or use an indexed column.",
+            0.0,
+            {"full_scans": scans, "estimated_rows": cost},
+        )
+    return info
+
+
+class _PlanCache:
+    """
+    LRU of check_plan outcomes: EXPLAIN QUERY PLAN plus the MAX(rowid) probes run once per
+    query shape and schema, not on every call.
+    """
+
+    def __init__(self, size: int = PLAN_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], Optional[SQLGuardError]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def check(self, conn: sqlite3.Connection, db: Path, sql: str, max_scan_rows: int, params=()) -> Dict[str, Any]:
+        schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        key = (str(db), schema_version, sql, max_scan_rows)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if hit is None:
+            with self._lock:
+                self.misses += 1
+            try:
+                hit = (check_plan(conn, sql, max_scan_rows, params), None)
+            except SQLGuardError as e:
+                hit = ({}, e)
+            with self._lock:
+                self._entries[key] = hit
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        info, rejected = hit
+        if rejected is not None:
+            raise SQLGuardError(rejected.code, str(rejected), 0.0, dict(rejected.detail))
+        return info
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+plan_cache = _PlanCache()
+
+
+@contextmanager
+def guarded(
+    conn: sqlite3.Connection,
+    sql: str,
+    limits: GuardLimits = DEFAULT_LIMITS,
+    params=(),
+    db: Optional[Path] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Plan check + progress-handler budget around one query on a pooled connection (the
+    authorizer is already installed, see install_authorizer). Plan verdicts are cached
+    when `db` is given. The progress handler is removed again on exit.
+    """
+    start = perf_counter()
+    state = {"steps": 0, "aborted": None}
+    deadline = start + limits.max_ms / 1000 if limits.max_ms else None
+
+    def _progress() -> int:
+        state["steps"] += limits.step_interval
+        if limits.max_vm_steps and state["steps"] > limits.max_vm_steps:
+            state["aborted"] = f"VM step budget of {limits.max_vm_steps} exceeded"
+            return 1
+        if deadline and perf_counter() > deadline:
+            state["aborted"] = f"time budget of {int(limits.max_ms)} ms exceeded"
+            return 1
+        return 0
+
+    try:
+        try:
+            if db is not None:
+                info = plan_cache.check(conn, db, sql, limits.max_scan_rows, params)
+            else:
+                info = check_plan(conn, sql, limits.max_scan_rows, params)
+        except SQLGuardError as e:
+            e.elapsed_ms = int((perf_counter() - start) * 1000)
+            raise
+        except sqlite3.DatabaseError as e:
+            if "not authorized" in str(e):
+                elapsed_ms = (perf_counter() - start) * 1000
+                raise SQLGuardError("not_authorized", "Only read operations are allowed.", elapsed_ms)
+            raise
+
+        conn.set_progress_handler(_progress, limits.step_interval)
+        try:
+            yield info
+        except sqlite3.OperationalError:
+            if state["aborted"]:
+                raise SQLGuardError(
+                    "budget_exceeded",
+                    f"Query aborted: {state['aborted']}.",
+                    (perf_counter() - start) * 1000,
+                    {"vm_steps": state["steps"]},
+                )
+            raise
+    finally:
+        conn.set_progress_handler(None, 0)
@@ -1,11 +1,22 @@
 # /// Stage 5: SQL tool (read-only SELECT only, LIMIT enforced)
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import re
-import sqlite3
 from pathlib import Path
 from time import perf_counter
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.tools import sql_aggregates
+from app.tools.sql_cache import result_cache
+from app.tools.sql_catalog import get_catalog
+from app.tools.sql_guard import STREAM_LIMITS, guarded
+from app.tools.sqlite_pool import POOL_SIZE, get_pool
+from app.utils.admission import Bulkhead, admit, tool_bulkheads
+from app.utils.logger import event_span
+from app.utils.tracing import span
 
 DB_PATH = Path(__file__).resolve().parents[1] / "db" / "sample.sqlite"
 
@@ -16,7 +27,30 @@ def _normalize(sql: str) -> str:
     return " ".join(sql.strip().split())
 
 
-def _ensure_safe_select(sql: str) -> str:
+_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+PAGE_SIZE_MAX = 10_000
+STREAM_BATCH = 1000
+
+
+def _cap_stream_bulkhead() -> None:
+    # /// streams must never hold every pooled connection, or /sql/query and agent SQL calls
+    # block on the pool behind slow readers: at most POOL_SIZE - 1 concurrent streams
+    cap = max(1, POOL_SIZE - 1)
+    bh = tool_bulkheads.get("sql_stream")
+    if bh is None:
+        tool_bulkheads["sql_stream"] = Bulkhead("sql_stream", min(2, cap), 0)
+    elif bh.limit > cap:
+        bh.limit = cap
+
+
+_cap_stream_bulkhead()
+
+
+def _check_select(sql: str) -> str:
+    """
+    Validation shared by every entry point; returns normalized SQL without adding a LIMIT.
+    """
     sql_n = _normalize(sql)
 
     if not sql_n.lower().startswith("select"):
@@ -28,6 +62,12 @@ def _ensure_safe_select(sql: str) -> str:
     if BLOCKED.search(sql_n):
         raise ValueError("Dangerous keyword detected.")
 
+    return sql_n
+
+
+def _ensure_safe_select(sql: str) -> str:
+    sql_n = _check_select(sql)
+
     # /// enforce a hard LIMIT 50 if missing
     if re.search(r"\blimit\b", sql_n, re.I) is None:
         sql_n = f"{sql_n} LIMIT 50"
@@ -35,21 +75,44 @@ def _ensure_safe_select(sql: str) -> str:
     return sql_n
 
 
-def get_schema_text(db_path: Path = DB_PATH) -> str:
-    conn = sqlite3.connect(str(db_path))
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")
-    tables = [r[0] for r in cur.fetchall()]
+def _sql_fingerprint(sql: str) -> str:
+    return hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12]
+
+
+def _encode_token(sql: str, state: Dict[str, Any]) -> str:
+    raw = json.dumps({"h": _sql_fingerprint(sql), **state}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_token(sql: str, token: str) -> Dict[str, Any]:
+    try:
+        pad = "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(token + pad))
+    except Exception:
+        raise ValueError("Invalid page_token.")
+    if state.get("h") != _sql_fingerprint(sql):
+        raise ValueError("page_token does not belong to this query.")
+    return state
 
-    lines: List[str] = []
-    for t in tables:
-        cur.execute(f"PRAGMA table_info({t});")
-        cols = cur.fetchall()  # (cid, name, type, notnull, dflt_value, pk)
-        col_str = ", ".join([f"{c[1]} {c[2]}" for c in cols])
-        lines.append(f"{t}({col_str})")
 
-    conn.close()
-    return "\n".join(lines)
+def _shape_rows(columns: List[str], rows: List[tuple], fmt: str) -> Dict[str, Any]:
+    """
+    objects  -> [{col: val}, ...]  (legacy shape)
+    rows     -> columns once + [[v1, v2], ...]
+    columnar -> {col: [v, v, ...]}
+    """
+    if fmt == "objects":
+        return {"columns": columns, "rows": [dict(zip(columns, r)) for r in rows]}
+    if fmt == "rows":
+        return {"columns": columns, "rows": [list(r) for r in rows]}
+    if fmt == "columnar":
+        return {"columns": columns, "data": {c: [r[i] for r in rows] for i, c in enumerate(columns)}}
+    raise ValueError("format must be one of: objects, rows, columnar.")
+
+
+def get_schema_text(db_path: Path = DB_PATH) -> str:
+    # /// cached catalog; re-read only when PRAGMA schema_version changes
+    return get_catalog(db_path).schema_text()
 
 
 class SQLTool:
@@ -57,32 +120,182 @@ class SQLTool:
     description = "Execute read-only SELECT queries against local SQLite sample DB."
     input_schema = {
         "type": "object",
-        "properties": {"sql": {"type": "string"}},
+        "properties": {
+            "sql": {"type": "string"},
+            "use_cache": {"type": "boolean", "default": True},
+        },
         "required": ["sql"],
     }
 
+    def __init__(self, db_path: Path | None = None):
+        self.db_path = Path(db_path) if db_path else DB_PATH
+
     def run(self, input: Dict[str, Any]) -> Dict[str, Any]:
+        with admit("sql"), event_span("tool.sql", "sql") as meta:
+            out = self._run(input)
+            meta.update(rows=out["row_count"], cache_hit=out["cache"]["hit"], materialized=bool(out.get("materialized")))
+            return out
+
+    def _run(self, input: Dict[str, Any]) -> Dict[str, Any]:
         start = perf_counter()
         sql_raw = input.get("sql", "")
         sql = _ensure_safe_select(sql_raw)
+        use_cache = bool(input.get("use_cache", True))
 
-        conn = sqlite3.connect(str(DB_PATH))
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        # /// result cache keyed on normalized SQL, invalidated by data_version / file stat
+        with span("sql.cache_lookup") as sp:
+            version = result_cache.version(self.db_path) if use_cache else None
+            cached = result_cache.get(self.db_path, sql, version) if use_cache else None
+            sp.set(hit=cached is not None)
+        if cached is not None:
+            elapsed = (perf_counter() - start) * 1000
+            return {
+                "sql": sql,
+                "columns": list(cached.columns),
+                "rows": list(cached.rows),
+                "row_count": len(cached.rows),
+                "elapsed_ms": int(elapsed),
+                "cache": {"hit": True, "saved_ms": round(max(cached.compute_ms - elapsed, 0.0), 3)},
+            }
 
-        cur.execute(sql)
-        rows = cur.fetchall()
+        # /// pooled mode=ro connection (query_only, statement cache) instead of connect-per-query
+        q0 = perf_counter()
+        with get_pool(self.db_path).connection() as conn:
+            # /// template queries read the trigger-maintained aggregate tables when installed
+            with span("sql.rewrite"):
+                exec_sql, materialized = sql_aggregates.rewrite(conn, self.db_path, sql)
+            with span("sql.execute") as sp, guarded(conn, exec_sql, db=self.db_path):
+                cur = conn.execute(exec_sql)
+                rows = cur.fetchall()
+                sp.set(rows=len(rows))
 
-        cols = list(rows[0].keys()) if rows else []
-        data = [dict(r) for r in rows]
+        with span("sql.rows_to_dicts"):
+            cols = list(rows[0].keys()) if rows else []
+            data = [dict(r) for r in rows]
+        compute_ms = (perf_counter() - q0) * 1000
+        get_catalog(self.db_path).record_query(exec_sql, compute_ms)
 
-        conn.close()
+        if use_cache:
+            with span("sql.cache_put"):
+                result_cache.put(self.db_path, sql, version, cols, data, compute_ms)
 
         elapsed_ms = int((perf_counter() - start) * 1000)
-        return {
+        out = {
             "sql": sql,
             "columns": cols,
-            "rows": data,
+            "rows": list(data),
             "row_count": len(data),
             "elapsed_ms": elapsed_ms,
+            "cache": {"hit": False, "saved_ms": 0.0},
         }
+        if materialized:
+            out["materialized"] = {"table": materialized, "executed_sql": exec_sql}
+        return out
+
+    def page(
+        self,
+        sql: str,
+        page_size: int = 100,
+        page_token: Optional[str] = None,
+        fmt: str = "rows",
+        keyset: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of an arbitrary SELECT (no forced LIMIT 50).
+        - offset cursors by default
+        - keyset cursors when `keyset` names a unique, orderable result column
+        The returned next_page_token is opaque and bound to this SQL text.
+        """
+        start = perf_counter()
+        sql_n = _check_select(sql)
+        page_size = max(1, min(int(page_size), PAGE_SIZE_MAX))
+        state = _decode_token(sql_n, page_token) if page_token else {}
+
+        if keyset:
+            if not _IDENT_RE.match(keyset):
+                raise ValueError("keyset must be a plain column name.")
+            params: List[Any] = []
+            where = ""
+            if "k" in state:
+                where = f' WHERE "{keyset}" > ?'
+                params.append(state["k"])
+            paged = f'SELECT * FROM ({sql_n}) AS q{where} ORDER BY "{keyset}" LIMIT ?'
+            params.append(page_size + 1)
+        else:
+            offset = int(state.get("o", 0))
+            paged = f"SELECT * FROM ({sql_n}) AS q LIMIT ? OFFSET ?"
+            params = [page_size + 1, offset]
+
+        with admit("sql"), get_pool(self.db_path).connection() as conn, guarded(conn, paged, params=params, db=self.db_path):
+            cur = conn.cursor()
+            cur.row_factory = None  # plain tuples: no per-row dict/Row building
+            cur.execute(paged, params)
+            columns = [d[0] for d in cur.description or []]
+            rows = cur.fetchmany(page_size + 1)
+
+        get_catalog(self.db_path).record_query(sql_n, (perf_counter() - start) * 1000)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        next_token = None
+        if has_more:
+            if keyset:
+                next_token = _encode_token(sql_n, {"k": rows[-1][columns.index(keyset)]})
+            else:
+                next_token = _encode_token(sql_n, {"o": int(state.get("o", 0)) + len(rows)})
+
+        out = {"sql": sql_n, **_shape_rows(columns, rows, fmt)}
+        out.update(
+            {
+                "row_count": len(rows),
+                "next_page_token": next_token,
+                "elapsed_ms": int((perf_counter() - start) * 1000),
+            }
+        )
+        return out
+
+    def stream_ndjson(self, sql: str, batch_size: int = STREAM_BATCH) -> Iterator[str]:
+        """
+        NDJSON lines: {"columns": [...]}, then one JSON array per row,
+        then {"row_count": n, "elapsed_ms": ms}. Rows are pulled with fetchmany,
+        so memory stays flat regardless of result size.
+        The query is executed before returning, so SQL errors (and Overloaded
+        from the sql_stream bulkhead) raise here rather than midway through the
+        response. The bulkhead slot and the pooled connection are held until the
+        stream is exhausted or closed.
+        """
+        sql_n = _check_select(sql)
+
+        # /// one encoder for the whole stream (json.dumps(default=...) builds a new one per call)
+        encode = json.JSONEncoder(default=str).encode
+
+        def gen() -> Iterator[str]:
+            start = perf_counter()
+            n = 0
+            with admit("sql_stream"), get_pool(self.db_path).connection() as conn, guarded(conn, sql_n, STREAM_LIMITS, db=self.db_path):
+                cur = conn.cursor()
+                cur.row_factory = None
+                cur.execute(sql_n)
+                yield json.dumps({"columns": [d[0] for d in cur.description or []]}) + "\n"
+                while True:
+                    batch = cur.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    n += len(batch)
+                    yield "\n".join(map(encode, batch)) + "\n"
+                cur.close()
+            yield json.dumps({"row_count": n, "elapsed_ms": int((perf_counter() - start) * 1000)}) + "\n"
+
+        it = gen()
+        header = next(it)
+
+        def primed() -> Iterator[str]:
+            try:
+                yield header
+                yield from it
+            finally:
+                # /// closed before reaching `yield from` (client gone after the header):
+                # release the bulkhead slot and the connection now, not at GC time
+                it.close()
+
+        return primed()
@@ -0,0 +1,118 @@
+# /// Read-only SQLite connection pool shared by request threads
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+from app.tools.sql_guard import install_authorizer
+
+POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "8"))
+# /// prepared statements kept per connection (templates x LIMIT variants fit easily)
+STATEMENT_CACHE = int(os.getenv("SQL_STATEMENT_CACHE", "256"))
+CACHE_KIB = int(os.getenv("SQL_CACHE_KIB", "16384"))
+MMAP_BYTES = int(os.getenv("SQL_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+
+def open_readonly(db_path: Path) -> sqlite3.Connection:
+    """
+    mode=ro URI connection with query_only on, tuned page cache and mmap, and the
+    read-only authorizer from sql_guard.
+    check_same_thread=False: the pool hands each connection to one thread at a time.
+    """
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+    # /// installed once here: re-installing per query would expire the statement cache
+    install_authorizer(conn)
+    return conn
+
+
+class SQLitePool:
+    """
+    Fixed-size LIFO pool of read-only connections.
+    Connections are opened lazily up to `size`; callers block when all are busy.
+    """
+
+    def __init__(self, db_path: Path, size: int = POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.size = max(1, int(size))
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout: float | None) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return open_readonly(self.db_path)
+                except Exception:
+                    self._opened -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection available for {self.db_path.name}")
+
+    @contextmanager
+    def connection(self, timeout: float | None = 30.0) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire(timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools: Dict[str, SQLitePool] = {}
+_pools_lock = threading.Lock()
+
+
+def _after_fork() -> None:
+    # /// SQLite connections must not cross fork(): children open their own pools
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    _pools.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_pool(db_path: Path) -> SQLitePool:
+    key = str(Path(db_path).resolve())
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLitePool(Path(key))
+            _pools[key] = pool
+    return pool
@@ -0,0 +1,130 @@
+# /// In-memory index over web_cache.json (exact dict + token inverted index, hot reload)
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# /// fuzzy matches below this token-overlap score are ignored (unless one query contains the other)
+FUZZY_MIN_SCORE = float(os.getenv("WEB_CACHE_FUZZY_MIN", "0.5"))
+# /// tokens on more keys than this are too common to drive candidate selection
+_MAX_POSTING = 5000
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_query(q: str) -> str:
+    return " ".join((q or "").strip().lower().split())
+
+
+def _tokens(qn: str) -> List[str]:
+    return _TOKEN_RE.findall(qn)
+
+
+class _Snapshot:
+    """
+    Immutable view of one version of the cache file.
+    """
+
+    def __init__(self, data: Dict[str, List[Dict[str, str]]], stamp: Tuple[int, int]):
+        self.stamp = stamp
+        self.exact: Dict[str, List[Dict[str, str]]] = {}
+        self.keys: List[str] = []
+        self.key_tokens: List[frozenset] = []
+        self.postings: Dict[str, List[int]] = {}
+
+        for raw_key, items in data.items():
+            key = normalize_query(raw_key)
+            if key in self.exact:
+                continue
+            idx = len(self.keys)
+            self.exact[key] = items
+            self.keys.append(key)
+            toks = frozenset(_tokens(key))
+            self.key_tokens.append(toks)
+            for t in toks:
+                self.postings.setdefault(t, []).append(idx)
+
+
+class WebCacheIndex:
+    """
+    web_cache.json loaded once into memory:
+    - exact-match dict on the normalized query
+    - token inverted index for fuzzy lookups, ranked by best match
+    - hot reload when the file's mtime/size changes
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._snap: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _stamp(self) -> Tuple[int, int]:
+        try:
+            st = self.path.stat()
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return 0, 0
+
+    def snapshot(self) -> _Snapshot:
+        stamp = self._stamp()
+        snap = self._snap
+        if snap is not None and snap.stamp == stamp:
+            return snap
+
+        with self._lock:
+            if self._snap is not None and self._snap.stamp == stamp:
+                return self._snap
+            data: Dict[str, Any] = {}
+            if stamp != (0, 0):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            self._snap = _Snapshot(data, stamp)
+            self.reloads += 1
+            return self._snap
+
+    def lookup(self, query: str) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """
+        Returns (matched cache key, items). Exact match first, else the best fuzzy match.
+        """
+        snap = self.snapshot()
+        qn = normalize_query(query)
+        if not qn:
+            return None, []
+
+        items = snap.exact.get(qn)
+        if items is not None:
+            return qn, items
+
+        q_toks = set(_tokens(qn))
+        if not q_toks:
+            return None, []
+
+        postings = [snap.postings[t] for t in q_toks if t in snap.postings]
+        selective = [p for p in postings if len(p) <= _MAX_POSTING]
+        counts: Counter = Counter()
+        for p in selective or postings:
+            counts.update(p)
+
+        best: Optional[Tuple[Tuple[int, float, int], int]] = None
+        for idx in counts:
+            key = snap.keys[idx]
+            k_toks = snap.key_tokens[idx]
+            overlap = len(q_toks & k_toks)
+            score = overlap / len(q_toks | k_toks)
+            contains = 1 if (key in qn or qn in key) else 0
+            if not contains and score < FUZZY_MIN_SCORE:
+                continue
+            rank = (contains, score, -idx)  # earlier keys win ties (old first-hit order)
+            if best is None or rank > best[0]:
+                best = (rank, idx)
+
+        if best is None:
+            return None, []
+        key = snap.keys[best[1]]
+        return key, snap.exact[key]
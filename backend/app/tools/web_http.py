@@ -0,0 +1,276 @@
+# /// Live search transport: pooled keep-alive session, per-host limits, first-good-answer fan-out, circuit breakers
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote_plus, urlparse
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except Exception:
+    requests = None
+    HTTPAdapter = None
+
+PER_HOST_LIMIT = int(os.getenv("WEB_PER_HOST_LIMIT", "4"))
+# /// how long a query waits (in total, across providers) for a saturated host to free a slot
+HOST_WAIT_S = float(os.getenv("WEB_HOST_WAIT_S", "0.5"))
+CONNECT_TIMEOUT_S = float(os.getenv("WEB_CONNECT_TIMEOUT_S", "3"))
+READ_TIMEOUT_S = float(os.getenv("WEB_READ_TIMEOUT_S", "8"))
+# /// consecutive failures before a provider's breaker opens, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("WEB_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_S = float(os.getenv("WEB_BREAKER_COOLDOWN_S", "30"))
+# /// queries no provider could answer are remembered this long
+NEGATIVE_TTL_S = float(os.getenv("WEB_NEGATIVE_TTL_S", "60"))
+NEGATIVE_MAX = int(os.getenv("WEB_NEGATIVE_MAX", "1024"))
+
+
+class LiveSearchError(RuntimeError):
+    """
+    Every provider failed (errors, open breakers, or a recent failure still negatively cached).
+    An empty answer from a provider that responded is not an error.
+    """
+
+    def __init__(self, query: str, attempts: List[Dict[str, Any]], negative_cache: bool = False):
+        if negative_cache:
+            why = "failed recently (negatively cached)"
+        else:
+            why = ", ".join(f"{a['provider']}: {a.get('error') or a['status']}" for a in attempts) or "no providers"
+        super().__init__(f"Live search for {query!r} failed: {why}")
+        self.attempts = attempts
+        self.negative_cache = negative_cache
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive errors; open -> half_open after `cooldown_s`;
+    one trial call in half_open closes it again on success or re-opens it on error.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown_s: float = BREAKER_COOLDOWN_S):
+        self.failures = failures
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._errors = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self._errors = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._errors += 1
+            if self._trial or self._errors >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+@dataclass
+class SearchProvider:
+    name: str
+    url: str  # query is appended as ?q=...
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    @property
+    def host(self) -> str:
+        return urlparse(self.url).netloc
+
+
+class LiveSearchClient:
+    """
+    Shared keep-alive session for every provider.
+    - at most PER_HOST_LIMIT requests in flight per host; a query waits up to HOST_WAIT_S for a slot,
+      then skips a still-saturated host (slow losers of earlier races must not stall new work).
+      A host that was only busy does not count as failed and is never negatively cached.
+    - all providers whose breaker allows it are queried at once; the first non-empty parse wins
+    - queries that every provider failed on are negatively cached for NEGATIVE_TTL_S
+      (at most negative_max keys, oldest dropped first)
+    """
+
+    def __init__(
+        self,
+        providers: List[SearchProvider],
+        parse: Callable[[str, int], List[Any]],
+        headers: Optional[Dict[str, str]] = None,
+        per_host_limit: int = PER_HOST_LIMIT,
+        host_wait_s: float = HOST_WAIT_S,
+        timeout: Tuple[float, float] = (CONNECT_TIMEOUT_S, READ_TIMEOUT_S),
+        negative_ttl_s: float = NEGATIVE_TTL_S,
+        negative_max: int = NEGATIVE_MAX,
+    ):
+        self.providers = providers
+        self.parse = parse
+        self.headers = headers or {}
+        self.per_host_limit = per_host_limit
+        self.host_wait_s = max(0.0, host_wait_s)
+        self.timeout = timeout
+        self.negative_ttl_s = negative_ttl_s
+        self.negative_max = max(1, negative_max)
+        self._session = None
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        # /// key -> expiry; insertion order == expiry order (one TTL), so expired keys sit at the front
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # /// one worker per possible in-flight request, so a granted host slot never waits for a thread
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, len(providers) * per_host_limit), thread_name_prefix="web-fetch"
+        )
+        self.stats: Dict[str, int] = {
+            "requests": 0, "wins": 0, "failures": 0, "negative_hits": 0, "short_circuits": 0, "host_busy": 0,
+        }
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    s = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=len(self.providers) or 1, pool_maxsize=self.per_host_limit)
+                    s.mount("http://", adapter)
+                    s.mount("https://", adapter)
+                    s.headers.update(self.headers)
+                    self._session = s
+        return self._session
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._host_slots.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = sem
+        return sem
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _fetch_one(self, provider: SearchProvider, query: str, max_results: int) -> List[Any]:
+        # /// caller already holds this provider's host slot
+        try:
+            self._bump("requests")
+            r = self._get_session().get(f"{provider.url}?q={quote_plus(query)}", timeout=self.timeout)
+            r.raise_for_status()
+            return self.parse(r.text, max_results)
+        finally:
+            self._slot(provider.host).release()
+
+    def search(self, query: str, max_results: int) -> Dict[str, Any]:
+        """
+        Returns {"results", "provider", "attempts", "failed"}; provider is None when nothing
+        answered, and failed is True when no provider responded and none was merely busy
+        (see LiveSearchError).
+        """
+        q = (query or "").strip()
+        if requests is None or not q:
+            return {"results": [], "provider": None, "attempts": [], "failed": False}
+
+        key = " ".join(q.lower().split())
+        with self._lock:
+            until = self._negative.get(key)
+            if until is not None and until <= time.monotonic():
+                self._negative.pop(key, None)
+                until = None
+        if until is not None:
+            self._bump("negative_hits")
+            return {"results": [], "provider": None, "attempts": [], "failed": True, "negative_cache": True}
+
+        live: List[SearchProvider] = []
+        attempts: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.host_wait_s
+        for p in self.providers:
+            slot = self._slot(p.host)
+            if not slot.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                self._bump("host_busy")
+                attempts.append({"provider": p.name, "status": "host_busy"})
+            elif not p.breaker.allow():
+                slot.release()
+                attempts.append({"provider": p.name, "status": "circuit_open"})
+            else:
+                live.append(p)
+        busy = any(a["status"] == "host_busy" for a in attempts)
+        if not live:
+            self._bump("short_circuits")
+            return {"results": [], "provider": None, "attempts": attempts, "failed": not busy}
+
+        t0 = time.perf_counter()
+        pending = {self._pool.submit(self._fetch_one, p, q, max_results): p for p in live}
+        winner: Optional[SearchProvider] = None
+        results: List[Any] = []
+        any_ok = False
+        while pending and winner is None:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                p = pending.pop(fut)
+                ms = round((time.perf_counter() - t0) * 1000, 1)
+                try:
+                    found = fut.result()
+                except Exception as e:
+                    p.breaker.failure()
+                    self._bump("failures")
+                    attempts.append({"provider": p.name, "status": "error", "error": type(e).__name__, "ms": ms})
+                    continue
+                p.breaker.success()
+                any_ok = True
+                attempts.append({"provider": p.name, "status": "ok" if found else "empty", "ms": ms})
+                if found and winner is None:
+                    winner, results = p, found
+
+        # /// losers keep running to completion in the pool; their outcome still feeds the breakers
+        for fut, p in pending.items():
+            fut.add_done_callback(lambda f, p=p: p.breaker.failure() if f.exception() else p.breaker.success())
+            attempts.append({"provider": p.name, "status": "abandoned"})
+
+        if winner is not None:
+            self._bump("wins")
+        elif not any_ok and not busy:
+            self._remember_failure(key)
+        return {
+            "results": results,
+            "provider": winner.name if winner else None,
+            "attempts": attempts,
+            "failed": winner is None and not any_ok and not busy,
+        }
+
+    def _remember_failure(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            neg = self._negative
+            neg.pop(key, None)
+            neg[key] = now + self.negative_ttl_s
+            # /// prune on insert: lookups only ever drop the key they look at
+            while neg:
+                oldest, until = next(iter(neg.items()))
+                if until > now and len(neg) <= self.negative_max:
+                    break
+                del neg[oldest]
+
+    def breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        return {p.name: {"state": p.breaker.state, "rejected": p.breaker.rejected} for p in self.providers}
@@ -0,0 +1,313 @@
+# /// DDG HTML result extraction: pluggable parsers (bs4 reference, streaming stdlib, optional lxml)
+from __future__ import annotations
+
+import os
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from bs4 import BeautifulSoup
+except Exception:
+    BeautifulSoup = None
+
+try:
+    import lxml.html as lxml_html
+except Exception:
+    lxml_html = None
+
+# /// auto | stream | lxml | bs4   (auto = stream: bs4-identical output; lxml is opt-in, see parse_lxml)
+PARSER = os.getenv("WEB_HTML_PARSER", "auto").strip().lower()
+
+# (title, url, snippet)
+Triple = Tuple[str, str, str]
+
+# /// text under these tags is not part of get_text() in bs4 (Script/Stylesheet/TemplateString/Ruby*)
+_HIDDEN_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+    "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+    "command", "frame", "image", "isindex", "nextid", "spacer",
+}
+
+
+def parse_bs4(html: str, max_results: int) -> List[Triple]:
+    """
+    Reference implementation (the original WebTool parser): full tree + CSS select.
+    """
+    if BeautifulSoup is None:
+        return []
+
+    soup = BeautifulSoup(html, "html.parser")
+    results: List[Triple] = []
+
+    for res in soup.select(".result"):
+        a = res.select_one("a.result__a")
+        snip = res.select_one(".result__snippet")
+        if not a:
+            continue
+
+        title = a.get_text(" ", strip=True)
+        href = (a.get("href") or "").strip()
+        snippet = snip.get_text(" ", strip=True) if snip else ""
+
+        if not href.startswith("http"):
+            continue
+
+        results.append((title, href, snippet))
+        if len(results) >= max_results:
+            break
+
+    return results
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _Capture:
+    """Text of one element (a.result__a or .result__snippet), collected like get_text(' ', strip=True)."""
+
+    __slots__ = ("depth", "parts", "href")
+
+    def __init__(self, depth: int, href: str = ""):
+        self.depth = depth
+        self.parts: List[str] = []
+        self.href = href
+
+
+class _Slot:
+    """One `.result` element, in document order."""
+
+    __slots__ = ("depth", "a", "snippet", "done")
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.a: Optional[_Capture] = None
+        self.snippet: Optional[_Capture] = None
+        self.done = False
+
+
+class _StreamingDDGParser(HTMLParser):
+    """
+    Single pass over the markup with no tree. Tracks the open-element stack the
+    same way bs4's html.parser builder does (void tags never open, an end tag
+    closes back to the nearest matching start, unknown end tags are ignored),
+    and stops as soon as the first `max_results` valid results are complete.
+    """
+
+    def __init__(self, max_results: int):
+        super().__init__(convert_charrefs=True)
+        self.max_results = max_results
+        self.stack: List[str] = []
+        self.hidden = 0  # open script/style/template/rt/rp elements
+        self.slots: List[_Slot] = []
+        self.open_slots: List[_Slot] = []
+        self.captures: List[_Capture] = []
+        self.text: List[str] = []
+        self.emitted = 0
+        self.results: List[Triple] = []
+
+    # ---- text ----------------------------------------------------------
+
+    def handle_data(self, data: str) -> None:
+        self.text.append(data)
+
+    def _flush(self) -> None:
+        if not self.text:
+            return
+        s = "".join(self.text).strip()
+        self.text = []
+        if s and not self.hidden:
+            for c in self.captures:
+                c.parts.append(s)
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            # /// bs4 keeps CDATA sections as text
+            self.text.append(data[len("CDATA["):])
+            self._flush()
+
+    # ---- elements ------------------------------------------------------
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self._flush()
+        if tag in _VOID_TAGS:
+            return
+        a = dict(attrs)  # duplicate attributes: last one wins, as in bs4
+        classes = (a.get("class") or "").split()
+        depth = len(self.stack)
+        self.stack.append(tag)
+        if tag in _HIDDEN_TEXT_TAGS:
+            self.hidden += 1
+
+        if "result" in classes:
+            slot = _Slot(depth)
+            self.slots.append(slot)
+            self.open_slots.append(slot)
+        if not self.open_slots:
+            return
+        is_link = tag == "a" and "result__a" in classes
+        is_snip = "result__snippet" in classes
+        if not (is_link or is_snip):
+            return
+        cap = _Capture(depth, (a.get("href") or "") if is_link else "")
+        taken = False
+        for slot in self.open_slots:
+            if is_link and slot.a is None:
+                slot.a = cap
+                taken = True
+            if is_snip and slot.snippet is None:
+                slot.snippet = cap
+                taken = True
+        if taken:
+            self.captures.append(cap)
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush()
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i] == tag:
+                break
+        else:
+            return
+        for closed in self.stack[i:]:
+            if closed in _HIDDEN_TEXT_TAGS:
+                self.hidden -= 1
+        del self.stack[i:]
+
+        if self.captures and self.captures[-1].depth >= i:
+            self.captures = [c for c in self.captures if c.depth < i]
+        if self.open_slots and self.open_slots[-1].depth >= i:
+            still_open = []
+            for slot in self.open_slots:
+                if slot.depth >= i:
+                    slot.done = True
+                else:
+                    still_open.append(slot)
+            self.open_slots = still_open
+            self._emit()
+
+    def _emit(self) -> None:
+        while self.emitted < len(self.slots) and self.slots[self.emitted].done:
+            slot = self.slots[self.emitted]
+            self.emitted += 1
+            if slot.a is None:
+                continue
+            href = slot.a.href.strip()
+            if not href.startswith("http"):
+                continue
+            snippet = " ".join(slot.snippet.parts) if slot.snippet else ""
+            self.results.append((" ".join(slot.a.parts), href, snippet))
+            if len(self.results) >= self.max_results:
+                raise _StopParsing
+
+    def finish(self) -> List[Triple]:
+        self._flush()
+        for slot in self.open_slots:
+            slot.done = True
+        self.open_slots = []
+        try:
+            self._emit()
+        except _StopParsing:
+            pass
+        return self.results[: self.max_results]
+
+
+def parse_stream(html: str, max_results: int) -> List[Triple]:
+    """
+    Streaming stdlib extraction; same output as parse_bs4, stops after max_results.
+    """
+    if max_results <= 0:
+        return []
+    p = _StreamingDDGParser(max_results)
+    try:
+        p.feed(html)
+        p.close()
+    except _StopParsing:
+        return p.results
+    return p.finish()
+
+
+def _lxml_text(el) -> str:
+    parts: List[str] = []
+
+    def walk(node, hidden: bool) -> None:
+        hidden = hidden or node.tag in _HIDDEN_TEXT_TAGS
+        if node.text and not hidden:
+            s = node.text.strip()
+            if s:
+                parts.append(s)
+        for child in node:
+            if isinstance(child.tag, str):
+                walk(child, hidden)
+            if child.tail and not hidden:
+                s = child.tail.strip()
+                if s:
+                    parts.append(s)
+
+    walk(el, False)
+    return " ".join(parts)
+
+
+_HAS_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+
+
+def parse_lxml(html: str, max_results: int) -> List[Triple]:
+    """
+    libxml2-backed extraction (C parser + XPath). Opt-in (WEB_HTML_PARSER=lxml) and only
+    when lxml is installed: identical to bs4 on well-formed result pages, but libxml2 repairs
+    broken markup differently from html.parser (duplicate attributes, blocks nested in <p>),
+    so odd pages can yield different or fewer results.
+    """
+    if lxml_html is None or max_results <= 0 or not html.strip():
+        return []
+    try:
+        root = lxml_html.document_fromstring(html)
+    except (ValueError, lxml_html.etree.ParserError):
+        return parse_stream(html, max_results)
+    results: List[Triple] = []
+    for res in root.xpath("//*[" + _HAS_CLASS.format("result") + "]"):
+        links = res.xpath(".//a[" + _HAS_CLASS.format("result__a") + "]")
+        if not links:
+            continue
+        a = links[0]
+        href = (a.get("href") or "").strip()
+        if not href.startswith("http"):
+            continue
+        snips = res.xpath(".//*[" + _HAS_CLASS.format("result__snippet") + "]")
+        results.append((_lxml_text(a), href, _lxml_text(snips[0]) if snips else ""))
+        if len(results) >= max_results:
+            break
+    return results
+
+
+PARSERS: Dict[str, Callable[[str, int], List[Triple]]] = {
+    "bs4": parse_bs4,
+    "stream": parse_stream,
+    "lxml": parse_lxml,
+}
+
+
+def get_parser(name: str = PARSER) -> Callable[[str, int], List[Triple]]:
+    name = (name or "auto").lower()
+    if name == "auto":
+        name = "stream"
+    if name == "lxml" and lxml_html is None:
+        name = "stream"
+    if name not in PARSERS:
+        raise ValueError(f"unknown HTML parser: {name} (expected one of auto, {', '.join(PARSERS)})")
+    return PARSERS[name]
@@ -0,0 +1,225 @@
+# /// Persistent write-through cache for live web results (SQLite, TTL + LRU, stale-while-revalidate)
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+_DB_DIR = Path(__file__).resolve().parent.parent / "db"
+
+DEFAULT_PATH = Path(os.getenv("WEB_LIVE_CACHE_PATH", str(_DB_DIR / "web_live_cache.sqlite")))
+TTL_S = float(os.getenv("WEB_LIVE_TTL_S", "3600"))
+# /// how long past expiry an entry may still be served while a refresh runs
+STALE_S = float(os.getenv("WEB_LIVE_STALE_S", "86400"))
+MAX_ENTRIES = int(os.getenv("WEB_LIVE_CACHE_ENTRIES", "5000"))
+MAX_BYTES = int(os.getenv("WEB_LIVE_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+
+@dataclass
+class StoredResults:
+    key: str
+    items: List[Dict[str, str]]
+    fetched_at: float
+    expires_at: float
+    stale_until: float
+    fetch_limit: int
+
+    def state(self, now: float) -> str:
+        if now < self.expires_at:
+            return "fresh"
+        if now < self.stale_until:
+            return "stale"
+        return "expired"
+
+
+class WebResultStore:
+    """
+    One row per normalized query, written through on every live fetch.
+    - per-entry TTL (expires_at) plus a stale window (stale_until)
+    - LRU eviction on last_access when over the entry-count or byte limit
+    - background revalidation, at most one in flight per key
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_PATH,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._refreshing: set[str] = set()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="web-revalidate")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS web_results (
+                    key TEXT PRIMARY KEY,
+                    items TEXT NOT NULL,
+                    fetch_limit INTEGER NOT NULL,
+                    nbytes INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    stale_until REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS idx_web_results_lru ON web_results (last_access)")
+            self._conn = con
+        return self._conn
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[StoredResults]:
+        now = time.time() if now is None else now
+        with self._lock:
+            con = self._db()
+            row = con.execute(
+                "SELECT items, fetched_at, expires_at, stale_until, fetch_limit FROM web_results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            con.execute("UPDATE web_results SET last_access = ? WHERE key = ?", (now, key))
+        return StoredResults(key, json.loads(row[0]), row[1], row[2], row[3], row[4])
+
+    def put(
+        self,
+        key: str,
+        items: List[Dict[str, str]],
+        fetch_limit: int,
+        ttl_s: float = TTL_S,
+        stale_s: float = STALE_S,
+        now: Optional[float] = None,
+    ) -> None:
+        now = time.time() if now is None else now
+        payload = json.dumps(items, ensure_ascii=False)
+        nbytes = len(payload.encode("utf-8")) + len(key)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            con = self._db()
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.execute(
+                    """
+                    INSERT INTO web_results (key, items, fetch_limit, nbytes, fetched_at, expires_at, stale_until, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                      items = excluded.items,
+                      fetch_limit = excluded.fetch_limit,
+                      nbytes = excluded.nbytes,
+                      fetched_at = excluded.fetched_at,
+                      expires_at = excluded.expires_at,
+                      stale_until = excluded.stale_until,
+                      last_access = excluded.last_access
+                    """,
+                    (key, payload, int(fetch_limit), nbytes, now, now + ttl_s, now + ttl_s + stale_s, now),
+                )
+                self._evict(con)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+
+    def _evict(self, con: sqlite3.Connection) -> None:
+        count, total = con.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM web_results").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        victims = []
+        for key, nbytes in con.execute("SELECT key, nbytes FROM web_results ORDER BY last_access ASC"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= nbytes
+        con.executemany("DELETE FROM web_results WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def fetch(
+        self,
+        key: str,
+        max_results: int,
+        loader: Callable[[int], List[Dict[str, str]]],
+        fetch_limit: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        Serve `key` from the store when possible, otherwise call loader(limit) and write through.
+        Returns {"items", "cache": fresh|stale|miss, "age_s"}.
+        """
+        now = time.time()
+        entry = self.get(key, now=now)
+        if entry is not None and entry.fetch_limit >= max_results:
+            state = entry.state(now)
+            if state != "expired":
+                if state == "stale":
+                    self.stale_hits += 1
+                    self._revalidate(key, loader, max(fetch_limit, max_results))
+                else:
+                    self.hits += 1
+                return {"items": entry.items[:max_results], "cache": state, "age_s": round(now - entry.fetched_at, 3)}
+
+        self.misses += 1
+        limit = max(fetch_limit, max_results)
+        items = loader(limit)
+        if items:
+            self.put(key, items, limit)
+        return {"items": items[:max_results], "cache": "miss", "age_s": 0.0}
+
+    def _revalidate(self, key: str, loader: Callable[[int], List[Dict[str, str]]], limit: int) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _job() -> None:
+            try:
+                items = loader(limit)
+                if items:
+                    self.put(key, items, limit)
+            except Exception:
+                pass  # keep serving the stale copy; the next stale hit retries
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresher.submit(_job)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db().execute("DELETE FROM web_results")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM web_results"
+            ).fetchone()
+            refreshing = len(self._refreshing)
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshing": refreshing,
+        }
@@ -1,25 +1,40 @@
 from __future__ import annotations
 
-import json
+import os
 import time
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Dict, List
-from urllib.parse import quote_plus
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from app.tools.web_cache import WebCacheIndex, normalize_query
+from app.tools.web_http import LiveSearchClient, LiveSearchError, SearchProvider
+from app.tools.web_parse import get_parser
+from app.tools.web_store import WebResultStore
+from app.utils import metrics
+from app.utils.admission import admit
+from app.utils.logger import event_span
+from app.utils.tracing import span
 
 # NOTE:
 # - Stage 6 allows cached web results for reliability in demo environments.
 # - We keep an optional live DuckDuckGo fetch, but cached results are preferred.
 
-try:
-    import requests
-    from bs4 import BeautifulSoup
-except Exception:
-    requests = None
-    BeautifulSoup = None
-
-
 CACHE_PATH = Path(__file__).with_name("web_cache.json")
+# /// comma-separated DDG-HTML-compatible endpoints, raced per query (first good answer wins);
+# overridable so tests/benchmarks can point live mode at a local stand-in server
+SEARCH_URLS = [
+    u.strip()
+    for u in os.getenv("WEB_SEARCH_URLS", "https://duckduckgo.com/html/,https://html.duckduckgo.com/html/").split(",")
+    if u.strip()
+]
+
+# /// loaded once, hot-reloaded on mtime/size change (was: json.load on every query)
+_cache_index = WebCacheIndex(CACHE_PATH)
+# /// WEB_HTML_PARSER: auto | stream | lxml | bs4 (see web_parse)
+_html_parser = get_parser()
+# /// live results are written through here (TTL + LRU, stale-while-revalidate)
+_live_store = WebResultStore()
 
 
 @dataclass
@@ -29,31 +44,10 @@ class WebResult:
     snippet: str
 
 
-def _load_cache() -> Dict[str, List[Dict[str, str]]]:
-    if not CACHE_PATH.exists():
-        return {}
-    with open(CACHE_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _normalize_query(q: str) -> str:
-    return " ".join((q or "").strip().lower().split())
-
-
 def _cached_search(query: str, max_results: int) -> List[WebResult]:
-    cache = _load_cache()
-    qn = _normalize_query(query)
-
-    # direct hit
-    if qn in cache:
-        return [WebResult(**r) for r in cache[qn][:max_results]]
-
-    # fuzzy contains match
-    for key, items in cache.items():
-        if key in qn or qn in key:
-            return [WebResult(**r) for r in items[:max_results]]
-
-    return []
+    _key, items = _cache_index.lookup(query)
+    (metrics.cache_hits if items else metrics.cache_misses).inc("web_cached")
+    return [WebResult(**r) for r in items[:max_results]]
 
 
 def _ua_headers() -> Dict[str, str]:
@@ -67,45 +61,24 @@ def _ua_headers() -> Dict[str, str]:
 
 
 def _parse_ddg_html(html: str, max_results: int) -> List[WebResult]:
-    if BeautifulSoup is None:
-        return []
-
-    soup = BeautifulSoup(html, "html.parser")
-    results: List[WebResult] = []
-
-    for res in soup.select(".result"):
-        a = res.select_one("a.result__a")
-        snip = res.select_one(".result__snippet")
-        if not a:
-            continue
-
-        title = a.get_text(" ", strip=True)
-        href = (a.get("href") or "").strip()
-        snippet = snip.get_text(" ", strip=True) if snip else ""
+    return [WebResult(*t) for t in _html_parser(html, max_results)]
 
-        if not href.startswith("http"):
-            continue
 
-        results.append(WebResult(title=title, url=href, snippet=snippet))
-        if len(results) >= max_results:
-            break
+def make_live_client(urls: List[str]) -> LiveSearchClient:
+    providers = [SearchProvider(name=urlparse(u).netloc or u, url=u) for u in urls]
+    return LiveSearchClient(providers, parse=_parse_ddg_html, headers=_ua_headers())
 
-    return results
 
+_live_client = make_live_client(SEARCH_URLS)
 
-def _live_ddg_search(query: str, max_results: int, timeout_s: int = 20) -> List[WebResult]:
-    # optional live mode (may be blocked on some networks)
-    if requests is None:
-        return []
 
-    q = (query or "").strip()
-    if not q:
-        return []
-
-    url = f"https://duckduckgo.com/html/?q={quote_plus(q)}"
-    r = requests.get(url, headers=_ua_headers(), timeout=timeout_s)
-    r.raise_for_status()
-    return _parse_ddg_html(r.text, max_results=max_results)
+def _live_ddg_search(query: str, max_results: int) -> List[WebResult]:
+    # optional live mode (may be blocked on some networks; open breakers fail fast)
+    out = _live_client.search(query, max_results)
+    if out["failed"]:
+        # /// provider failures surface as errors (as with the single-provider fetch), not as "no results"
+        raise LiveSearchError(query, out["attempts"], negative_cache=bool(out.get("negative_cache")))
+    return out["results"]
 
 
 class WebTool:
@@ -121,7 +94,24 @@ class WebTool:
         "required": ["query"],
     }
 
+    def __init__(self, live_store: Optional[WebResultStore] = None):
+        self.live_store = live_store or _live_store
+
+    def _live_search(self, query: str, max_results: int) -> Dict[str, Any]:
+        def _load(limit: int) -> List[Dict[str, str]]:
+            return [asdict(r) for r in _live_ddg_search(query, max_results=limit)]
+
+        return self.live_store.fetch(normalize_query(query), max_results, _load)
+
     def run(self, input: Dict[str, Any]) -> Dict[str, Any]:
+        with admit("web"), event_span("tool.web", "web") as meta:
+            out = self._run(input)
+            meta.update(mode=out["mode"], results=out["count"])
+            if "cache" in out:
+                meta["cache"] = out["cache"]["state"]
+            return out
+
+    def _run(self, input: Dict[str, Any]) -> Dict[str, Any]:
         t0 = time.perf_counter()
 
         query = (input.get("query") or "").strip()
@@ -130,20 +120,30 @@ class WebTool:
 
         results: List[WebResult] = []
         used_mode = mode
+        live_cache: Optional[Dict[str, Any]] = None
 
         if mode in ("cached", "auto"):
-            results = _cached_search(query, max_results=max_results)
+            with span("web.cached") as sp:
+                results = _cached_search(query, max_results=max_results)
+                sp.set(results=len(results))
             used_mode = "cached"
 
         if (not results) and mode in ("live", "auto"):
-            results = _live_ddg_search(query, max_results=max_results)
+            with span("web.live") as sp:
+                live = self._live_search(query, max_results=max_results)
+                sp.set(cache=live["cache"], results=len(live["items"]))
+            results = [WebResult(**r) for r in live["items"]]
+            live_cache = {"state": live["cache"], "age_s": live["age_s"]}
             used_mode = "live"
 
         elapsed_ms = int((time.perf_counter() - t0) * 1000)
-        return {
+        out = {
             "query": query,
             "mode": used_mode,
             "results": [{"title": r.title, "url": r.url, "snippet": r.snippet} for r in results],
             "count": len(results),
             "elapsed_ms": elapsed_ms,
         }
+        if live_cache is not None:
+            out["cache"] = live_cache
+        return out
@@ -0,0 +1,287 @@
+# /// Admission control: per-tool and per-route bulkheads (concurrency limit + bounded wait queue), 429 when full
+from __future__ import annotations
+
+import abc
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.utils import metrics
+
+ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+# /// "name=limit:queue[:timeout_s]" entries; tools/routes not listed are not limited
+# /// sql_stream: NDJSON streams hold a pooled connection until the client has read everything
+TOOL_LIMITS = os.getenv("TOOL_LIMITS", "rag=8:16,sql=8:32,sql_stream=2:4,web=4:8")
+ROUTE_LIMITS = os.getenv("ROUTE_LIMITS", "/rag/index=2:4:10,/eval/run=1:1:30,/agent/chat=32:128")
+QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "2.0"))
+# /// hold-time smoothing for the Retry-After estimate
+_EWMA_ALPHA = 0.2
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int, float]]:
+    out: Dict[str, Tuple[int, int, float]] = {}
+    for part in (spec or "").split(","):
+        name, _, rest = part.strip().partition("=")
+        if not name or not rest:
+            continue
+        fields = rest.split(":")
+        limit = int(fields[0])
+        queue = int(fields[1]) if len(fields) > 1 and fields[1] else 0
+        timeout_s = float(fields[2]) if len(fields) > 2 and fields[2] else QUEUE_TIMEOUT_S
+        out[name.strip()] = (max(0, limit), max(0, queue), max(0.0, timeout_s))
+    return out
+
+
+class Overloaded(Exception):
+    """
+    Raised when a bulkhead is full; turned into 429 + Retry-After (see overloaded_response).
+    """
+
+    def __init__(self, bulkhead: str, reason: str, retry_after_s: int):
+        super().__init__(f"{bulkhead} is at capacity ({reason}); retry in {retry_after_s}s")
+        self.bulkhead = bulkhead
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": "overloaded",
+            "bulkhead": self.bulkhead,
+            "reason": self.reason,
+            "retry_after_s": self.retry_after_s,
+            "message": str(self),
+        }
+
+
+class _BulkheadBase(abc.ABC):
+    def __init__(self, name: str, limit: int, queue: int, timeout_s: float = QUEUE_TIMEOUT_S):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout_s = timeout_s
+        self.in_use = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self.hold_s = 0.0  # EWMA of how long a slot is held
+
+    def _reject(self, reason: str, waiting: int) -> Overloaded:
+        self.rejected[reason] += 1
+        # /// time for everyone ahead of us (plus us) to get through `limit` slots
+        est = self.hold_s * (waiting + 1) / max(self.limit, 1)
+        return Overloaded(self.name, reason, max(1, math.ceil(est)))
+
+    def _held(self, seconds: float) -> None:
+        self.hold_s = seconds if not self.hold_s else self.hold_s + _EWMA_ALPHA * (seconds - self.hold_s)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue": self.queue,
+            "in_use": self.in_use,
+            "waiting": self.waiting_count(),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "hold_ms": round(self.hold_s * 1000, 3),
+        }
+
+    @abc.abstractmethod
+    def waiting_count(self) -> int:
+        ...
+
+
+class Bulkhead(_BulkheadBase):
+    """
+    Thread bulkhead for tool calls (they run on the sync threadpool). Waiters are served
+    in arrival order and never wait longer than timeout_s; once `queue` threads are
+    already waiting, new callers are rejected immediately instead of piling up.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, timeout_s: float = QUEUE_TIMEOUT_S):
+        super().__init__(name, limit, queue, timeout_s)
+        self._cond = threading.Condition(threading.Lock())
+        self._waiting = 0
+
+    def waiting_count(self) -> int:
+        return self._waiting
+
+    def acquire(self) -> None:
+        with self._cond:
+            # /// no barging: a free slot goes to a queued waiter first
+            if self.in_use < self.limit and not self._waiting:
+                self.in_use += 1
+                self.admitted += 1
+                return
+            if self._waiting >= self.queue:
+                raise self._reject("queue_full", self._waiting)
+            self._waiting += 1
+            deadline = time.monotonic() + self.timeout_s
+            try:
+                while self.in_use >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("timeout", self._waiting - 1)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self.in_use += 1
+            self.admitted += 1
+
+    def release(self, held_s: float) -> None:
+        with self._cond:
+            self.in_use -= 1
+            self._held(held_s)
+            self._cond.notify()
+
+
+class AsyncBulkhead(_BulkheadBase):
+    """
+    Event-loop bulkhead for routes: requests queue as futures on the loop, *before* a
+    sync handler takes a threadpool thread, so a burst on one route cannot occupy every
+    worker thread. release() hands the slot straight to the oldest waiter.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, timeout_s: float = QUEUE_TIMEOUT_S):
+        super().__init__(name, limit, queue, timeout_s)
+        self._waiters: deque = deque()
+
+    def waiting_count(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue:
+            raise self._reject("queue_full", len(self._waiters))
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            # /// returns normally if the slot was handed over in the same tick as the timeout
+            await asyncio.wait_for(fut, self.timeout_s)
+        except asyncio.TimeoutError:
+            raise self._reject("timeout", len(self._waiters) - 1)
+        except asyncio.CancelledError:
+            # /// client went away after being handed a slot: pass it on rather than leak it
+            if fut.done() and not fut.cancelled():
+                self._handoff()
+            raise
+        finally:
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self, held_s: float) -> None:
+        self._held(held_s)
+        self._handoff()
+
+    def _handoff(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # slot handed over; in_use unchanged
+                return
+        self.in_use -= 1
+
+
+tool_bulkheads: Dict[str, Bulkhead] = {
+    name: Bulkhead(name, *cfg) for name, cfg in parse_limits(TOOL_LIMITS).items()
+}
+route_bulkheads: Dict[str, AsyncBulkhead] = {
+    path: AsyncBulkhead(path, *cfg) for path, cfg in parse_limits(ROUTE_LIMITS).items()
+}
+
+
+class admit:
+    """
+    with admit("web"): ...
+    Takes a slot in the tool's bulkhead (raises Overloaded when full). Tools without a
+    configured limit pass straight through.
+    """
+
+    __slots__ = ("bh", "t0")
+
+    def __init__(self, tool: str):
+        self.bh = tool_bulkheads.get(tool) if ENABLED else None
+
+    def __enter__(self) -> None:
+        if self.bh is not None:
+            self.bh.acquire()
+            self.t0 = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self.bh is not None:
+            self.bh.release(time.perf_counter() - self.t0)
+        return False
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "enabled": ENABLED,
+        "tools": {name: bh.stats() for name, bh in sorted(tool_bulkheads.items())},
+        "routes": {path: bh.stats() for path, bh in sorted(route_bulkheads.items())},
+    }
+
+
+def overloaded_response(exc: Overloaded) -> JSONResponse:
+    return JSONResponse({"detail": exc.to_dict()}, status_code=429, headers={"Retry-After": str(exc.retry_after_s)})
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI: route bulkheads are keyed on the exact request path. Rejections are
+    answered here without touching the app (no routing, no body parsing, no thread).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        bh = route_bulkheads.get(scope.get("path")) if scope["type"] == "http" and ENABLED else None
+        if bh is None:
+            await self.app(scope, receive, send)
+            return
+        # /// lets the metrics middleware label rejected requests, which never reach the router
+        scope["admission_route"] = bh.name
+        try:
+            await bh.acquire()
+        except Overloaded as e:
+            await overloaded_response(e)(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bh.release(time.perf_counter() - t0)
+
+
+# ---- metrics -----------------------------------------------------------------
+
+metrics.registry.gauge("bulkhead_in_use", "Slots currently held.", ("kind", "bulkhead"))
+metrics.registry.gauge("bulkhead_limit", "Configured concurrency limit.", ("kind", "bulkhead"))
+metrics.registry.gauge("bulkhead_queue_depth", "Callers waiting for a slot.", ("kind", "bulkhead"))
+metrics.registry.counter("bulkhead_admitted_total", "Calls admitted.", ("kind", "bulkhead"))
+metrics.registry.counter("bulkhead_rejected_total", "Calls rejected with 429.", ("kind", "bulkhead", "reason"))
+
+
+def _samples():
+    for kind, group in (("tool", tool_bulkheads), ("route", route_bulkheads)):
+        for name, bh in group.items():
+            labels = {"kind": kind, "bulkhead": name}
+            yield ("bulkhead_in_use", labels, bh.in_use)
+            yield ("bulkhead_limit", labels, bh.limit)
+            yield ("bulkhead_queue_depth", labels, bh.waiting_count())
+            yield ("bulkhead_admitted_total", labels, bh.admitted)
+            for reason, n in bh.rejected.items():
+                yield ("bulkhead_rejected_total", {**labels, "reason": reason}, n)
+
+
+metrics.registry.register_collector(_samples)
@@ -0,0 +1,206 @@
+# /// Non-blocking event sink: bounded in-memory queue -> background writer -> rotating JSONL files
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import random
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
+
+ENABLED = os.getenv("EVENT_LOG_ENABLED", "1") == "1"
+LOG_PATH = Path(os.getenv("EVENT_LOG_PATH", str(_LOG_DIR / "events.jsonl")))
+MAX_QUEUE = int(os.getenv("EVENT_LOG_QUEUE", "10000"))
+BATCH_SIZE = int(os.getenv("EVENT_LOG_BATCH", "256"))
+FLUSH_INTERVAL_S = float(os.getenv("EVENT_LOG_FLUSH_S", "0.5"))
+MAX_BYTES = int(os.getenv("EVENT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+BACKUPS = int(os.getenv("EVENT_LOG_BACKUPS", "5"))
+# /// per-event keep rates for successful events, e.g. "tool.calculator=0.05,tool.web=0.5" (errors are always kept)
+SAMPLE = os.getenv("EVENT_SAMPLE", "")
+SAMPLE_DEFAULT = float(os.getenv("EVENT_SAMPLE_DEFAULT", "1.0"))
+
+# /// one reusable encoder: json.dumps(..., **kwargs) builds a new JSONEncoder per call
+_encode = json.JSONEncoder(ensure_ascii=False, default=str, separators=(",", ":")).encode
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, _, rate = part.partition("=")
+        if name.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate or 1)))
+    return rates
+
+
+class EventSink:
+    """
+    emit() only samples, bounds-checks and appends to a deque; JSON encoding and file
+    I/O happen on one daemon thread that wakes every `flush_interval_s` (or as soon as
+    a full batch is queued) and writes whole batches. When the queue is full the event
+    is dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(
+        self,
+        path: Path = LOG_PATH,
+        max_queue: int = MAX_QUEUE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_s: float = FLUSH_INTERVAL_S,
+        max_bytes: int = MAX_BYTES,
+        backups: int = BACKUPS,
+        sample_rates: Optional[Dict[str, float]] = None,
+        sample_default: float = SAMPLE_DEFAULT,
+        enabled: bool = ENABLED,
+    ):
+        self.path = Path(path)
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rates = dict(sample_rates if sample_rates is not None else parse_sample_rates(SAMPLE))
+        self.sample_default = sample_default
+        self.enabled = enabled
+        self._init_state()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _init_state(self) -> None:
+        self._q: deque = deque()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()  # counters + writer start
+        self._io_lock = threading.Lock()  # one drainer at a time keeps batches in order
+        self._thread: Optional[threading.Thread] = None
+        self._fh = None
+        self._size = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    def _after_fork(self) -> None:
+        # /// the writer thread does not survive fork; forked workers also get their own file
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+        self._init_state()
+        self.path = self.path.with_name(f"{self.path.stem}.{os.getpid()}{self.path.suffix}")
+
+    # ---- request path ----------------------------------------------------
+
+    def wants(self, name: str, status: str) -> bool:
+        """
+        Sampling decision, made before the event is built.
+        """
+        if not self.enabled:
+            return False
+        rate = self.sample_rates.get(name, self.sample_default)
+        if rate < 1.0 and status == "ok" and random.random() >= rate:
+            with self._lock:
+                self.sampled_out += 1
+            return False
+        return True
+
+    def emit(self, event: Dict[str, Any], sampled: bool = False) -> bool:
+        if not (sampled or self.wants(event.get("event"), event.get("status"))):
+            return False
+        if len(self._q) >= self.max_queue:
+            with self._lock:
+                self.dropped += 1
+            return False
+        self._q.append(event)
+        if self._thread is None:
+            self._start()
+        if len(self._q) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    # ---- writer ----------------------------------------------------------
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                t = threading.Thread(target=self._run, name="event-sink", daemon=True)
+                t.start()
+                self._thread = t
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far; returns the number of events written.
+        """
+        n = 0
+        with self._io_lock:
+            while self._q:
+                batch: List[Dict[str, Any]] = []
+                try:
+                    while len(batch) < self.batch_size:
+                        batch.append(self._q.popleft())
+                except IndexError:
+                    pass
+                n += self._write(batch)
+        return n
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        data = ("\n".join(map(_encode, batch)) + "\n").encode("utf-8")
+        try:
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "ab")
+                self._size = self._fh.tell()
+            if self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._fh.write(data)
+            self._fh.flush()
+            self._size += len(data)
+        except OSError:
+            self.write_errors += 1
+            return 0
+        self.written += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def _rotate(self) -> None:
+        self._fh.close()
+        self._fh = None
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._fh = open(self.path, "ab")
+        self._size = 0
+        self.rotations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": str(self.path),
+            "queued": len(self._q),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+        }
+
+
+sink = EventSink()
+atexit.register(sink.flush)
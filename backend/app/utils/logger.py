@@ -1,24 +1,89 @@
+import os
 import time
-import uuid
-from typing import Any, Dict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from app.utils import metrics, tracing
+from app.utils.event_sink import sink
+
+# /// set by run_agent so tool events carry the conversation without threading it through every call
+_conversation_id: ContextVar[Optional[str]] = ContextVar("conversation_id", default=None)
 
 
 def log_event(
     *,
     event: str,
-    conversation_id: str | None,
+    conversation_id: str | None = None,
     tool: str | None,
     status: str,
-    latency_ms: int,
+    latency_ms: float,
     meta: Dict[str, Any] | None = None,
+    sampled: bool = False,
 ) -> Dict[str, Any]:
-    return {
-        "event_id": str(uuid.uuid4()),
+    """
+    Build a structured event and hand it to the async sink (never blocks; see event_sink).
+    sampled=True means the caller already applied sink.wants().
+    """
+    evt = {
+        # /// 128 random bits like uuid4, ~5x cheaper than str(uuid.uuid4())
+        "event_id": os.urandom(16).hex(),
         "event": event,
-        "conversation_id": conversation_id,
+        "conversation_id": conversation_id if conversation_id is not None else _conversation_id.get(),
         "tool": tool,
         "status": status,
         "latency_ms": latency_ms,
         "meta": meta or {},
         "ts": int(time.time() * 1000),
     }
+    sink.emit(evt, sampled=sampled)
+    return evt
+
+
+@contextmanager
+def conversation_context(conversation_id: Optional[str]) -> Iterator[None]:
+    token = _conversation_id.set(conversation_id)
+    try:
+        yield
+    finally:
+        _conversation_id.reset(token)
+
+
+class event_span:
+    """
+    with event_span("tool.sql", "sql") as meta: ...
+    Times the block and logs one event: status "ok", or "error" (re-raised) with the
+    exception type. `meta` is the event's meta dict; add result fields to it.
+    A class rather than @contextmanager: this wraps every tool call, so it stays cheap,
+    and sampled-out events are never built.
+    """
+
+    __slots__ = ("event", "tool", "meta", "t0", "label", "span")
+
+    def __init__(self, event: str, tool: str | None = None, **meta: Any):
+        self.event = event
+        self.tool = tool
+        self.meta = meta
+
+    def __enter__(self) -> Dict[str, Any]:
+        # /// metrics see every call; the event itself may still be sampled out below
+        self.label = metrics.tool_label(self.event)
+        metrics.tool_started(self.label)
+        # /// also a trace span when the request is traced; meta doubles as its attributes
+        self.span = tracing.start(self.event, self.meta)
+        self.t0 = time.perf_counter()
+        return self.meta
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self.t0
+        tracing.finish(self.span, exc_type)
+        metrics.tool_done(self.label, elapsed, exc_type)
+        status = "ok" if exc_type is None else "error"
+        if not sink.wants(self.event, status):
+            return False
+        latency_ms = round(elapsed * 1000, 3)
+        if exc is not None:
+            self.meta["error"] = exc_type.__name__
+            self.meta["message"] = str(exc)[:200]
+        log_event(event=self.event, tool=self.tool, status=status, latency_ms=latency_ms, meta=self.meta, sampled=True)
+        return False
@@ -0,0 +1,377 @@
+# /// In-process metrics: per-thread shards (no lock on the hot path), merged and rendered as Prometheus text on scrape
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.utils import tracing
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# /// seconds; 0.1 ms .. 10 s covers a cached calculator call through a cold web fetch
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# /// (name, labels dict, value) samples returned by collectors
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class _Shard:
+    """
+    One thread's values. Only the owning thread writes; the scraper copies the dicts
+    (a single C-level call under the GIL) so it never sees a half-applied update.
+    """
+
+    __slots__ = ("counters", "gauges", "hists", "thread")
+
+    def __init__(self, thread: Optional[threading.Thread]):
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.gauges: Dict[Tuple[str, tuple], float] = {}
+        # /// per-bucket counts (not cumulative) + [+Inf count, sum]
+        self.hists: Dict[Tuple[str, tuple], List[float]] = {}
+        self.thread = thread
+
+    def merge_into(self, other: "_Shard") -> None:
+        for k, v in list(self.counters.items()):
+            other.counters[k] = other.counters.get(k, 0) + v
+        for k, v in list(self.gauges.items()):
+            other.gauges[k] = other.gauges.get(k, 0) + v
+        for k, arr in list(self.hists.items()):
+            cur = other.hists.get(k)
+            if cur is None:
+                other.hists[k] = arr[:]
+            else:
+                for i, v in enumerate(arr[:]):
+                    cur[i] += v
+
+
+class _Metric:
+    __slots__ = ("registry", "name", "help", "labelnames")
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+
+class Counter(_Metric):
+    __slots__ = ()
+    kind = "counter"
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        if not self.registry.enabled:
+            return
+        d = self.registry._shard().counters
+        k = (self.name, labels)
+        d[k] = d.get(k, 0) + value
+
+
+class Gauge(_Metric):
+    """
+    Up/down gauge (e.g. in-flight work): each thread keeps its own delta, the scrape sums them.
+    """
+
+    __slots__ = ()
+    kind = "gauge"
+
+    def add(self, value: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        d = self.registry._shard().gauges
+        k = (self.name, labels)
+        d[k] = d.get(k, 0) + value
+
+    def inc(self, *labels: str) -> None:
+        self.add(1, *labels)
+
+    def dec(self, *labels: str) -> None:
+        self.add(-1, *labels)
+
+
+class Histogram(_Metric):
+    __slots__ = ("buckets",)
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        d = self.registry._shard().hists
+        k = (self.name, labels)
+        arr = d.get(k)
+        if arr is None:
+            arr = d[k] = [0] * (len(self.buckets) + 2)
+        # /// le is inclusive: bisect_left puts value == bound in that bound's bucket
+        arr[bisect_left(self.buckets, value)] += 1
+        arr[-1] += value
+
+
+class Registry:
+    """
+    Metric definitions plus one shard per thread. Updating a metric touches only the
+    calling thread's dicts, so there is no lock on the request path; the registry lock
+    is taken once per new thread and on scrape. Shards of finished threads are folded
+    into a retired shard at scrape time so thread churn does not grow memory.
+    """
+
+    def __init__(self, enabled: bool = ENABLED):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # /// a forked worker reports its own traffic, not the parent's pre-fork totals
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(None)
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    # ---- definitions -----------------------------------------------------
+
+    def _define(self, cls, name: str, help: str, labelnames: Sequence[str], **kw: Any):
+        m = self._metrics.get(name)
+        if m is None:
+            m = self._metrics[name] = cls(self, name, help, labelnames, **kw)
+        elif not isinstance(m, cls):
+            raise ValueError(f"metric {name!r} already defined as a {m.kind}")
+        return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._define(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._define(Gauge, name, help, labelnames)
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._define(Histogram, name, help, labelnames, buckets=buckets)
+
+    def register_collector(self, fn: Callable[[], Iterable[Sample]]) -> None:
+        """
+        fn() is called on every scrape and yields (name, labels, value) for metrics that
+        already live elsewhere (cache stats, queue depths). Their names must be defined
+        here too (counter() or gauge()) so HELP/TYPE lines are emitted.
+        """
+        self._collectors.append(fn)
+
+    # ---- scrape ----------------------------------------------------------
+
+    def snapshot(self) -> _Shard:
+        total = _Shard(None)
+        with self._lock:
+            live = []
+            for s in self._shards:
+                if s.thread is not None and not s.thread.is_alive():
+                    s.merge_into(self._retired)
+                else:
+                    live.append(s)
+            self._shards = live
+            self._retired.merge_into(total)
+            for s in live:
+                s.merge_into(total)
+        return total
+
+    def reset(self) -> None:
+        """
+        Zero all values (tests/benchmarks). Live threads keep their shard objects.
+        """
+        with self._lock:
+            for s in self._shards + [self._retired]:
+                s.counters.clear()
+                s.gauges.clear()
+                s.hists.clear()
+
+    def render(self) -> str:
+        snap = self.snapshot()
+        series: Dict[str, List[Tuple[str, Dict[str, str], float]]] = {}
+
+        def labels_of(m: _Metric, values: tuple) -> Dict[str, str]:
+            return dict(zip(m.labelnames, values))
+
+        for (name, lv), v in snap.counters.items():
+            series.setdefault(name, []).append((name, labels_of(self._metrics[name], lv), v))
+        for (name, lv), v in snap.gauges.items():
+            series.setdefault(name, []).append((name, labels_of(self._metrics[name], lv), v))
+        for (name, lv), arr in snap.hists.items():
+            m = self._metrics[name]
+            labels = labels_of(m, lv)
+            rows = series.setdefault(name, [])
+            cum = 0
+            for bound, n in zip(m.buckets, arr):
+                cum += n
+                rows.append((name + "_bucket", {**labels, "le": _fmt(bound)}, cum))
+            cum += arr[len(m.buckets)]
+            rows.append((name + "_bucket", {**labels, "le": "+Inf"}, cum))
+            rows.append((name + "_sum", labels, arr[-1]))
+            rows.append((name + "_count", labels, cum))
+        # /// ratio for caches counted through cache_hits/cache_misses (collector-fed caches add their own)
+        counted = {lv for (name, lv) in snap.counters if name in ("cache_hits_total", "cache_misses_total")}
+        for lv in counted:
+            h = snap.counters.get(("cache_hits_total", lv), 0)
+            n = h + snap.counters.get(("cache_misses_total", lv), 0)
+            series.setdefault("cache_hit_ratio", []).append(
+                ("cache_hit_ratio", {"cache": lv[0]}, round(h / n, 6) if n else 0.0)
+            )
+        for fn in list(self._collectors):
+            for name, labels, v in fn():
+                series.setdefault(name, []).append((name, labels, v))
+
+        out: List[str] = []
+        for name in sorted(series):
+            m = self._metrics.get(name)
+            if m is not None:
+                out.append(f"# HELP {name} {m.help}")
+                out.append(f"# TYPE {name} {m.kind}")
+            for sname, labels, v in sorted(series[name], key=_series_key):
+                out.append(f"{sname}{_labels(labels)} {_fmt(v)}")
+        return "\n".join(out) + "\n"
+
+
+def _series_key(row: Tuple[str, Dict[str, str], float]):
+    name, labels, _v = row
+    # /// keep each label set's buckets together and in bound order, then _sum/_count
+    le = labels.get("le")
+    rest = tuple((k, v) for k, v in labels.items() if k != "le")
+    suffix = 0 if name.endswith("_bucket") else 1 if name.endswith("_sum") else 2
+    bound = float("inf") if le in (None, "+Inf") else float(le)
+    return (rest, suffix, bound, name)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+registry = Registry()
+
+# ---- shared instruments ---------------------------------------------------
+
+tool_latency = registry.histogram("tool_latency_seconds", "Tool call latency.", ("tool",))
+tool_in_flight = registry.gauge("tool_in_flight", "Tool calls currently running.", ("tool",))
+tool_calls = registry.counter("tool_calls_total", "Tool calls by outcome.", ("tool", "status"))
+tool_errors = registry.counter("tool_errors_total", "Tool calls that raised, by exception type.", ("tool", "error"))
+cache_hits = registry.counter("cache_hits_total", "Cache hits.", ("cache",))
+cache_misses = registry.counter("cache_misses_total", "Cache misses.", ("cache",))
+registry.gauge("cache_hit_ratio", "hits / (hits + misses) since start.", ("cache",))
+registry.gauge("cache_entries", "Entries currently cached.", ("cache",))
+
+
+def tool_label(event: str) -> str:
+    # /// "tool.sql" -> "sql"; other spans ("agent.run", "rag.index") keep their event name
+    return event[5:] if event.startswith("tool.") else event
+
+
+def tool_started(tool: str) -> None:
+    if registry.enabled:
+        g = registry._shard().gauges
+        k = ("tool_in_flight", (tool,))
+        g[k] = g.get(k, 0) + 1
+
+
+def tool_done(tool: str, seconds: float, exc_type: Optional[type]) -> None:
+    """
+    Record one finished tool call (after tool_started(tool)). Inlined against one shard
+    lookup: this runs on every tool call, so it is ~4x cheaper than four metric calls.
+    """
+    if not registry.enabled:
+        return
+    shard = registry._shard()
+    labels = (tool,)
+    g = shard.gauges
+    k = ("tool_in_flight", labels)
+    g[k] = g.get(k, 0) - 1
+
+    h = shard.hists
+    k = ("tool_latency_seconds", labels)
+    arr = h.get(k)
+    if arr is None:
+        arr = h[k] = [0] * (len(LATENCY_BUCKETS) + 2)
+    arr[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    arr[-1] += seconds
+
+    c = shard.counters
+    k = ("tool_calls_total", (tool, "ok" if exc_type is None else "error"))
+    c[k] = c.get(k, 0) + 1
+    if exc_type is not None:
+        k = ("tool_errors_total", (tool, exc_type.__name__))
+        c[k] = c.get(k, 0) + 1
+
+
+class timed:
+    """
+    with timed("chroma_query"): ...
+    Metrics-only span for calls too frequent or too low-level for an event (embedding,
+    vector queries, memory reads): in-flight gauge, latency histogram, error counter,
+    plus a trace span when the request is being traced.
+    """
+
+    __slots__ = ("tool", "t0", "span")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+
+    def __enter__(self) -> "timed":
+        tool_started(self.tool)
+        self.span = tracing.start(self.tool)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        tracing.finish(self.span, exc_type)
+        tool_done(self.tool, time.perf_counter() - self.t0, exc_type)
+        return False
+
+
+def cache_samples(name: str, hits: float, misses: float, entries: Optional[float] = None) -> List[Sample]:
+    """
+    Collector helper: export a cache's own hit/miss counters under the shared names.
+    """
+    labels = {"cache": name}
+    total = hits + misses
+    out: List[Sample] = [
+        ("cache_hits_total", labels, hits),
+        ("cache_misses_total", labels, misses),
+        ("cache_hit_ratio", labels, round(hits / total, 6) if total else 0.0),
+    ]
+    if entries is not None:
+        out.append(("cache_entries", labels, entries))
+    return out
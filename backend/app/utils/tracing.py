@@ -0,0 +1,272 @@
+# /// Per-request span tracing (microsecond, nested) + opt-in cProfile, both off unless a request asks for them
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import sysconfig
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+_LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
+
+# /// honour X-Profile at all (a cProfile'd request runs several times slower)
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(_LOG_DIR / "profiles")))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "25"))
+# /// .prof files kept in PROFILE_DIR; older ones are deleted as new ones are written
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# /// innermost open span of the current request; None means "not tracing" and every span is a no-op
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start_ns", "end_ns", "tid", "children", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.children: List[Span] = []
+        self.tid = threading.get_ident()
+        self.end_ns = 0
+        self.start_ns = time.perf_counter_ns()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    @property
+    def duration_us(self) -> float:
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1000
+
+    def to_dict(self, origin_ns: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Nested form returned in API responses; start_us is relative to the root span.
+        """
+        origin_ns = self.start_ns if origin_ns is None else origin_ns
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "start_us": round((self.start_ns - origin_ns) / 1000, 1),
+            "duration_us": round(self.duration_us, 1),
+        }
+        if self.attrs:
+            out["attrs"] = {k: v for k, v in self.attrs.items() if _plain(v)}
+        if self.children:
+            out["children"] = [c.to_dict(origin_ns) for c in self.children]
+        return out
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        Chrome trace-event JSON (complete "X" events), loadable in Perfetto / chrome://tracing.
+        """
+        pid = os.getpid()
+        origin = self.start_ns
+        events: List[Dict[str, Any]] = []
+        stack = [self]
+        while stack:
+            s = stack.pop()
+            events.append(
+                {
+                    "name": s.name,
+                    "ph": "X",
+                    "ts": round((s.start_ns - origin) / 1000, 3),
+                    "dur": round(s.duration_us, 3),
+                    "pid": pid,
+                    "tid": s.tid,
+                    "args": {k: v for k, v in s.attrs.items() if _plain(v)},
+                }
+            )
+            stack.extend(reversed(s.children))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _plain(v: Any) -> bool:
+    return isinstance(v, (str, int, float, bool, type(None))) or (
+        isinstance(v, (list, tuple)) and all(isinstance(x, (str, int, float, bool)) for x in v)
+    )
+
+
+def start(name: str, attrs: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+    """
+    Open a child of the current span; returns None (and records nothing) when the
+    request is not being traced. Pair with finish(). For instrumentation wrappers
+    (event_span, metrics.timed) that already manage their own enter/exit.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    s = Span(name, attrs if attrs is not None else {})
+    parent.children.append(s)
+    s._token = _current.set(s)
+    return s
+
+
+def finish(s: Optional[Span], exc_type: Optional[type] = None) -> None:
+    if s is None:
+        return
+    s.end_ns = time.perf_counter_ns()
+    if exc_type is not None:
+        s.attrs["error"] = exc_type.__name__
+    try:
+        _current.reset(s._token)
+    except ValueError:
+        # /// finished from another context (generator/async handoff): just restore the parent
+        pass
+
+
+class span:
+    """
+    with span("rag.working_set", size=n) as s: ... s.set(hit=True)
+    A no-op (yielding a dummy that ignores set()) unless a trace is active.
+    """
+
+    __slots__ = ("name", "attrs", "s")
+
+    def __init__(self, name: str, **attrs: Any):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> Any:
+        self.s = start(self.name, self.attrs)
+        return self.s if self.s is not None else _NULL
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        finish(self.s, exc_type)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class trace:
+    """
+    with trace("agent.chat") as root: ...   # root.to_dict() / root.to_chrome() afterwards
+    Starts a new trace for this request (spans opened inside nest under `root`).
+    """
+
+    __slots__ = ("root", "_token")
+
+    def __init__(self, name: str, **attrs: Any):
+        self.root = Span(name, attrs)
+
+    def __enter__(self) -> Span:
+        self.root.start_ns = time.perf_counter_ns()
+        self._token = _current.set(self.root)
+        return self.root
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.root.end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.root.attrs["error"] = exc_type.__name__
+        _current.reset(self._token)
+        return False
+
+
+def active() -> bool:
+    return _current.get() is not None
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Carry the current trace into a worker thread: pool.submit(propagate(fn), ...).
+    Returns fn unchanged when nothing is being traced.
+    """
+    if _current.get() is None:
+        return fn
+    return partial(contextvars.copy_context().run, fn)
+
+
+class profile:
+    """
+    with profile(name) as p: ...; p.summary()
+    cProfile for one request. Only the calling thread is profiled (pool threads that
+    serve it, e.g. RAG shard searches, show up as waits). The raw stats are written to
+    PROFILE_DIR/<name>.prof for snakeviz / pstats (the newest PROFILE_KEEP are kept);
+    summary() has the top functions.
+    """
+
+    def __init__(self, name: str, top: int = PROFILE_TOP):
+        self.name = name
+        self.top = top
+        self.path: Optional[Path] = None
+        self._prof = cProfile.Profile()
+
+    def __enter__(self) -> "profile":
+        self._prof.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._prof.disable()
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            self.path = PROFILE_DIR / f"{self.name}.prof"
+            self._prof.dump_stats(str(self.path))
+        except OSError:
+            self.path = None
+        else:
+            _rotate(PROFILE_DIR, PROFILE_KEEP)
+        return False
+
+    def summary(self) -> Dict[str, Any]:
+        stats = pstats.Stats(self._prof, stream=io.StringIO())
+        stats.sort_stats("cumulative")
+        rows = []
+        for func in stats.fcn_list[: self.top]:
+            cc, nc, tt, ct, _callers = stats.stats[func]
+            filename, line, fname = func
+            rows.append(
+                {
+                    "function": f"{_short(filename)}:{line}({fname})",
+                    "calls": nc,
+                    "tottime_ms": round(tt * 1000, 3),
+                    "cumtime_ms": round(ct * 1000, 3),
+                }
+            )
+        return {
+            "path": str(self.path) if self.path else None,
+            "total_calls": stats.total_calls,
+            "total_ms": round(stats.total_tt * 1000, 3),
+            "top": rows,
+        }
+
+
+def _rotate(directory: Path, keep: int) -> None:
+    files = []
+    for path in directory.glob("*.prof"):
+        try:
+            files.append((path.stat().st_mtime_ns, path))
+        except OSError:
+            continue
+    files.sort(reverse=True)
+    for _mtime, path in files[max(keep, 1):]:
+        try:
+            path.unlink()
+        except OSError:
+            # /// another worker rotated it first
+            pass
+
+
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+
+def _short(filename: str) -> str:
+    # /// "/.../site-packages/chromadb/api/x.py" -> "chromadb/api/x.py"; keeps app paths readable
+    if filename.startswith(_STDLIB):
+        return filename[len(_STDLIB):]
+    for marker in ("site-packages/", "backend/"):
+        i = filename.rfind(marker)
+        if i >= 0:
+            return filename[i + len(marker):]
+    return filename
@@ -0,0 +1,87 @@
+"""
+Calculator throughput: the previous sanitize + ast.parse + recursive walk on
+every call vs compiled/cached bytecode, and batch evaluation (scalar vs NumPy).
+
+Run from backend/:
+    python -m benchmarks.calculator --exprs 20000
+"""
+import argparse
+import ast
+import json
+import operator as op
+import random
+import re
+import time
+
+from app.tools.calculator import calculator_tool, compile_template, evaluate_batch, split_expression
+
+_OPS = {ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul, ast.Div: op.truediv, ast.USub: op.neg, ast.UAdd: op.pos}
+
+
+def _legacy(expr: str):
+    # /// calculator_tool before compilation/caching
+    expr = expr.strip()
+    if not re.fullmatch(r"[0-9\.\+\-\*\/\(\)\s]+", expr):
+        raise ValueError("Expression contains invalid characters.")
+
+    def _eval(node):
+        if isinstance(node, ast.Expression):
+            return _eval(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _OPS:
+            return _OPS[type(node.op)](_eval(node.operand))
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPS:
+            return _OPS[type(node.op)](_eval(node.left), _eval(node.right))
+        raise ValueError("Unsupported expression.")
+
+    result = _eval(ast.parse(expr, mode="eval"))
+    if isinstance(result, float) and result.is_integer():
+        result = int(result)
+    return {"result": result}
+
+
+def _workloads(n: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    templates = ["{a}*{b}+{c}", "({a}+{b})/{c}", "{a}*({b}-{c})/{d}", "-{a}+{b}*{c}-{d}/{e}"]
+
+    def fill(t):
+        return t.format(**{k: rnd.randint(1, 10_000) for k in "abcde"})
+
+    return {
+        # /// agent traffic: a few distinct expressions asked over and over
+        "repeated": [fill(templates[0]) for _ in range(50)] * (n // 50),
+        "unique_mixed": [fill(rnd.choice(templates)) for _ in range(n)],
+        "unique_same_shape": [fill(templates[2]) for _ in range(n)],
+    }
+
+
+def _per_sec(fn, exprs) -> float:
+    t0 = time.perf_counter()
+    fn(exprs)
+    return round(len(exprs) / (time.perf_counter() - t0), 1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--exprs", type=int, default=20_000)
+    args = ap.parse_args()
+
+    rows = []
+    for name, exprs in _workloads(args.exprs).items():
+        split_expression.cache_clear()
+        compile_template.cache_clear()
+        rows.append({
+            "workload": name,
+            "n": len(exprs),
+            "legacy_per_call": _per_sec(lambda xs: [_legacy(e) for e in xs], exprs),
+            "compiled_per_call_cold": _per_sec(lambda xs: [calculator_tool({"expression": e}) for e in xs], exprs),
+            "compiled_per_call_warm": _per_sec(lambda xs: [calculator_tool({"expression": e}) for e in xs], exprs),
+            "batch_scalar": _per_sec(lambda xs: evaluate_batch(xs, vectorize=False), exprs),
+            "batch_vectorized": _per_sec(lambda xs: evaluate_batch(xs), exprs),
+        })
+    print(json.dumps({"unit": "expressions/s", "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Deterministic fixture data for benchmarks.
+
+The schema mirrors sample.sqlite (customers / orders / tickets); sizes are scalable.
+The text corpus is seeded filler for chunking / embedding / retrieval.
+The mock search server answers like the DuckDuckGo HTML endpoint.
+"""
+from __future__ import annotations
+
+import random
+import sqlite3
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+_FIRST = ["Ada", "Grace", "Alan", "Linus", "Ken", "Barbara", "Edsger", "Margaret", "Dennis", "Frances"]
+_LAST = ["Lovelace", "Hopper", "Turing", "Torvalds", "Thompson", "Liskov", "Dijkstra", "Hamilton", "Ritchie", "Allen"]
+_STATUSES = ["open", "pending", "closed", "escalated"]
+
+
+def build_sample_db(
+    path: Path,
+    customers: int = 200,
+    orders: int = 5000,
+    tickets: int = 1000,
+    seed: int = 0,
+) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(str(path))
+    conn.executescript(
+        """
+        CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT NOT NULL, email TEXT);
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY,
+            customer_id INTEGER NOT NULL REFERENCES customers(id),
+            total_amount REAL NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE tickets (
+            id INTEGER PRIMARY KEY,
+            customer_id INTEGER REFERENCES customers(id),
+            status TEXT NOT NULL,
+            subject TEXT
+        );
+        """
+    )
+
+    conn.executemany(
+        "INSERT INTO customers (id, name, email) VALUES (?, ?, ?)",
+        (
+            (i, f"{rnd.choice(_FIRST)} {rnd.choice(_LAST)} {i}", f"user{i}@example.com")
+            for i in range(1, customers + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO orders (id, customer_id, total_amount, created_at) VALUES (?, ?, ?, ?)",
+        (
+            (
+                i,
+                rnd.randint(1, customers),
+                round(rnd.uniform(5, 500), 2),
+                f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            )
+            for i in range(1, orders + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO tickets (id, customer_id, status, subject) VALUES (?, ?, ?, ?)",
+        (
+            (i, rnd.randint(1, customers), rnd.choice(_STATUSES), f"Issue #{i}")
+            for i in range(1, tickets + 1)
+        ),
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+_CORPUS_WORDS = (
+    "policy resume summary experience python sql agent retrieval vector cache latency throughput "
+    "customer order ticket refund invoice shipping contract engineer project skills education team "
+    "deploy service database index query model embedding pipeline review release incident on-call"
+).split()
+
+
+def generate_corpus(docs: int = 50, words_per_doc: int = 1500, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    (source, text) pairs of paragraph-structured filler text; ~7 chars/word, so the
+    default is ~10 KB per document (a dozen 900-char chunks each).
+    """
+    rnd = random.Random(seed)
+    out: List[Tuple[str, str]] = []
+    for d in range(docs):
+        paras = []
+        left = words_per_doc
+        while left > 0:
+            n = min(left, rnd.randint(40, 120))
+            words = rnd.choices(_CORPUS_WORDS, k=n)
+            words[0] = words[0].capitalize()
+            paras.append(" ".join(words) + ".")
+            left -= n
+        out.append((f"doc{d:04d}.txt", "\n\n".join(paras)))
+    return out
+
+
+def ddg_html(query: str, n: int = 5) -> str:
+    slug = "-".join(query.split()) or "empty"
+    rows = "".join(
+        f'<div class="result"><h2><a class="result__a" href="https://example.com/{escape(slug)}/{i}">'
+        f"{escape(query)} result {i}</a></h2>"
+        f'<a class="result__snippet">Snippet {i} about <b>{escape(query)}</b>.</a></div>'
+        for i in range(n)
+    )
+    return f"<html><body><div class='results'>{rows}</div></body></html>"
+
+
+def start_mock_search_server(slow_s: float = 1.0) -> Tuple[ThreadingHTTPServer, str, List[str]]:
+    """
+    Local stand-in for DDG HTML search. Path prefix picks the behaviour:
+      /ok/    answers immediately
+      /slow/  answers after `slow_s`
+      /fail/  returns HTTP 500
+      /empty/ returns a page with no results
+    Returns (server, base_url, request log of "path?q"); call server.shutdown() when done.
+    """
+    hits: List[str] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True  # headers and body are separate writes
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = parse_qs(url.query).get("q", [""])[0]
+            hits.append(f"{url.path}?{q}")
+            status, body = 200, ddg_html(q)
+            if url.path.startswith("/slow/"):
+                time.sleep(slow_s)
+            elif url.path.startswith("/fail/"):
+                status, body = 500, "backend error"
+            elif url.path.startswith("/empty/"):
+                body = "<html><body>No results.</body></html>"
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", hits
+
+
+_DDG_HEAD = """<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN" "http://www.w3.org/TR/html4/loose.dtd">
+<html>
+<head>
+  <meta http-equiv="content-type" content="text/html; charset=UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=3.0, user-scalable=1" />
+  <title>{q} at DuckDuckGo</title>
+  <link title="DuckDuckGo (HTML)" type="application/opensearchdescription+xml" rel="search" href="//duckduckgo.com/opensearch_html_v2.xml">
+  <link rel="stylesheet" href="//duckduckgo.com/dist/h.css" type="text/css">
+  <style>.result__a {{ color: #1a0dab; }} .result--ad {{ background: #fafafa; }}</style>
+  <script type="text/javascript">var DDG = window.DDG || {{}}; DDG.page = "<div class='result'>";</script>
+</head>
+<body class="body--html">
+  <a name="top" id="top"></a>
+  <form action="/html/" method="post">
+    <input type="text" name="state_hidden" id="state_hidden" />
+  </form>
+  <div>
+    <div class="site-wrapper-border"></div>
+    <div id="header" class="header cw header--html">
+      <a title="DuckDuckGo" href="/html/" class="header__logo-wrap"></a>
+      <form name="x" class="header__form" action="/html/" method="post">
+        <div class="search search--header">
+          <input name="q" autocomplete="off" class="search__input" id="search_form_input_homepage" type="text" value="{q}" />
+          <input name="b" id="search_button_homepage" class="search__button search__button--html" value="" title="Search" alt="Search" type="submit" />
+        </div>
+      </form>
+    </div>
+    <div class="filters">
+      <div class="frm__select"><select class="" name="kl"><option value="" >All Regions</option><option value="us-en" selected>US (English)</option></select></div>
+    </div>
+  </div>
+  <div>
+    <div class="serp__results">
+      <div id="links" class="results">
+"""
+
+_DDG_FOOT = """
+        <div class="nav-link">
+          <form action="/html/" method="post">
+            <input type="submit" class='btn btn--alt' value="Next" />
+            <input type="hidden" name="q" value="{q}" />
+            <input type="hidden" name="s" value="{n}" />
+          </form>
+        </div>
+        <div class=" feedback-btn">
+          <a rel="nofollow" href="//duckduckgo.com/feedback.html" target="_new">Feedback</a>
+        </div>
+        <div class="clear"></div>
+      </div>
+    </div>
+  </div>
+</body>
+</html>
+"""
+
+_DOMAINS = ["example.com", "docs.python.org", "en.wikipedia.org", "github.com", "news.ycombinator.com", "arxiv.org"]
+_PHRASES = [
+    "A practical guide to {q}",
+    "{q} &mdash; Wikipedia",
+    "Why <b>{q}</b> matters in 2024",
+    "{q}: release notes &amp; changelog",
+    "Benchmarks for {q} <!-- tracking -->compared",
+    "L&#39;état de <b>{q}</b> — résumé",
+]
+
+
+def _ddg_result(rnd: random.Random, q: str, i: int) -> str:
+    domain = rnd.choice(_DOMAINS)
+    path = f"/{'-'.join(q.split())}/{i}"
+    target = f"https://{domain}{path}"
+    kind = rnd.random()
+    if kind < 0.25:
+        # /// real DDG wraps most links in a redirect the extractor skips (no http prefix)
+        href = f"//duckduckgo.com/l/?uddg=https%3A%2F%2F{domain}{path.replace('/', '%2F')}&amp;rut=abc{i}"
+    elif kind < 0.35:
+        href = f" {target}?ref=ddg&amp;x={i} "
+    else:
+        href = target
+    title = rnd.choice(_PHRASES).format(q=q)
+    ad = " result--ad" if rnd.random() < 0.08 else ""
+    snippet_kind = rnd.random()
+    if snippet_kind < 0.1:
+        snippet = ""
+    elif snippet_kind < 0.2:
+        snippet = (
+            f'\n          <div class="result__snippet">Line one about {q}<br>line two'
+            f"<script>track({i})</script> &lt;code&gt; <wbr>end.</div>"
+        )
+    else:
+        words = " ".join(rnd.choice(["fast", "reliable", "<b>" + q + "</b>", "cache", "index", "&quot;quoted&quot;",
+                                     "unicode ✓", "data", "server", "\n            latency"]) for _ in range(rnd.randint(8, 30)))
+        snippet = f'\n          <a class="result__snippet" href="{target}">{words}.</a>'
+    return f"""
+        <div class="result results_links results_links_deep web-result{ad}">
+          <div class="links_main links_deep result__body">
+            <h2 class="result__title">
+              <a rel="nofollow" class="result__a" href="{href}">{title}</a>
+            </h2>
+            <div class="result__extras">
+              <div class="result__extras__url">
+                <span class="result__icon"><a rel="nofollow" href="{target}"><img class="result__icon__img" width="16" height="16" alt="" src="//external-content.duckduckgo.com/ip3/{domain}.ico" name="i15" /></a></span>
+                <a class="result__url" href="{href}">{domain}{path}</a>
+              </div>
+            </div>{snippet}
+            <div class="clear"></div>
+          </div>
+        </div>"""
+
+
+def ddg_result_pages(pages: int = 20, results_per_page: int = 30, seed: int = 0) -> List[str]:
+    """
+    Saved-page style corpus in DDG's HTML-endpoint markup (head, forms, ads, redirect links,
+    entities, comments, scripts inside results, missing snippets, a no-results page).
+    """
+    rnd = random.Random(seed)
+    out: List[str] = []
+    for p in range(pages):
+        q = rnd.choice(["vector database", "python asyncio", "sqlite wal mode", "rust borrow checker", "fastapi"])
+        if p % 10 == 9:
+            body = '\n        <div class="result results_links results_links_deep result--no-result"><div class="no-results">No  results.</div></div>'
+        else:
+            body = "".join(_ddg_result(rnd, q, i) for i in range(results_per_page))
+        out.append(_DDG_HEAD.format(q=q) + body + _DDG_FOOT.format(q=q, n=results_per_page))
+    return out
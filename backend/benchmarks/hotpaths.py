@@ -0,0 +1,273 @@
+"""
+Hot-path microbenchmarks for every agent component, on deterministic fixtures:
+a generated corpus in an in-memory Chroma, a scaled-up sample.sqlite and a
+throwaway memory DB (app/db is never touched). Results are JSON (ns/op per
+benchmark); --compare flags regressions between two result files.
+
+Run from backend/:
+    python -m benchmarks.hotpaths --out reports/bench/base.json
+    python -m benchmarks.hotpaths --filter sql,agent --quick
+    python -m benchmarks.hotpaths --compare reports/bench/base.json reports/bench/new.json --threshold 0.25
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# /// deterministic, offline embeddings for benchmarking
+os.environ.setdefault("EMBED_BACKEND", "hash")
+
+import chromadb  # noqa: E402
+
+from app.agent import memory, runner  # noqa: E402
+from app.agent.planner import make_plan  # noqa: E402
+from app.agent.router import _extract_expression, _looks_like_rag, _looks_like_sql, _looks_like_web  # noqa: E402
+from app.eval.datasets import generate_cases  # noqa: E402
+from app.rag import metadata_index, store  # noqa: E402
+from app.rag.chunking import chunk_text  # noqa: E402
+from app.rag.embeddings import _hash_embed, embed_texts  # noqa: E402
+from app.tools.calculator import calculator_tool  # noqa: E402
+from app.tools.sql_tool import SQLTool  # noqa: E402
+from app.tools.web_tool import _cached_search  # noqa: E402
+from benchmarks.fixtures import build_sample_db, generate_corpus  # noqa: E402
+
+Bench = Callable[[], Any]
+
+_SQL_QUERIES = [
+    "SELECT c.id, c.name, COUNT(o.id) AS total_orders FROM customers c JOIN orders o ON o.customer_id = c.id "
+    "GROUP BY c.id, c.name ORDER BY total_orders DESC, c.id LIMIT 5",
+    "SELECT c.id, c.name, COALESCE(SUM(o.total_amount), 0) AS total_spent FROM customers c JOIN orders o "
+    "ON o.customer_id = c.id GROUP BY c.id, c.name ORDER BY total_spent DESC, c.id LIMIT 3",
+    "SELECT status, COUNT(*) AS total FROM tickets GROUP BY status ORDER BY total DESC, status LIMIT 50",
+    "SELECT id, customer_id, total_amount FROM orders WHERE total_amount > 450 ORDER BY id LIMIT 50",
+]
+
+
+def _cycle(fn: Callable[[Any], Any], inputs: List[Any]) -> Bench:
+    it = itertools.cycle(inputs)
+    return lambda: fn(next(it))
+
+
+def setup_fixtures(tmp: Path, scale: float, seed: int) -> Dict[str, Any]:
+    """
+    Point every stateful module at fixture data under `tmp`; returns shared inputs.
+    """
+    memory._MEM_DB = tmp / "agent_memory.sqlite"
+    metadata_index._META_DB = tmp / "rag_metadata.sqlite"
+    metadata_index._backfilled = set()
+    store._client = chromadb.EphemeralClient()
+    store._collections.clear()
+
+    corpus = generate_corpus(docs=max(1, int(40 * scale)), seed=seed)
+    col = store.get_chroma_collection()
+    chunks = [c for src, text in corpus for c in chunk_text(text, src)]
+    for i in range(0, len(chunks), 500):
+        batch = chunks[i:i + 500]
+        ids = [c.chunk_id for c in batch]
+        metas = [{"source": c.source} for c in batch]
+        col.upsert(ids=ids, documents=[c.text for c in batch], metadatas=metas,
+                   embeddings=embed_texts([c.text for c in batch]))
+        metadata_index.record_chunks(ids, metas)
+
+    db = build_sample_db(
+        tmp / "sample.sqlite",
+        customers=max(10, int(2_000 * scale)),
+        orders=max(100, int(50_000 * scale)),
+        tickets=max(10, int(10_000 * scale)),
+        seed=seed,
+    )
+    runner.sql_tool = SQLTool(db)
+    return {"corpus": corpus, "chunks": chunks, "db": db}
+
+
+def _benchmarks(fx: Dict[str, Any], seed: int) -> Dict[str, Bench]:
+    corpus, chunks = fx["corpus"], fx["chunks"]
+    chunk_texts = [c.text for c in chunks[:256]]
+    big_doc = "\n\n".join(text for _src, text in corpus[:20])
+    messages = [c["message"] for c in generate_cases(256, seed=seed)]
+    expressions = [e for e in map(_extract_expression, messages) if e]
+    sql = SQLTool(fx["db"])
+    states = [
+        {"preferences": {"tone": "concise"}, "last_sources": [f"doc{i:04d}.txt#c{j}" for j in range(4)], "turns": i}
+        for i in range(64)
+    ]
+    for i, s in enumerate(states):
+        memory.save_state(f"bench-{i}", s)
+
+    def agent(mix: Dict[str, float]) -> Bench:
+        cases = list(generate_cases(128, seed=seed, mix=mix))
+        conv = itertools.cycle([f"bench-agent-{i}" for i in range(16)])
+        return _cycle(lambda m: runner.run_agent(m, conversation_id=next(conv)), [c["message"] for c in cases])
+
+    return {
+        "chunk_text/doc_10kb": _cycle(lambda d: chunk_text(d[1], d[0]), corpus),
+        "chunk_text/doc_200kb": lambda: chunk_text(big_doc, "big.txt"),
+        "embed/_hash_embed": _cycle(_hash_embed, chunk_texts),
+        "embed/embed_texts_x32": _cycle(embed_texts, [chunk_texts[i:i + 32] for i in range(0, 256, 32)]),
+        "router/_looks_like_rag": _cycle(_looks_like_rag, messages),
+        "router/_looks_like_sql": _cycle(_looks_like_sql, messages),
+        "router/_looks_like_web": _cycle(_looks_like_web, messages),
+        "router/_extract_expression": _cycle(_extract_expression, messages),
+        "planner/make_plan": _cycle(lambda m: make_plan(m, {}), messages),
+        "calculator/calculator_tool": _cycle(lambda e: calculator_tool({"expression": e}), expressions),
+        "sql/run_cached": _cycle(lambda q: sql.run({"sql": q}), _SQL_QUERIES),
+        "sql/run_uncached": _cycle(lambda q: sql.run({"sql": q, "use_cache": False}), _SQL_QUERIES),
+        "web/_cached_search_exact": _cycle(lambda q: _cached_search(q, 5), ["latest news about openai", "openai latest news"]),
+        "web/_cached_search_fuzzy": _cycle(lambda q: _cached_search(q, 5), ["openai news today", "agent tools practices", "zzz nothing"]),
+        "memory/get_state": _cycle(memory.get_state, [f"bench-{i}" for i in range(64)]),
+        "memory/save_state": _cycle(lambda i: memory.save_state(f"bench-{i}", states[i]), list(range(64))),
+        "agent/run_agent_calculator": agent({"calculator": 1}),
+        "agent/run_agent_sql": agent({"sql": 1}),
+        "agent/run_agent_rag": agent({"rag": 1}),
+        "agent/run_agent_web": agent({"web": 1}),
+        "agent/run_agent_mixed": agent({"calculator": 1, "sql": 1, "rag": 1, "web": 1}),
+    }
+
+
+def _measure(fn: Bench, repeats: int, min_time_s: float) -> Dict[str, Any]:
+    fn()  # warm caches / lazy init outside the timed region
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t0 >= min_time_s or number >= 1 << 20:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number * 1e9)
+    samples.sort()
+    median = samples[len(samples) // 2]
+    return {
+        "ns_per_op": {
+            "min": round(samples[0], 1),
+            "median": round(median, 1),
+            "max": round(samples[-1], 1),
+        },
+        "ops_per_s": round(1e9 / median, 1),
+        "number": number,
+        "repeats": repeats,
+    }
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run(selected: List[str], repeats: int, min_time_s: float, scale: float, seed: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="hotpaths-") as tmp:
+        fx = setup_fixtures(Path(tmp), scale, seed)
+        benches = _benchmarks(fx, seed)
+        results = {}
+        for name, fn in benches.items():
+            if selected and not any(s in name for s in selected):
+                continue
+            results[name] = _measure(fn, repeats, min_time_s)
+            print(f"{name:<32} {results[name]['ns_per_op']['median'] / 1000:>12.1f} us/op", file=sys.stderr)
+        store._client = None
+        store._collections.clear()
+    return {
+        "meta": {
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": scale,
+            "seed": seed,
+            "repeats": repeats,
+            "min_time_s": min_time_s,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    """
+    A regression needs both the median and the best run to be slower by more than
+    `threshold`, so a single noisy repeat does not trip it.
+    """
+    regressions, improvements, unchanged = [], [], []
+    b_res, n_res = base.get("results", {}), new.get("results", {})
+    for name in sorted(set(b_res) & set(n_res)):
+        b, n = b_res[name]["ns_per_op"], n_res[name]["ns_per_op"]
+        ratio = n["median"] / b["median"] if b["median"] else 1.0
+        row = {"name": name, "base_ns": b["median"], "new_ns": n["median"], "ratio": round(ratio, 3)}
+        if ratio > 1 + threshold and n["min"] > b["min"] * (1 + threshold):
+            regressions.append(row)
+        elif ratio < 1 / (1 + threshold):
+            improvements.append(row)
+        else:
+            unchanged.append(name)
+    b_meta, n_meta = base.get("meta", {}), new.get("meta", {})
+    return {
+        "ok": not regressions,
+        "threshold": threshold,
+        "base_rev": b_meta.get("git_rev"),
+        "new_rev": n_meta.get("git_rev"),
+        "comparable": all(b_meta.get(k) == n_meta.get(k) for k in ("scale", "seed", "python")),
+        "regressions": sorted(regressions, key=lambda r: -r["ratio"]),
+        "improvements": sorted(improvements, key=lambda r: r["ratio"]),
+        "unchanged": len(unchanged),
+        "only_in_base": sorted(set(b_res) - set(n_res)),
+        "only_in_new": sorted(set(n_res) - set(b_res)),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--filter", default="", help="comma-separated substrings of benchmark names")
+    ap.add_argument("--repeats", type=int, default=7)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat (calibrates loop count)")
+    ap.add_argument("--quick", action="store_true", help="--repeats 3 --min-time 0.05")
+    ap.add_argument("--scale", type=float, default=1.0, help="fixture size multiplier (corpus docs, DB rows)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write results here as well as stdout")
+    ap.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="diff two result files and exit")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown fraction in --compare")
+    ap.add_argument("--list", action="store_true")
+    args = ap.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        report = compare(base, new, args.threshold)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["ok"] else 1)
+
+    if args.list:
+        with tempfile.TemporaryDirectory(prefix="hotpaths-") as tmp:
+            print("\n".join(_benchmarks(setup_fixtures(Path(tmp), 0.05, args.seed), args.seed)))
+        return
+
+    repeats, min_time = (3, 0.05) if args.quick else (args.repeats, args.min_time)
+    selected: List[str] = [s.strip() for s in args.filter.split(",") if s.strip()]
+    out = run(selected, repeats, min_time, args.scale, args.seed)
+    text = json.dumps(out, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Open-loop HTTP load generator for the API, in-process (ASGI) or against uvicorn,
+plus a capacity search for the max sustainable RPS per worker at a target p99.
+
+Requests fire at fixed arrival times (constant or Poisson) whether or not earlier
+ones have finished. Latency is measured from the scheduled time, so a saturated
+server shows up as queueing delay instead of quietly lowering the offered rate.
+The in-process and --uvicorn targets run the app on benchmark fixtures
+(see hotpaths.setup_fixtures), never on app/db.
+
+Run from backend/:
+    python -m benchmarks.loadgen --rps 50 --duration 20 --mix chat=6,rag=2,sql=2,index=0.2
+    python -m benchmarks.loadgen --uvicorn 2 --rps 100 --duration 30
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --rps 20
+    python -m benchmarks.loadgen --capacity --target-p99 250 --uvicorn 1
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.eval.datasets import generate_cases
+from app.eval.streaming import LatencyHistogram
+from benchmarks.fixtures import _CORPUS_WORDS, generate_corpus
+from benchmarks.hotpaths import _SQL_QUERIES, setup_fixtures
+
+SCENARIOS = ("chat", "rag", "sql", "index")
+DEFAULT_MIX = "chat=6,rag=2,sql=2,index=0.2"
+# /// upper bounds (ms) of the reported latency histogram buckets
+HIST_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+def fixture_app():
+    """
+    uvicorn factory (and in-process target): the real app with its stateful modules
+    pointed at per-process fixture data.
+    """
+    from app.routes import rag as rag_routes
+    from app.routes import sql as sql_routes
+    from app.tools.sql_tool import SQLTool
+
+    tmp = Path(tempfile.mkdtemp(prefix="loadgen-"))
+    atexit.register(shutil.rmtree, tmp, True)
+    fx = setup_fixtures(tmp, float(os.getenv("LOADGEN_SCALE", "0.25")), int(os.getenv("LOADGEN_SEED", "0")))
+    sql_routes.tool = SQLTool(fx["db"])
+    rag_routes.UPLOAD_DIR = tmp / "uploads"
+    rag_routes.UPLOAD_DIR.mkdir()
+
+    from app.main import create_app
+
+    return create_app()
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario in mix: {name} (expected {', '.join(SCENARIOS)})")
+        mix[name] = float(w or 1)
+    return mix
+
+
+class Traffic:
+    """
+    Seeded request stream: (scenario, method, path, httpx request kwargs).
+    """
+
+    def __init__(self, mix: Dict[str, float], seed: int = 0):
+        self.rng = random.Random(seed)
+        self.names = [n for n in SCENARIOS if mix.get(n, 0) > 0]
+        self.weights = [mix[n] for n in self.names]
+        self.messages = [c["message"] for c in generate_cases(512, seed=seed)]
+        # /// a fixed pool of upload names, so re-indexing upserts instead of growing the collection forever
+        self.docs = [(f"load-{i:02d}.txt", text.encode("utf-8")) for i, (_src, text) in
+                     enumerate(generate_corpus(docs=16, words_per_doc=400, seed=seed))]
+        self.i = 0
+
+    def next(self) -> Tuple[str, str, str, Dict[str, Any]]:
+        self.i += 1
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == "chat":
+            body = {"message": self.rng.choice(self.messages), "conversation_id": f"load-{self.i % 64}"}
+            return name, "POST", "/agent/chat", {"json": body}
+        if name == "rag":
+            body = {"query": " ".join(self.rng.choices(_CORPUS_WORDS, k=6)), "top_k": 4}
+            return name, "POST", "/rag/query", {"json": body}
+        if name == "sql":
+            return name, "POST", "/sql/query", {"json": {"sql": self.rng.choice(_SQL_QUERIES)}}
+        filename, content = self.rng.choice(self.docs)
+        return name, "POST", "/rag/index", {"files": [("files", (filename, content, "text/plain"))]}
+
+
+class EndpointStats:
+    def __init__(self):
+        self.n = 0
+        self.ok = 0
+        self.status: Dict[str, int] = {}
+        self.latency = LatencyHistogram()  # from scheduled send time (includes client-side queueing)
+        self.service = LatencyHistogram()  # from actual send time
+        self.buckets = [0] * (len(HIST_BOUNDS_MS) + 1)
+
+    def add(self, status: str, latency_ms: float, service_ms: float) -> None:
+        self.n += 1
+        self.ok += status.startswith("2")
+        self.status[status] = self.status.get(status, 0) + 1
+        self.latency.add(latency_ms)
+        self.service.add(service_ms)
+        for i, bound in enumerate(HIST_BOUNDS_MS):
+            if latency_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def to_dict(self, duration_s: float) -> Dict[str, Any]:
+        return {
+            "requests": self.n,
+            "throughput_rps": round(self.ok / duration_s, 2) if duration_s else 0.0,
+            "error_rate": round(1 - self.ok / self.n, 4) if self.n else 0.0,
+            "status": dict(sorted(self.status.items())),
+            "latency_ms": self.latency.to_dict(),
+            "service_ms": self.service.to_dict(),
+            "histogram_ms": {
+                **{f"le_{b}": c for b, c in zip(HIST_BOUNDS_MS, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    rps: float,
+    duration_s: float,
+    mix: Dict[str, float],
+    arrival: str = "poisson",
+    max_inflight: int = 512,
+    timeout_s: float = 30.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Offer `rps` for `duration_s`, then wait for stragglers. Arrivals that would exceed
+    `max_inflight` outstanding requests are counted as dropped rather than delayed.
+    """
+    traffic = Traffic(mix, seed)
+    rng = random.Random(seed + 1)
+    loop = asyncio.get_running_loop()
+    per: Dict[str, EndpointStats] = {}
+    overall = EndpointStats()
+    inflight: set = set()
+    dropped = 0
+
+    async def one(name: str, method: str, path: str, kwargs: Dict[str, Any], scheduled: float) -> None:
+        sent = loop.time()
+        try:
+            r = await client.request(method, path, timeout=timeout_s, **kwargs)
+            status = str(r.status_code)
+        except Exception as e:
+            status = type(e).__name__
+        done = loop.time()
+        lat, svc = (done - scheduled) * 1000, (done - sent) * 1000
+        per.setdefault(name, EndpointStats()).add(status, lat, svc)
+        overall.add(status, lat, svc)
+
+    start = loop.time()
+    t = 0.0
+    offered = 0
+    while True:
+        t += rng.expovariate(rps) if arrival == "poisson" else 1.0 / rps
+        if t >= duration_s:
+            break
+        delay = start + t - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        offered += 1
+        req = traffic.next()
+        if len(inflight) >= max_inflight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(one(*req, scheduled=start + t))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.wait(list(inflight), timeout=timeout_s)
+    elapsed = max(loop.time() - start, duration_s)
+
+    return {
+        "offered_rps": rps,
+        "arrival": arrival,
+        "duration_s": round(elapsed, 3),
+        "offered": offered,
+        "completed": overall.n,
+        "dropped": dropped,
+        "unfinished": len(inflight),
+        **overall.to_dict(elapsed),
+        "endpoints": {name: s.to_dict(elapsed) for name, s in sorted(per.items())},
+    }
+
+
+def sustainable(res: Dict[str, Any], target_p99_ms: float, max_error_rate: float) -> bool:
+    return (
+        res["latency_ms"]["p99"] <= target_p99_ms
+        and res["error_rate"] <= max_error_rate
+        and res["dropped"] == 0
+        and res["unfinished"] == 0
+        and res["completed"] >= 0.95 * res["offered"]
+    )
+
+
+async def find_capacity(
+    client: httpx.AsyncClient,
+    mix: Dict[str, float],
+    target_p99_ms: float,
+    workers: int,
+    start_rps: float = 5.0,
+    max_rps: float = 5000.0,
+    step_s: float = 10.0,
+    refine: int = 4,
+    max_error_rate: float = 0.01,
+    arrival: str = "poisson",
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Double the rate until a step misses the p99 / error budget, then bisect between
+    the last good and first bad rate.
+    """
+    steps: List[Dict[str, Any]] = []
+
+    async def probe(rps: float) -> bool:
+        res = await run_load(client, rps, step_s, mix, arrival=arrival, seed=seed + len(steps))
+        ok = sustainable(res, target_p99_ms, max_error_rate)
+        steps.append({
+            "rps": round(rps, 2),
+            "ok": ok,
+            "achieved_rps": res["throughput_rps"],
+            "p50_ms": res["latency_ms"]["p50"],
+            "p99_ms": res["latency_ms"]["p99"],
+            "error_rate": res["error_rate"],
+            "dropped": res["dropped"],
+        })
+        print(json.dumps(steps[-1]), file=sys.stderr)
+        await asyncio.sleep(1.0)  # /// let stragglers and background work settle between steps
+        return ok
+
+    good: Optional[float] = None
+    bad: Optional[float] = None
+    rps = start_rps
+    while rps <= max_rps:
+        if await probe(rps):
+            good = rps
+            rps *= 2
+        else:
+            bad = rps
+            break
+    if bad is not None:
+        lo = good or 0.0
+        for _ in range(refine):
+            mid = (lo + bad) / 2
+            if mid < 0.5:
+                break
+            if await probe(mid):
+                lo = good = mid
+            else:
+                bad = mid
+
+    return {
+        "target_p99_ms": target_p99_ms,
+        "max_error_rate": max_error_rate,
+        "workers": workers,
+        "max_rps": round(good, 2) if good else 0.0,
+        "max_rps_per_worker": round(good / workers, 2) if good else 0.0,
+        "limited_by_search_ceiling": bad is None,
+        "steps": steps,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(workers: int, scale: float, seed: int, ready_timeout_s: float = 180.0) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {**os.environ, "LOADGEN_SCALE": str(scale), "LOADGEN_SEED": str(seed), "EMBED_BACKEND": "hash"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.loadgen:fixture_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=str(Path(__file__).resolve().parents[1]),
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + ready_timeout_s
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(url + "/health", timeout=1.0).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not become ready in time")
+
+
+async def _main(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    proc = None
+    if args.url:
+        target, workers = args.url, args.workers
+        client = httpx.AsyncClient(base_url=args.url, limits=httpx.Limits(max_connections=args.max_inflight))
+    elif args.uvicorn:
+        proc, url = start_uvicorn(args.uvicorn, args.scale, args.seed)
+        target, workers = f"uvicorn x{args.uvicorn}", args.uvicorn
+        client = httpx.AsyncClient(base_url=url, limits=httpx.Limits(max_connections=args.max_inflight))
+    else:
+        os.environ.setdefault("EMBED_BACKEND", "hash")
+        os.environ["LOADGEN_SCALE"], os.environ["LOADGEN_SEED"] = str(args.scale), str(args.seed)
+        # /// client and app share one event loop and process: a lower bound on per-worker capacity
+        target, workers = "inproc", 1
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fixture_app()), base_url="http://loadgen")
+
+    try:
+        meta = {"target": target, "workers": workers, "mix": mix, "scale": args.scale, "seed": args.seed}
+        if args.capacity:
+            report = await find_capacity(
+                client, mix, args.target_p99, workers,
+                start_rps=args.rps, step_s=args.duration, max_error_rate=args.max_error_rate,
+                arrival=args.arrival, seed=args.seed,
+            )
+            return {"meta": meta, "capacity": report}
+        res = await run_load(client, args.rps, args.duration, mix, arrival=args.arrival,
+                             max_inflight=args.max_inflight, seed=args.seed)
+        return {"meta": meta, "load": res}
+    finally:
+        await client.aclose()
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", help="existing server to target (default: in-process ASGI)")
+    ap.add_argument("--uvicorn", type=int, default=0, help="spawn uvicorn with N workers on fixture data")
+    ap.add_argument("--workers", type=int, default=1, help="worker count behind --url (for per-worker figures)")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights over {', '.join(SCENARIOS)}")
+    ap.add_argument("--rps", type=float, default=20.0, help="offered rate (capacity mode: starting rate)")
+    ap.add_argument("--duration", type=float, default=15.0, help="seconds per run (capacity mode: per step)")
+    ap.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    ap.add_argument("--max-inflight", type=int, default=512)
+    ap.add_argument("--capacity", action="store_true", help="search for max sustainable RPS at --target-p99")
+    ap.add_argument("--target-p99", type=float, default=250.0, help="ms")
+    ap.add_argument("--max-error-rate", type=float, default=0.01)
+    ap.add_argument("--scale", type=float, default=0.25, help="fixture size multiplier")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write the report here as well as stdout")
+    args = ap.parse_args()
+
+    out = asyncio.run(_main(args))
+    text = json.dumps(out, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Multi-worker memory and startup: the current layout (uvicorn --workers, one spawned
+interpreter per worker) against app.serve (app, fixtures and embedding model loaded
+once in a parent, workers forked from it).
+
+For each layout it records time to first /health, time until a first burst of mixed
+traffic (chat, rag, sql) completes (lazy per-worker setup shows up here), and
+per-process RSS / PSS / USS from /proc/<pid>/smaps_rollup. PSS splits shared pages
+between the processes sharing them, so its total is the layout's real footprint; RSS
+counts every shared page once per process.
+
+Run from backend/:
+    python -m benchmarks.prefork --workers 2
+    python -m benchmarks.prefork --workers 4 --layouts uvicorn,prefork,fork --scale 0.5 --out reports/prefork.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.loadgen import Traffic, _free_port
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+FIXTURE_APP = "benchmarks.loadgen:fixture_app"
+LAYOUTS = ("uvicorn", "prefork", "fork")
+
+
+def _command(layout: str, workers: int, port: int) -> List[str]:
+    if layout == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", FIXTURE_APP, "--factory", "--host", "127.0.0.1",
+                "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    # /// "fork": app.serve without --preload, i.e. forked workers that each build the app themselves
+    preload = "--preload" if layout == "prefork" else "--no-preload"
+    return [sys.executable, "-m", "app.serve", "--factory", "--app", FIXTURE_APP, "--port", str(port),
+            "--workers", str(workers), preload]
+
+
+def _children(pid: int) -> List[int]:
+    out = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            stat = Path(f"/proc/{entry}/stat").read_text()
+            cmdline = Path(f"/proc/{entry}/cmdline").read_bytes()
+        except OSError:
+            continue
+        # /// field 4 (after the parenthesised comm) is the parent pid
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid and b"resource_tracker" not in cmdline:
+            out.append(int(entry))
+    return sorted(out)
+
+
+def _memory(pid: int) -> Dict[str, float]:
+    fields: Dict[str, int] = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, _, rest = line.partition(":")
+        fields[name] = int(rest.split()[0])
+    mb = lambda kb: round(kb / 1024, 1)  # noqa: E731
+    return {
+        "rss_mb": mb(fields.get("Rss", 0)),
+        "pss_mb": mb(fields.get("Pss", 0)),
+        "uss_mb": mb(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)),
+    }
+
+
+async def _burst(url: str, n: int, seed: int) -> Dict[str, Any]:
+    traffic = Traffic({"chat": 2, "rag": 2, "sql": 1}, seed=seed)
+    reqs = [traffic.next() for _ in range(n)]
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+
+        async def one(req):
+            _name, method, path, kw = req
+            t0 = time.perf_counter()
+            r = await client.request(method, path, **kw)
+            return r.status_code, (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        res = await asyncio.gather(*[one(r) for r in reqs])
+    lat = sorted(ms for _s, ms in res)
+    return {
+        "requests": n,
+        "ok": sum(1 for s, _ms in res if s == 200),
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "p50_ms": round(lat[len(lat) // 2], 1),
+        "max_ms": round(lat[-1], 1),
+    }
+
+
+def measure(layout: str, workers: int, scale: float, seed: int, burst: int, timeout_s: float = 300.0) -> Dict[str, Any]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "LOADGEN_SCALE": str(scale), "LOADGEN_SEED": str(seed)}
+    env.setdefault("EMBED_BACKEND", "hash")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(_command(layout, workers, port), cwd=str(BACKEND_DIR), env=env,
+                            stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{layout} exited with code {proc.returncode}")
+            if time.perf_counter() - t0 > timeout_s:
+                raise RuntimeError(f"{layout} did not become ready in {timeout_s}s")
+            try:
+                if httpx.get(url + "/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+        ready_s = time.perf_counter() - t0
+        first = asyncio.run(_burst(url, burst * workers, seed))
+        warm_s = time.perf_counter() - t0
+        # /// let every worker finish lazy setup (uvicorn workers start independently of /health)
+        time.sleep(1.0)
+
+        procs = {"parent": _memory(proc.pid)}
+        worker_pids = _children(proc.pid)
+        for i, pid in enumerate(worker_pids):
+            procs[f"worker{i}"] = _memory(pid)
+        totals = {k: round(sum(p[k] for p in procs.values()), 1) for k in ("rss_mb", "pss_mb", "uss_mb")}
+        per_worker = [procs[f"worker{i}"] for i in range(len(worker_pids))]
+        return {
+            "layout": layout,
+            "workers": len(worker_pids),
+            "ready_s": round(ready_s, 3),
+            "warm_s": round(warm_s, 3),
+            "first_burst": first,
+            "processes": procs,
+            "total": totals,
+            "per_worker_avg": {
+                k: round(sum(p[k] for p in per_worker) / max(len(per_worker), 1), 1) for k in ("rss_mb", "pss_mb", "uss_mb")
+            },
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--layouts", default="uvicorn,prefork", help=f"comma-separated: {', '.join(LAYOUTS)}")
+    ap.add_argument("--scale", type=float, default=0.25, help="fixture size (see hotpaths.setup_fixtures)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--burst", type=int, default=16, help="first-burst requests per worker")
+    ap.add_argument("--out", help="write the report here as well as stdout")
+    args = ap.parse_args()
+
+    layouts = [name.strip() for name in args.layouts.split(",") if name.strip()]
+    for name in layouts:
+        if name not in LAYOUTS:
+            raise SystemExit(f"unknown layout {name!r} (expected {', '.join(LAYOUTS)})")
+
+    out = {
+        "config": {"workers": args.workers, "scale": args.scale, "seed": args.seed,
+                   "embed_backend": os.getenv("EMBED_BACKEND", "hash")},
+        "layouts": [measure(name, args.workers, args.scale, args.seed, args.burst) for name in layouts],
+    }
+    text = json.dumps(out, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of /rag/query/batch-style retrieval vs a loop of single queries.
+
+Run from backend/:
+    python -m benchmarks.rag_batch --chunks 5000 --queries 300
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+# /// deterministic, offline embeddings for benchmarking
+os.environ.setdefault("EMBED_BACKEND", "hash")
+
+import chromadb  # noqa: E402
+
+from app.rag import store  # noqa: E402
+from app.rag.embeddings import embed_texts  # noqa: E402
+from app.rag.retrieval import retrieve, retrieve_batch  # noqa: E402
+
+_WORDS = (
+    "policy resume summary experience python sql agent retrieval vector cache "
+    "latency throughput customer order ticket refund invoice shipping contract"
+).split()
+
+
+def _seed(n_chunks: int, rnd: random.Random) -> None:
+    # /// in-memory Chroma so the benchmark never touches app/db/chroma
+    store._client = chromadb.EphemeralClient()
+    store._collections.clear()
+    col = store.get_chroma_collection()
+
+    docs = [" ".join(rnd.choices(_WORDS, k=60)) for _ in range(n_chunks)]
+    ids = [f"bench.txt#c{i}" for i in range(n_chunks)]
+    metas = [{"source": "bench.txt"} for _ in range(n_chunks)]
+    for i in range(0, n_chunks, 1000):
+        col.upsert(
+            ids=ids[i:i + 1000],
+            documents=docs[i:i + 1000],
+            metadatas=metas[i:i + 1000],
+            embeddings=embed_texts(docs[i:i + 1000]),
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=5000)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--dup-rate", type=float, default=0.2)
+    ap.add_argument("--top-k", type=int, default=4)
+    args = ap.parse_args()
+
+    rnd = random.Random(7)
+    _seed(args.chunks, rnd)
+
+    queries = []
+    for _ in range(args.queries):
+        if queries and rnd.random() < args.dup_rate:
+            queries.append(rnd.choice(queries))
+        else:
+            queries.append({"query": " ".join(rnd.choices(_WORDS, k=6)), "top_k": args.top_k})
+
+    t0 = time.perf_counter()
+    for q in queries:
+        retrieve(q["query"], top_k=q["top_k"])
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    out = retrieve_batch(queries)
+    batch_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        "chunks": args.chunks,
+        "queries": len(queries),
+        "unique_queries": out["unique_queries"],
+        "loop_qps": round(len(queries) / loop_s, 1),
+        "batch_qps": round(len(queries) / batch_s, 1),
+        "speedup": round(loop_s / batch_s, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
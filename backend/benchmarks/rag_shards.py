@@ -0,0 +1,84 @@
+"""
+Query latency as the corpus grows: one collection vs the same corpus split into shards.
+
+Run from backend/:
+    python -m benchmarks.rag_shards --chunks 20000 --shards 4
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+# /// deterministic, offline embeddings for benchmarking
+os.environ.setdefault("EMBED_BACKEND", "hash")
+
+import chromadb  # noqa: E402
+
+from app.rag import store  # noqa: E402
+from app.rag.embeddings import embed_texts  # noqa: E402
+from app.rag.retrieval import retrieve  # noqa: E402
+
+_WORDS = (
+    "policy resume summary experience python sql agent retrieval vector cache "
+    "latency throughput customer order ticket refund invoice shipping contract"
+).split()
+
+
+def _fill(name: str, docs: list[str], offset: int) -> None:
+    col = store.get_chroma_collection(name, create=True)
+    for i in range(0, len(docs), 1000):
+        part = docs[i:i + 1000]
+        col.upsert(
+            ids=[f"bench.txt#c{offset + i + j}" for j in range(len(part))],
+            documents=part,
+            metadatas=[{"source": "bench.txt"} for _ in part],
+            embeddings=embed_texts(part),
+        )
+
+
+def _latency(queries: list[str], collections: list[str], top_k: int) -> dict:
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        retrieve(q, top_k=top_k, collections=collections, lazy=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {
+        "p50_ms": round(statistics.median(times), 2),
+        "p95_ms": round(times[int(len(times) * 0.95) - 1], 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=20000)
+    ap.add_argument("--shards", type=int, default=4)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=4)
+    args = ap.parse_args()
+
+    rnd = random.Random(5)
+    store._client = chromadb.EphemeralClient()
+    store._collections.clear()
+
+    docs = [" ".join(rnd.choices(_WORDS, k=40)) for _ in range(args.chunks)]
+    _fill("bench-single", docs, 0)
+
+    per = (len(docs) + args.shards - 1) // args.shards
+    shard_names = [f"bench-shard-{i}" for i in range(args.shards)]
+    for i, name in enumerate(shard_names):
+        _fill(name, docs[i * per:(i + 1) * per], i * per)
+
+    queries = [" ".join(rnd.choices(_WORDS, k=6)) for _ in range(args.queries)]
+    print(json.dumps({
+        "chunks": args.chunks,
+        "shards": args.shards,
+        "single_collection": _latency(queries, ["bench-single"], args.top_k),
+        "sharded_fan_out": _latency(queries, shard_names, args.top_k),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Bytes moved and memory per request: eager retrieval vs two-phase (lazy) retrieval.
+
+Eager = documents for every match (what _run_rag used to do).
+Lazy  = ids/distances/metadata for every match, preview text for the top 3 only.
+
+Run from backend/:
+    python -m benchmarks.rag_two_phase --chunks 3000 --chunk-chars 4000 --top-k 10
+"""
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+
+# /// deterministic, offline embeddings for benchmarking
+os.environ.setdefault("EMBED_BACKEND", "hash")
+
+import chromadb  # noqa: E402
+
+from app.rag import store  # noqa: E402
+from app.rag.embeddings import embed_texts  # noqa: E402
+from app.rag.retrieval import hydrate_passages, retrieve  # noqa: E402
+
+_WORDS = (
+    "policy resume summary experience python sql agent retrieval vector cache "
+    "latency throughput customer order ticket refund invoice shipping contract"
+).split()
+
+
+def _seed(n_chunks: int, chunk_chars: int, rnd: random.Random) -> None:
+    store._client = chromadb.EphemeralClient()
+    store._collections.clear()
+    col = store.get_chroma_collection()
+
+    n_words = max(1, chunk_chars // 7)
+    for i in range(0, n_chunks, 500):
+        docs = [" ".join(rnd.choices(_WORDS, k=n_words)) for _ in range(min(500, n_chunks - i))]
+        col.upsert(
+            ids=[f"bench.txt#c{i + j}" for j in range(len(docs))],
+            documents=docs,
+            metadatas=[{"source": "bench.txt"} for _ in docs],
+            embeddings=embed_texts(docs),
+        )
+
+
+def _measure(fn, queries):
+    doc_bytes = 0
+    peaks = []
+    t0 = time.perf_counter()
+    for q in queries:
+        tracemalloc.start()
+        doc_bytes += fn(q)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - t0
+    return {
+        "avg_doc_bytes": int(doc_bytes / len(queries)),
+        "avg_peak_kib": round(sum(peaks) / len(peaks) / 1024, 1),
+        "avg_ms": round(elapsed / len(queries) * 1000, 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=3000)
+    ap.add_argument("--chunk-chars", type=int, default=4000)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--top-k", type=int, default=10)
+    args = ap.parse_args()
+
+    rnd = random.Random(11)
+    _seed(args.chunks, args.chunk_chars, rnd)
+    queries = [" ".join(rnd.choices(_WORDS, k=6)) for _ in range(args.queries)]
+
+    def eager(q: str) -> int:
+        return retrieve(q, top_k=args.top_k)["doc_bytes"]
+
+    def lazy(q: str) -> int:
+        out = retrieve(q, top_k=args.top_k, lazy=True)
+        return out["doc_bytes"] + hydrate_passages(out["passages"][:3])
+
+    print(json.dumps({
+        "chunks": args.chunks,
+        "chunk_chars": args.chunk_chars,
+        "top_k": args.top_k,
+        "eager": _measure(eager, queries),
+        "two_phase": _measure(lazy, queries),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
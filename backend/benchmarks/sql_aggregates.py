@@ -0,0 +1,86 @@
+"""
+Agent SQL templates: raw GROUP BY queries vs trigger-maintained aggregates,
+plus the write-side cost the triggers add.
+
+Run from backend/:
+    python -m benchmarks.sql_aggregates --orders 1000000
+"""
+import argparse
+import json
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.agent.runner import _deterministic_sql_from_question
+from app.tools import sql_aggregates
+from app.tools.sql_tool import SQLTool
+from benchmarks.fixtures import build_sample_db
+
+_QUESTIONS = {
+    "top_by_orders": "Show top 5 customers by total orders",
+    "top_by_spend": "Top 5 customers by total spent",
+    "ticket_status": "How many tickets per status?",
+}
+
+
+def _median_ms(tool: SQLTool, sql: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        tool.run({"sql": sql, "use_cache": False})
+        times.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(times), 3)
+
+
+def _insert_ms(db: Path, n: int) -> float:
+    conn = sqlite3.connect(str(db))
+    t0 = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO orders (customer_id, total_amount, created_at) VALUES (?, ?, '2025-06-01')",
+        ((1 + i % 100, 10.0) for i in range(n)),
+    )
+    conn.commit()
+    conn.close()
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=1_000_000)
+    ap.add_argument("--customers", type=int, default=10_000)
+    ap.add_argument("--tickets", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--inserts", type=int, default=10_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build_sample_db(
+            Path(tmp) / "sample.sqlite", customers=args.customers, orders=args.orders, tickets=args.tickets
+        )
+        tool = SQLTool(db_path=db)
+        sqls = {k: _deterministic_sql_from_question(q) for k, q in _QUESTIONS.items()}
+
+        raw = {k: _median_ms(tool, s, args.repeat) for k, s in sqls.items()}
+        insert_raw = _insert_ms(db, args.inserts)
+
+        t0 = time.perf_counter()
+        sql_aggregates.install(db)
+        install_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        agg = {k: _median_ms(tool, s, args.repeat) for k, s in sqls.items()}
+        insert_agg = _insert_ms(db, args.inserts)
+
+    print(json.dumps({
+        "orders": args.orders,
+        "customers": args.customers,
+        "tickets": args.tickets,
+        "query_median_ms": {k: {"raw": raw[k], "materialized": agg[k]} for k in sqls},
+        "install_and_rebuild_ms": install_ms,
+        f"insert_{args.inserts}_orders_ms": {"no_triggers": insert_raw, "with_triggers": insert_agg},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+SQLTool throughput at N concurrent clients: pooled read-only connections
+vs the previous connect-per-query implementation.
+
+Run from backend/:
+    python -m benchmarks.sql_pool --clients 1 4 8 16 --queries 2000
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.agent.runner import _deterministic_sql_from_question
+from app.tools.sql_tool import SQLTool, _ensure_safe_select
+from benchmarks.fixtures import build_sample_db
+
+_QUESTIONS = [
+    "Show top 5 customers by total orders",
+    "Top 3 customers by total spent",
+    "How many tickets per status?",
+]
+
+
+def _legacy_run(db_path: Path, sql: str) -> int:
+    # /// what SQLTool.run did before pooling: fresh connection per query
+    sql = _ensure_safe_select(sql)
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(sql).fetchall()
+    data = [dict(r) for r in rows]
+    conn.close()
+    return len(data)
+
+
+def _qps(fn, sqls, clients: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as ex:
+        list(ex.map(fn, sqls))
+    return round(len(sqls) / (time.perf_counter() - t0), 1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8, 16])
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--orders", type=int, default=5000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build_sample_db(Path(tmp) / "sample.sqlite", orders=args.orders)
+        tool = SQLTool(db_path=db)
+        templates = [_deterministic_sql_from_question(q) for q in _QUESTIONS]
+        sqls = [templates[i % len(templates)] for i in range(args.queries)]
+
+        rows = []
+        for clients in args.clients:
+            rows.append({
+                "clients": clients,
+                "legacy_qps": _qps(lambda s: _legacy_run(db, s), sqls, clients),
+                "pooled_qps": _qps(lambda s: tool.run({"sql": s}), sqls, clients),
+            })
+
+    print(json.dumps({"orders": args.orders, "queries": args.queries, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Peak memory for a large SELECT: fetchall + dict rows (SQLTool.run shape)
+vs NDJSON streaming and paged cursors.
+
+Run from backend/:
+    python -m benchmarks.sql_stream --orders 1000000
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.tools.sql_tool import SQLTool
+from app.tools.sqlite_pool import get_pool
+from benchmarks.fixtures import build_sample_db
+
+_SQL = "SELECT id, customer_id, total_amount, created_at FROM orders"
+
+
+def _measure(fn) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"rows": rows, "seconds": round(elapsed, 2), "peak_mib": round(peak / 2**20, 1)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build_sample_db(Path(tmp) / "sample.sqlite", orders=args.orders, tickets=10)
+        tool = SQLTool(db_path=db)
+
+        def fetchall_dicts() -> int:
+            with get_pool(db).connection() as conn:
+                return len([dict(r) for r in conn.execute(_SQL).fetchall()])
+
+        def stream() -> int:
+            n = 0
+            for chunk in tool.stream_ndjson(_SQL):
+                n += chunk.count("\n")
+            return n - 2  # header + footer
+
+        def paged() -> int:
+            n, token = 0, None
+            while True:
+                page = tool.page(_SQL, page_size=5000, page_token=token, keyset="id")
+                n += page["row_count"]
+                token = page["next_page_token"]
+                if not token:
+                    return n
+
+        print(json.dumps({
+            "orders": args.orders,
+            "fetchall_dicts": _measure(fetchall_dicts),
+            "ndjson_stream": _measure(stream),
+            "keyset_pages": _measure(paged),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
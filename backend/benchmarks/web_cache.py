@@ -0,0 +1,93 @@
+"""
+Cached web lookup latency at 100k entries: indexed in-memory map vs the
+previous json.load + linear containment scan on every query.
+
+Run from backend/:
+    python -m benchmarks.web_cache --entries 100000 --queries 200
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.tools.web_cache import WebCacheIndex, normalize_query
+
+_WORDS = (
+    "python rust golang openai llama vector database release news guide tutorial benchmark "
+    "sqlite postgres redis kafka docker kubernetes fastapi chroma embedding latency cache "
+    "agent planner router security update pricing roadmap conference paper model"
+).split()
+
+
+def _build_cache(path: Path, entries: int, vocab_size: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    # /// a few very common words plus a long tail, like real query logs
+    vocab = _WORDS + [f"topic{i}" for i in range(vocab_size)]
+    data = {}
+    while len(data) < entries:
+        words = rnd.sample(_WORDS, 2) + rnd.sample(vocab, rnd.randint(2, 4)) + [f"t{len(data)}"]
+        key = " ".join(words)
+        data[key] = [{"title": key, "url": f"https://example.com/{len(data)}", "snippet": key}]
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return list(data)
+
+
+def _legacy_lookup(path: Path, query: str):
+    # /// what _cached_search did before: reload the file, then first containing key wins
+    with open(path, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+    qn = normalize_query(query)
+    if qn in cache:
+        return cache[qn]
+    for key, items in cache.items():
+        if key in qn or qn in key:
+            return items
+    return []
+
+
+def _ms_per_query(fn, queries) -> float:
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return round((time.perf_counter() - t0) * 1000 / len(queries), 3)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--legacy-queries", type=int, default=5)
+    ap.add_argument("--vocab", type=int, default=5000, help="long-tail vocabulary size (0 = only common words)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "web_cache.json"
+        keys = _build_cache(path, args.entries, args.vocab)
+        rnd = random.Random(1)
+        sample = rnd.sample(keys, args.queries)
+        workloads = {
+            "exact": [k.upper() for k in sample],
+            "fuzzy": ["latest " + " ".join(k.split()[:-1]) + " today" for k in sample],
+            "miss": [f"zzz unknown topic {i}" for i in range(args.queries)],
+        }
+
+        idx = WebCacheIndex(path)
+        t0 = time.perf_counter()
+        idx.snapshot()
+        load_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        rows = []
+        for name, queries in workloads.items():
+            rows.append({
+                "workload": name,
+                "legacy_ms_per_query": _ms_per_query(lambda q: _legacy_lookup(path, q), queries[: args.legacy_queries]),
+                "indexed_ms_per_query": _ms_per_query(idx.lookup, queries),
+            })
+
+    print(json.dumps({"entries": args.entries, "vocab": args.vocab, "index_build_ms": load_ms, "reloads": idx.reloads, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
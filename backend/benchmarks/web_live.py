@@ -0,0 +1,84 @@
+"""
+Live web fetch against a local mock search server:
+- sequential queries: bare requests.get per query vs the pooled keep-alive client
+- provider race: slow + failing + healthy backends, first good answer wins
+- dead backend: time per query with and without the circuit breaker open
+
+Run from backend/:
+    python -m benchmarks.web_live --queries 200 --slow 0.5
+"""
+import argparse
+import json
+import time
+
+import requests
+
+from app.tools.web_http import CircuitBreaker, LiveSearchClient, SearchProvider
+from app.tools.web_tool import _parse_ddg_html, _ua_headers
+from benchmarks.fixtures import start_mock_search_server
+
+
+def _client(bases, paths, failures: int = 3) -> LiveSearchClient:
+    # /// one mock server per provider, so each gets its own per-host slots (like real providers)
+    providers = [
+        SearchProvider(p.strip("/"), f"{b}{p}", CircuitBreaker(failures=failures)) for b, p in zip(bases, paths)
+    ]
+    return LiveSearchClient(providers, parse=_parse_ddg_html, headers=_ua_headers(), negative_ttl_s=0)
+
+
+def _ms_per_query(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(f"query {i}")
+    return round((time.perf_counter() - t0) * 1000 / n, 3)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--slow", type=float, default=0.5)
+    args = ap.parse_args()
+
+    servers = [start_mock_search_server(slow_s=args.slow) for _ in range(3)]
+    bases = [s[1] for s in servers]
+    base = bases[0]
+    try:
+        def bare(q):
+            # /// what _live_ddg_search did before: new connection per query
+            r = requests.get(f"{base}/ok/", params={"q": q}, headers=_ua_headers(), timeout=20)
+            r.raise_for_status()
+            return _parse_ddg_html(r.text, 5)
+
+        pooled = _client(bases, ["/ok/"])
+        race = _client(bases, ["/slow/", "/fail/", "/ok/"])
+        slow_only = _client(bases, ["/slow/"])
+        dead = _client(bases, ["/fail/"], failures=3)
+
+        n_slow = max(3, args.queries // 50)
+        report = {
+            "queries": args.queries,
+            "slow_backend_s": args.slow,
+            "sequential_ms_per_query": {
+                "bare_requests_get": _ms_per_query(bare, args.queries),
+                "pooled_session": _ms_per_query(lambda q: pooled.search(q, 5), args.queries),
+            },
+            "race_ms_per_query": {
+                "slow_backend_only": _ms_per_query(lambda q: slow_only.search(q, 5), n_slow),
+                "slow+fail+ok": _ms_per_query(lambda q: race.search(q, 5), args.queries),
+                "wins": race.stats["wins"],
+                "slow_host_busy_skips": race.stats["host_busy"],
+            },
+            "dead_backend": {
+                "ms_per_query": _ms_per_query(lambda q: dead.search(q, 5), args.queries),
+                "requests_sent": dead.stats["requests"],
+                "breaker": dead.breaker_states(),
+            },
+        }
+    finally:
+        for server, _base, _hits in servers:
+            server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+DDG result-page parsing: pages/sec and peak traced memory per parser
+(bs4 + html.parser reference, streaming stdlib, lxml when installed).
+
+Run from backend/:
+    python -m benchmarks.web_parse --pages 200 --max-results 5 30
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from app.tools.web_parse import PARSERS, lxml_html, parse_bs4
+from benchmarks.fixtures import ddg_result_pages
+
+
+def _measure(fn, pages, max_results: int) -> dict:
+    t0 = time.perf_counter()
+    for html in pages:
+        fn(html, max_results)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    for html in pages[:20]:
+        fn(html, max_results)
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"pages_per_s": round(len(pages) / elapsed, 1), "peak_kib": round(peak / 1024, 1)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--max-results", type=int, nargs="+", default=[5, 30])
+    args = ap.parse_args()
+
+    pages = ddg_result_pages(pages=args.pages)
+    names = [n for n in PARSERS if n != "lxml" or lxml_html is not None]
+
+    rows = []
+    for m in args.max_results:
+        ref = [parse_bs4(h, m) for h in pages]
+        for name in names:
+            fn = PARSERS[name]
+            row = {"parser": name, "max_results": m, **_measure(fn, pages, m)}
+            row["identical_to_bs4"] = [fn(h, m) for h in pages] == ref
+            rows.append(row)
+
+    avg_kib = round(sum(len(h) for h in pages) / len(pages) / 1024, 1)
+    print(json.dumps({"pages": len(pages), "avg_page_kib": avg_kib, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
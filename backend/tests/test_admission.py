@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.utils import admission
+from app.utils.admission import AsyncBulkhead, Bulkhead, Overloaded
+
+
+def test_parse_limits():
+    assert admission.parse_limits("web=4:8, /rag/index=2:4:10,bad") == {
+        "web": (4, 8, admission.QUEUE_TIMEOUT_S),
+        "/rag/index": (2, 4, 10.0),
+    }
+
+
+def test_thread_bulkhead_queues_then_sheds():
+    bh = Bulkhead("t", limit=1, queue=1, timeout_s=5)
+    bh.acquire()
+    got = []
+
+    def waiter():
+        bh.acquire()
+        got.append(bh.in_use)
+        bh.release(0.01)
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    while bh.waiting_count() < 1:
+        time.sleep(0.001)
+
+    with pytest.raises(Overloaded) as e:
+        bh.acquire()
+    assert e.value.reason == "queue_full" and e.value.retry_after_s >= 1
+
+    bh.release(0.2)
+    t.join(2)
+    assert got == [1]
+    assert bh.stats()["admitted"] == 2 and bh.rejected == {"queue_full": 1, "timeout": 0}
+
+
+def test_thread_bulkhead_wait_times_out():
+    bh = Bulkhead("t", limit=1, queue=4, timeout_s=0.05)
+    bh.acquire()
+    t0 = time.perf_counter()
+    with pytest.raises(Overloaded) as e:
+        bh.acquire()
+    assert e.value.reason == "timeout"
+    assert time.perf_counter() - t0 < 1
+    assert bh.waiting_count() == 0
+
+
+def test_async_bulkhead_hands_slot_to_oldest_waiter():
+    async def scenario():
+        bh = AsyncBulkhead("/r", limit=1, queue=1, timeout_s=5)
+        await bh.acquire()
+        second = asyncio.ensure_future(bh.acquire())
+        await asyncio.sleep(0)
+        assert bh.waiting_count() == 1
+        with pytest.raises(Overloaded):
+            await bh.acquire()
+        bh.release(0.01)
+        await second
+        assert bh.in_use == 1 and bh.waiting_count() == 0
+        bh.release(0.01)
+        assert bh.in_use == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_bulkheads_answer_429(monkeypatch):
+    monkeypatch.setitem(admission.tool_bulkheads, "calculator", Bulkhead("calculator", 0, 0))
+    monkeypatch.setitem(admission.route_bulkheads, "/health", AsyncBulkhead("/health", 0, 0))
+    client = TestClient(create_app())
+
+    r = client.post("/agent/chat", json={"message": "calculate 2*3"})
+    assert r.status_code == 429
+    assert r.headers["retry-after"] == "1"
+    assert r.json()["detail"]["bulkhead"] == "calculator"
+
+    r = client.get("/health")
+    assert r.status_code == 429 and r.json()["detail"]["reason"] == "queue_full"
+
+    text = client.get("/metrics").text
+    assert 'bulkhead_rejected_total{kind="tool",bulkhead="calculator",reason="queue_full"} 1' in text
+    assert 'http_requests_total{method="GET",route="/health",status="429"}' in text
@@ -1,5 +1,5 @@
 import pytest
-from app.tools.calculator import calculator_tool
+from app.tools.calculator import calculator_tool, evaluate_batch
 
 def test_basic_math():
     assert calculator_tool({"expression": "19*23"})["result"] == 437
@@ -10,3 +10,21 @@ def test_parentheses():
 def test_reject_invalid_chars():
     with pytest.raises(ValueError):
         calculator_tool({"expression": "2+2; import os"})
+
+def test_precedence_matches_python():
+    for expr in ["-2**2", "2**-1", "2*-3**2", "2**3**2", "10-4-3", "8/4/2", "((((1+2))))*3"]:
+        assert calculator_tool({"expression": expr})["result"] == eval(expr)
+
+def test_deep_nesting_and_blowup_guards():
+    assert calculator_tool({"expression": "(" * 3000 + "1" + ")" * 3000})["result"] == 1
+    for expr in ["9**9**9", "1" * 100, "1 2", "2//3"]:
+        with pytest.raises(ValueError):
+            calculator_tool({"expression": expr})
+
+def test_batch_vectorized_matches_scalar():
+    exprs = [f"({i}*{i % 97}+{i % 13})/{i % 7}" for i in range(500)] + ["2**10", "bad!"]
+    vec = evaluate_batch(exprs)
+    assert vec["vectorized"] > 400
+    assert vec["results"] == evaluate_batch(exprs, vectorize=False)["results"]
+    assert vec["results"][7] == {"expression": exprs[7], "error": "division by zero"}
+    assert vec["results"][-2]["result"] == 1024 and "error" in vec["results"][-1]
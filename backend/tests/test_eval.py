@@ -0,0 +1,64 @@
+import json
+
+from app.eval.datasets import generate_cases, load_cases_jsonl, write_cases_jsonl
+from app.eval.evaluator import _percentile, compare_to_baseline, run_evaluation
+from app.eval.streaming import LatencyHistogram, run_evaluation_stream, summary_path
+from app.eval.test_cases import TEST_CASES
+
+
+def test_percentile_interpolates():
+    xs = [float(i) for i in range(1, 101)]
+    assert _percentile(xs, 50) == 50.5
+    assert round(_percentile(xs, 95), 2) == 95.05
+    assert _percentile([], 99) == 0.0
+
+
+def test_repeated_parallel_eval_and_baseline_gate():
+    cases = [c for c in TEST_CASES if c["expect"]["tool"] in ("calculator", "sql")]
+    report = run_evaluation(cases=cases, concurrency=2, repeats=3)
+    assert report["runs"] == 6
+    assert report["accuracy"] == 1.0
+    assert report["latency"]["cases"]["calculator_basic"]["n"] == 3
+    assert set(report["latency"]["tools"]) == {"calculator", "sql"}
+    assert compare_to_baseline(report, report)["ok"]
+
+    slower = {**report, "latency": {**report["latency"], "tools": {
+        name: {**s, "p95": s["p95"] * 10 + 100} for name, s in report["latency"]["tools"].items()
+    }}}
+    gate = compare_to_baseline(slower, report)
+    assert not gate["ok"]
+    assert {r["kind"] for r in gate["regressions"]} == {"tool_latency"}
+
+    failed = {**report, "accuracy": 0.5, "results": [{**report["results"][0], "pass": False}] + report["results"][1:]}
+    kinds = {r["kind"] for r in compare_to_baseline(failed, report)["regressions"]}
+    assert kinds == {"accuracy", "case_failed"}
+
+
+def test_latency_histogram_quantiles_within_bucket_error():
+    h = LatencyHistogram()
+    xs = [0.5 + i * 0.37 for i in range(5000)]
+    for x in xs:
+        h.add(x)
+    for q in (50, 95, 99):
+        exact = _percentile(xs, q)
+        assert abs(h.quantile(q) - exact) / exact < 0.03
+
+
+def test_stream_eval_resumes_after_interruption(tmp_path):
+    cases_file = tmp_path / "cases.jsonl"
+    mix = {"calculator": 1, "sql": 1}
+    assert write_cases_jsonl(generate_cases(40, seed=7, mix=mix), cases_file) == 40
+    assert [c["name"] for c in load_cases_jsonl(cases_file)] == [c["name"] for c in generate_cases(40, seed=7, mix=mix)]
+
+    out = tmp_path / "soak.jsonl"
+    first = run_evaluation_stream(load_cases_jsonl(cases_file), out, concurrency=3, limit=15)
+    assert first["total"] == 15
+    with open(out, "a", encoding="utf-8") as f:
+        f.write('{"i": 15, "test": "torn')  # killed mid-write
+
+    final = run_evaluation_stream(load_cases_jsonl(cases_file), out, concurrency=3)
+    assert final["resumed_from"] == 15 and final["ran"] == 25
+    assert final["total"] == 40 and final["accuracy"] == 1.0
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [r["i"] for r in records] == list(range(40))
+    assert json.loads(summary_path(out).read_text(encoding="utf-8"))["total"] == 40
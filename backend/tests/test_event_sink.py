@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from app.tools.calculator import calculator_tool
+from app.utils import logger
+from app.utils.event_sink import EventSink
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_overflow_drops_instead_of_blocking(tmp_path):
+    sink = EventSink(path=tmp_path / "e.jsonl", max_queue=5, flush_interval_s=3600, batch_size=1000)
+    accepted = [sink.emit({"event": "x", "status": "ok", "i": i}) for i in range(8)]
+    assert accepted == [True] * 5 + [False] * 3
+    assert sink.stats()["dropped"] == 3
+    assert sink.flush() == 5
+    assert [e["i"] for e in _lines(tmp_path / "e.jsonl")] == [0, 1, 2, 3, 4]
+
+
+def test_rotation_keeps_bounded_backups(tmp_path):
+    path = tmp_path / "e.jsonl"
+    sink = EventSink(path=path, max_bytes=400, backups=2, batch_size=4, flush_interval_s=3600)
+    for i in range(60):
+        sink.emit({"event": "x", "status": "ok", "i": i, "pad": "p" * 40})
+    sink.flush()
+    assert sink.rotations > 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["e.jsonl", "e.jsonl.1", "e.jsonl.2"]
+    assert _lines(path)[-1]["i"] == 59
+
+
+def test_sampling_keeps_errors(tmp_path):
+    sink = EventSink(path=tmp_path / "e.jsonl", sample_rates={"hot": 0.0}, flush_interval_s=3600)
+    assert not sink.emit({"event": "hot", "status": "ok"})
+    assert sink.emit({"event": "hot", "status": "error"})
+    assert sink.emit({"event": "cold", "status": "ok"})
+    assert sink.stats()["sampled_out"] == 1
+
+
+def test_tool_events_carry_conversation_and_errors(tmp_path, monkeypatch):
+    sink = EventSink(path=tmp_path / "e.jsonl", flush_interval_s=3600)
+    monkeypatch.setattr(logger, "sink", sink)
+    with logger.conversation_context("conv-1"):
+        calculator_tool({"expression": "6*7"})
+        with pytest.raises(ValueError):
+            calculator_tool({"expression": "6*"})
+    sink.flush()
+    ok, err = _lines(tmp_path / "e.jsonl")
+    assert (ok["event"], ok["status"], ok["conversation_id"]) == ("tool.calculator", "ok", "conv-1")
+    assert err["status"] == "error" and err["meta"]["error"] == "ValueError"
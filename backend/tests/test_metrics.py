@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.utils import metrics
+from app.utils.logger import event_span
+
+
+def _value(text, series):
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_shards_merge_across_threads():
+    reg = metrics.Registry(enabled=True)
+    c = reg.counter("jobs_total", "Jobs.", ("kind",))
+    h = reg.histogram("job_seconds", "Job time.", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            c.inc("a")
+        h.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    c.inc("b", value=2)
+
+    text = reg.render()
+    assert "# TYPE jobs_total counter" in text
+    assert _value(text, 'jobs_total{kind="a"}') == 4000
+    assert _value(text, 'jobs_total{kind="b"}') == 2
+    assert _value(text, 'job_seconds_bucket{le="0.1"}') == 0
+    assert _value(text, 'job_seconds_bucket{le="1"}') == 4
+    assert _value(text, 'job_seconds_bucket{le="+Inf"}') == 4
+    assert _value(text, "job_seconds_count") == 4
+    # /// finished threads were folded into the retired shard, and a second scrape agrees
+    assert len(reg._shards) == 1
+    assert reg.render() == text
+
+
+def test_tool_errors_and_in_flight():
+    with pytest.raises(ZeroDivisionError):
+        with event_span("tool.metrics_test", "metrics_test"):
+            1 / 0
+    with metrics.timed("metrics_test"):
+        text = metrics.registry.render()
+        assert _value(text, 'tool_in_flight{tool="metrics_test"}') == 1
+
+    text = metrics.registry.render()
+    assert _value(text, 'tool_in_flight{tool="metrics_test"}') == 0
+    assert _value(text, 'tool_calls_total{tool="metrics_test",status="ok"}') >= 1
+    assert _value(text, 'tool_errors_total{tool="metrics_test",error="ZeroDivisionError"}') >= 1
+    assert _value(text, 'tool_latency_seconds_count{tool="metrics_test"}') >= 2
+
+
+def test_metrics_endpoint():
+    client = TestClient(create_app())
+    client.post("/tools/calculator/batch", json={"expressions": ["1+1", "1+1"]})
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    assert _value(text, 'http_requests_total{method="POST",route="/tools/calculator/batch",status="200"}') >= 1
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/tools/calculator/batch",le="+Inf"}' in text
+    assert _value(text, 'tool_calls_total{tool="calculator_batch",status="ok"}') >= 1
+    assert 'cache_hit_ratio{cache="calculator_expressions"}' in text
+    assert _value(text, "event_log_dropped_total") is not None
@@ -0,0 +1,165 @@
+import uuid
+
+import chromadb
+import pytest
+
+from app.agent.planner import make_plan
+from app.rag import metadata_index, retrieval
+from app.rag.embeddings import _hash_embed
+from app.rag.metadata_index import RagFilters, candidate_ids, record_chunks
+
+
+@pytest.fixture
+def rag_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata_index, "_META_DB", tmp_path / "meta.sqlite")
+    monkeypatch.setattr(metadata_index, "_backfilled", set())
+
+    col = chromadb.EphemeralClient().get_or_create_collection(f"test-{uuid.uuid4().hex[:8]}")
+    monkeypatch.setattr(retrieval, "get_chroma_collection", lambda name="docs": col)
+    monkeypatch.setattr(retrieval, "embed_texts", lambda texts: [_hash_embed(t) for t in texts])
+
+    ids, docs, metas = [], [], []
+    for src, pages, ts in (("resume.pdf", 3, 100), ("policy.pdf", 2, 200), ("notes.txt", 0, 300)):
+        for p in range(1, pages + 1):
+            ids.append(f"{src}#p{p}")
+            docs.append(f"{src} page {p} professional summary")
+            metas.append({"source": src, "page": p, "uploaded_at": ts})
+        if not pages:
+            ids.append(f"{src}#c0")
+            docs.append(f"{src} professional summary")
+            metas.append({"source": src, "uploaded_at": ts})
+
+    col.upsert(ids=ids, documents=docs, metadatas=metas, embeddings=[_hash_embed(d) for d in docs])
+    record_chunks(ids, metas)
+    return col
+
+
+def test_candidate_ids_by_source_page_and_time(rag_env):
+    assert sorted(candidate_ids(RagFilters(sources=["resume.pdf"], page_min=2))) == ["resume.pdf#p2", "resume.pdf#p3"]
+    assert candidate_ids(RagFilters(uploaded_after=250)) == ["notes.txt#c0"]
+    assert candidate_ids(RagFilters(sources=["missing.pdf"])) == []
+
+
+def test_retrieve_only_returns_filtered_slice(rag_env):
+    out = retrieval.retrieve("professional summary", top_k=4, filters={"source": "policy.pdf"})
+    assert out["candidates"] == 2
+    assert {p["source"] for p in out["passages"]} == {"policy.pdf"}
+
+    out = retrieval.retrieve("professional summary", top_k=10)
+    assert out["candidates"] is None
+    assert len(out["passages"]) == 6
+
+
+def test_has_filters_ignores_unset_keys():
+    unset = dict.fromkeys(("source", "sources", "page_min", "page_max", "uploaded_after", "uploaded_before"))
+    assert retrieval.has_filters(unset) is False
+    assert retrieval.has_filters({**unset, "sources": []}) is False
+    assert retrieval.has_filters({**unset, "page_min": 2}) is True
+
+
+def test_planner_passes_doc_filters_to_rag():
+    plan = make_plan("According to resume.pdf page 2, what is my summary?")
+    rag_call = [c for c in plan["calls"] if c["tool"] == "rag"][0]
+    assert rag_call["input"]["filters"] == {"sources": ["resume.pdf"], "page_min": 2, "page_max": 2}
+
+
+def test_retrieve_batch_coalesces_duplicates(rag_env):
+    out = retrieval.retrieve_batch([
+        {"query": "professional summary", "top_k": 2},
+        {"query": "policy page", "top_k": 1},
+        {"query": "professional summary", "top_k": 3},
+    ])
+    assert out["unique_queries"] == 2
+    assert len(out["results"]["professional summary"]) == 3
+    assert len(out["results"]["policy page"]) == 1
+
+    single = retrieval.retrieve("policy page", top_k=1)["passages"]
+    assert out["results"]["policy page"][0]["chunk_id"] == single[0]["chunk_id"]
+
+
+def test_lazy_retrieve_then_hydrate_top_passages(rag_env):
+    out = retrieval.retrieve("professional summary", top_k=5, lazy=True)
+    assert out["doc_bytes"] == 0
+    assert all(p["text"] is None and p["text_preview"] is None for p in out["passages"])
+
+    fetched = retrieval.hydrate_passages(out["passages"][:2])
+    assert fetched > 0
+    assert all(p["text_preview"] for p in out["passages"][:2])
+    assert all(p["text"] is None for p in out["passages"][:2])
+    assert out["passages"][2]["text_preview"] is None
+
+
+def test_multi_collection_fan_out_merges_by_distance(monkeypatch):
+    client = chromadb.EphemeralClient()
+    cols = {}
+    for name, docs in (("tenant-a", ["alpha policy", "alpha resume"]), ("tenant-b", ["beta policy", "policy policy"])):
+        col = client.get_or_create_collection(f"{name}-{uuid.uuid4().hex[:6]}")
+        col.upsert(
+            ids=[f"{name}#{i}" for i in range(len(docs))],
+            documents=docs,
+            metadatas=[{"source": name} for _ in docs],
+            embeddings=[_hash_embed(d) for d in docs],
+        )
+        cols[name] = col
+    monkeypatch.setattr(retrieval, "get_chroma_collection", lambda name="docs": cols[name])
+    monkeypatch.setattr(retrieval, "embed_texts", lambda texts: [_hash_embed(t) for t in texts])
+
+    out = retrieval.retrieve("policy", top_k=3, collections=["tenant-a", "tenant-b"])
+    dists = [p["distance"] for p in out["passages"]]
+    assert dists == sorted(dists) and len(dists) == 3
+    assert {s["collection"] for s in out["shards"]} == {"tenant-a", "tenant-b"}
+    assert all(s["elapsed_ms"] >= 0 for s in out["shards"])
+
+    retrieval.hydrate_passages(out["passages"])
+    assert all(p["text_preview"] for p in out["passages"])
+
+
+def test_unknown_collection_is_404_not_created(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.main import create_app
+    from app.rag import store
+
+    client = chromadb.EphemeralClient()
+    monkeypatch.setattr(store, "_client", client)
+    monkeypatch.setattr(store, "_collections", {})
+    api = TestClient(create_app())
+
+    r = api.post("/rag/query", json={"query": "policy", "collections": ["typo-tenant"]})
+    assert r.status_code == 404 and "typo-tenant" in r.json()["detail"]
+    assert api.post("/agent/chat", json={"message": "hi", "collections": ["typo-tenant"]}).status_code == 404
+    assert "typo-tenant" not in [c.name for c in client.list_collections()]
+
+    store.get_chroma_collection("typo-tenant", create=True)
+    assert api.post("/rag/query", json={"query": "policy", "collections": ["typo-tenant"]}).status_code == 200
+
+
+def test_follow_up_served_from_working_set(rag_env, monkeypatch):
+    from app.agent import runner, working_set
+
+    monkeypatch.setattr(runner, "embed_texts", lambda texts: [_hash_embed(t) for t in texts])
+    working_set.clear()
+
+    first = runner._run_rag("resume.pdf page 2 professional summary", top_k=3, conversation_id="c1")
+    assert first["working_set"]["hit"] is False
+    assert all("embedding" not in p for p in first["passages"])
+
+    from app.utils import metrics
+
+    def rag_calls():
+        for line in metrics.registry.render().splitlines():
+            if line.startswith('tool_calls_total{tool="rag",status="ok"} '):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    before = rag_calls()
+    again = runner._run_rag("resume.pdf page 2 professional summary", top_k=3, conversation_id="c1")
+    assert again["working_set"]["hit"] is True
+    assert rag_calls() == before + 1  # working-set hits are still counted as RAG calls
+    assert again["shards"] == []
+    assert [p["chunk_id"] for p in again["passages"]] == [p["chunk_id"] for p in first["passages"]]
+    assert again["passages"][0]["text_preview"]
+
+    # unrelated conversation never sees c1's working set
+    other = runner._run_rag("resume.pdf page 2 professional summary", top_k=3, conversation_id="c2")
+    assert other["working_set"]["hit"] is False
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import time
+
+import chromadb
+import pytest
+
+from app import serve
+from app.rag import embeddings, store
+from app.tools import sqlite_pool
+from app.tools.sql_cache import result_cache
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+@pytest.mark.parametrize("persistent", [False, True])
+def test_fork_drops_per_process_handles(tmp_path, monkeypatch, persistent):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma")) if persistent else chromadb.EphemeralClient()
+    monkeypatch.setattr(store, "_client", client)
+    monkeypatch.setattr(store, "_collections", {})
+    monkeypatch.setattr(sqlite_pool, "_pools", {})
+    monkeypatch.setattr(result_cache, "_watchers", {})
+    db = tmp_path / "t.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    sqlite_pool.get_pool(db)
+    result_cache._watcher(db)
+    store.get_chroma_collection("fork_test", create=True)
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            state = {
+                "pools": len(sqlite_pool._pools),
+                "watchers": len(result_cache._watchers),
+                # /// in-memory clients are kept (shared copy-on-write), persistent ones reopened
+                "chroma_kept": store._client is not None,
+                "collections": len(store._collections),
+            }
+            os.write(w, json.dumps(state).encode())
+        finally:
+            os._exit(0)
+    os.close(w)
+    with os.fdopen(r) as f:
+        state = json.loads(f.read())
+    os.waitpid(pid, 0)
+
+    assert state == {
+        "pools": 0,
+        "watchers": 0,
+        "chroma_kept": not persistent,
+        "collections": 0 if persistent else 1,
+    }
+    assert str(db.resolve()) in sqlite_pool._pools
+
+
+def test_preload_reports_backend():
+    info = embeddings.preload()
+    assert info["backend"] in {"hash", "hf", "hash (hf unavailable)"}
+    assert info["load_s"] >= 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_workers_failing_at_startup_are_not_fork_looped(monkeypatch):
+    monkeypatch.setattr(serve.traceback, "print_exc", lambda: None)
+    args = argparse.Namespace(
+        app="app.does_not_exist:app", factory=False, host="127.0.0.1", port=0, workers=1,
+        preload=False, keep_alive=5, log_level="warning", min_uptime=5.0, max_fast_restarts=3,
+    )
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        t0 = time.monotonic()
+        assert serve.serve(args) == 1
+    finally:
+        for sig, h in handlers.items():
+            signal.signal(sig, h)
+    # /// backed off 0.5s then 1s between the three attempts
+    assert 1.4 < time.monotonic() - t0 < 10
@@ -0,0 +1,252 @@
+import sqlite3
+
+import pytest
+
+from app.agent.runner import _deterministic_sql_from_question
+from app.tools.sql_tool import SQLTool
+from app.tools.sqlite_pool import get_pool
+from benchmarks.fixtures import build_sample_db
+
+
+@pytest.fixture
+def sample_db(tmp_path):
+    return build_sample_db(tmp_path / "sample.sqlite", customers=20, orders=300, tickets=50)
+
+
+def test_template_query_through_pool(sample_db):
+    tool = SQLTool(db_path=sample_db)
+    out = tool.run({"sql": _deterministic_sql_from_question("Show top 3 customers by total orders")})
+    assert out["row_count"] == 3
+    assert out["columns"] == ["id", "name", "total_orders"]
+
+
+def test_pool_connections_are_read_only(sample_db):
+    with get_pool(sample_db).connection() as conn:
+        # /// denied by the pool's authorizer (not authorized) before mode=ro / query_only even apply
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute("DELETE FROM orders")
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute("PRAGMA query_only = OFF")
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+
+
+def test_rejects_non_select(sample_db):
+    with pytest.raises(ValueError):
+        SQLTool(db_path=sample_db).run({"sql": "DELETE FROM orders"})
+
+
+def test_result_cache_hits_until_db_changes(sample_db):
+    tool = SQLTool(db_path=sample_db)
+    sql = _deterministic_sql_from_question("Top 3 customers by total spent")
+
+    first = tool.run({"sql": sql})
+    second = tool.run({"sql": "  " + sql.replace("\n", "   ")})
+    assert first["cache"]["hit"] is False
+    assert second["cache"]["hit"] is True
+    assert second["rows"] == first["rows"]
+
+    conn = sqlite3.connect(str(sample_db))
+    conn.execute("UPDATE orders SET total_amount = total_amount + 100000 WHERE customer_id = 1")
+    conn.commit()
+    conn.close()
+
+    third = tool.run({"sql": sql})
+    assert third["cache"]["hit"] is False
+    assert third["rows"][0]["id"] == 1
+
+
+def test_offset_and_keyset_pages_cover_all_rows(sample_db):
+    tool = SQLTool(db_path=sample_db)
+    for keyset in (None, "id"):
+        seen, token = [], None
+        while True:
+            page = tool.page("SELECT id, total_amount FROM orders", page_size=70, page_token=token, keyset=keyset)
+            assert page["columns"] == ["id", "total_amount"]
+            seen.extend(r[0] for r in page["rows"])
+            token = page["next_page_token"]
+            if token is None:
+                break
+        assert sorted(seen) == list(range(1, 301))
+
+    other_token = tool.page("SELECT id FROM orders", page_size=1)["next_page_token"]
+    with pytest.raises(ValueError):
+        tool.page("SELECT id FROM customers", page_token=other_token)
+
+
+def test_stream_ndjson(sample_db):
+    import json
+
+    chunks = SQLTool(db_path=sample_db).stream_ndjson("SELECT id, status FROM tickets")
+    lines = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert lines[0] == {"columns": ["id", "status"]}
+    assert len(lines) == 52
+    assert lines[-1]["row_count"] == 50
+
+
+def test_streams_are_admitted_and_release_on_close(sample_db, monkeypatch):
+    from app.utils import admission
+    from app.utils.admission import Bulkhead, Overloaded
+
+    bh = Bulkhead("sql_stream", limit=1, queue=0)
+    monkeypatch.setitem(admission.tool_bulkheads, "sql_stream", bh)
+    tool = SQLTool(db_path=sample_db)
+
+    first = tool.stream_ndjson("SELECT id FROM tickets")
+    assert bh.in_use == 1
+    with pytest.raises(Overloaded):
+        tool.stream_ndjson("SELECT id FROM tickets")
+
+    first.close()  # client went away mid-stream
+    assert bh.in_use == 0
+    assert list(tool.stream_ndjson("SELECT id FROM tickets"))[-1].startswith('{"row_count": 50')
+    assert bh.in_use == 0
+
+
+def test_stream_bulkhead_is_capped_below_pool_size():
+    from app.tools.sqlite_pool import POOL_SIZE
+    from app.utils.admission import tool_bulkheads
+
+    assert tool_bulkheads["sql_stream"].limit < max(POOL_SIZE, 2)
+
+
+def test_guard_rejects_cross_join_plan(sample_db, monkeypatch):
+    from app.tools import sql_guard
+
+    monkeypatch.setattr(sql_guard.DEFAULT_LIMITS, "max_scan_rows", 10_000)
+    with pytest.raises(sql_guard.SQLGuardError) as exc:
+        SQLTool(db_path=sample_db).run({"sql": "SELECT a.id FROM orders a, orders b", "use_cache": False})
+    assert exc.value.code == "plan_rejected"
+    assert exc.value.detail["estimated_rows"] == 300 * 300
+
+
+def test_plan_verdicts_are_cached(sample_db):
+    from app.tools import sql_guard
+
+    sql_guard.plan_cache.clear()
+    tool = SQLTool(db_path=sample_db)
+    sql = "SELECT id, total_amount FROM orders WHERE id = 7"
+    for _ in range(5):
+        tool.run({"sql": sql, "use_cache": False})
+    assert sql_guard.plan_cache.misses == 1 and sql_guard.plan_cache.hits == 4
+
+
+
+def test_guard_aborts_runaway_query(sample_db, monkeypatch):
+    from app.tools import sql_guard
+
+    monkeypatch.setattr(sql_guard.DEFAULT_LIMITS, "max_scan_rows", 10**12)
+    monkeypatch.setattr(sql_guard.DEFAULT_LIMITS, "max_vm_steps", 100_000)
+    with pytest.raises(sql_guard.SQLGuardError) as exc:
+        SQLTool(db_path=sample_db).run(
+            {"sql": "SELECT COUNT(*) FROM orders a, orders b, orders c", "use_cache": False}
+        )
+    assert exc.value.code == "budget_exceeded"
+    # the connection went back to the pool without the guard hooks
+    assert SQLTool(db_path=sample_db).run({"sql": "SELECT COUNT(*) AS n FROM orders"})["rows"][0]["n"] == 300
+
+
+def test_templates_read_materialized_aggregates(sample_db):
+    from app.tools import sql_aggregates
+
+    tool = SQLTool(db_path=sample_db)
+    sqls = [
+        _deterministic_sql_from_question(q)
+        for q in ("Show top 8 customers by total orders", "Top 20 customers by total spent", "tickets by status")
+    ]
+
+    sql_aggregates.install(sample_db)
+    # writes after install are folded in by the triggers
+    conn = sqlite3.connect(str(sample_db))
+    conn.execute("INSERT INTO orders (customer_id, total_amount, created_at) VALUES (7, 99999, '2025-01-01')")
+    conn.execute("UPDATE tickets SET status = 'closed' WHERE id <= 10")
+    conn.execute("DELETE FROM orders WHERE id <= 20")
+    # /// many +/- cycles on fractional amounts: an incrementally adjusted REAL would drift
+    for i in range(200):
+        conn.execute("UPDATE orders SET total_amount = total_amount + 0.1 WHERE id = ?", (21 + i % 50,))
+        conn.execute("UPDATE orders SET customer_id = ? WHERE id = ?", (1 + i % 20, 100 + i % 30))
+    conn.commit()
+    conn.close()
+
+    fast = [tool.run({"sql": sql, "use_cache": False}) for sql in sqls]
+    sql_aggregates.uninstall(sample_db)
+    raw = [tool.run({"sql": sql, "use_cache": False}) for sql in sqls]
+
+    for f, r in zip(fast, raw):
+        assert f["materialized"]["table"].startswith("agg_")
+        assert "materialized" not in r
+        assert f["columns"] == r["columns"]
+        # /// exact: same values (no float drift) and same order for ties
+        assert f["rows"] == r["rows"]
+
+
+def test_ticket_aggregates_count_null_statuses(sample_db):
+    from app.tools import sql_aggregates
+
+    conn = sqlite3.connect(str(sample_db))
+    # /// the fixture's status is NOT NULL; rebuild tickets with a nullable one
+    conn.executescript(
+        """
+        ALTER TABLE tickets RENAME TO tickets_old;
+        CREATE TABLE tickets (id INTEGER PRIMARY KEY, customer_id INTEGER, status TEXT, subject TEXT);
+        INSERT INTO tickets SELECT * FROM tickets_old;
+        DROP TABLE tickets_old;
+        UPDATE tickets SET status = NULL WHERE id <= 5;
+        """
+    )
+    conn.close()
+    sql_aggregates.install(sample_db)
+
+    conn = sqlite3.connect(str(sample_db))
+    conn.execute("INSERT INTO tickets (customer_id, status) VALUES (1, NULL), (2, NULL), (3, 'open')")
+    conn.execute("UPDATE tickets SET status = NULL WHERE id BETWEEN 6 AND 8")
+    conn.execute("UPDATE tickets SET status = 'closed' WHERE id IN (1, 2)")
+    conn.execute("UPDATE tickets SET status = NULL WHERE id = 3")
+    conn.execute("DELETE FROM tickets WHERE id = 4")
+    conn.commit()
+    by_trigger = conn.execute("SELECT status, total FROM agg_ticket_status ORDER BY status").fetchall()
+    null_by_trigger = conn.execute("SELECT total FROM agg_ticket_null").fetchone()[0]
+    sql_aggregates.refresh(conn)
+    # /// no duplicate (NULL, n) rows, and the rebuild agrees with what the triggers kept
+    assert conn.execute("SELECT COUNT(*) FROM agg_ticket_status WHERE status IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT status, total FROM agg_ticket_status ORDER BY status").fetchall() == by_trigger
+    assert conn.execute("SELECT total FROM agg_ticket_null").fetchone()[0] == null_by_trigger == 7
+    conn.close()
+
+    tool = SQLTool(db_path=sample_db)
+    sql = _deterministic_sql_from_question("tickets by status")
+    fast = tool.run({"sql": sql, "use_cache": False})
+    sql_aggregates.uninstall(sample_db)
+    raw = tool.run({"sql": sql, "use_cache": False})
+    assert fast["materialized"]["table"] == "agg_ticket_status"
+    assert {"status": None, "total": 7} in raw["rows"]
+    assert fast["rows"] == raw["rows"]
+
+
+def test_catalog_caches_schema_and_advises_missing_index(tmp_path):
+    from app.tools.sql_catalog import get_catalog
+
+    db = build_sample_db(tmp_path / "big.sqlite", customers=500, orders=5000, tickets=10)
+    tool = SQLTool(db_path=db)
+    catalog = get_catalog(db)
+
+    snap = catalog.snapshot()
+    orders = [t for t in snap["tables"] if t["name"] == "orders"][0]
+    assert orders["row_estimate"] == 5000
+    catalog.snapshot()
+    assert catalog.reloads == 1
+
+    for n in (3, 5):
+        tool.run({"sql": _deterministic_sql_from_question(f"top {n} customers by total orders"), "use_cache": False})
+    tool.run({"sql": "SELECT id FROM orders WHERE customer_id = 7", "use_cache": False})
+
+    advice = catalog.advice()
+    assert len([s for s in advice["query_shapes"] if "COUNT(o.id)" in s["shape"]]) == 1
+    recs = {(r["table"], r["columns"][0]) for r in advice["recommendations"]}
+    assert ("orders", "customer_id") in recs
+
+    conn = sqlite3.connect(str(db))
+    conn.execute("CREATE INDEX idx_orders_customer_id ON orders (customer_id)")
+    conn.commit()
+    conn.close()
+    assert ("orders", "customer_id") not in {(r["table"], r["columns"][0]) for r in catalog.advice()["recommendations"]}
+    assert catalog.reloads == 2
@@ -0,0 +1,90 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.utils import tracing
+from app.utils.logger import event_span
+from app.utils.tracing import propagate, span
+
+
+def _names(node):
+    return [node["name"]] + [n for c in node.get("children", []) for n in _names(c)]
+
+
+def test_spans_nest_and_are_noops_without_a_trace():
+    with span("orphan") as s:
+        s.set(ignored=True)  # no active trace: dummy span
+
+    with tracing.trace("root") as root:
+        with span("outer", a=1) as outer:
+            with span("inner"):
+                pass
+            outer.set(b=2)
+        with pytest.raises(KeyError):
+            with event_span("tool.lookup", "lookup"):
+                {}["missing"]
+
+    tree = root.to_dict()
+    assert _names(tree) == ["root", "outer", "inner", "tool.lookup"]
+    outer = tree["children"][0]
+    assert outer["attrs"] == {"a": 1, "b": 2}
+    assert outer["children"][0]["start_us"] >= outer["start_us"]
+    assert outer["duration_us"] >= outer["children"][0]["duration_us"]
+    assert tree["children"][1]["attrs"]["error"] == "KeyError"
+    assert not tracing.active()
+
+
+def test_trace_follows_work_into_pool_threads():
+    with ThreadPoolExecutor(max_workers=2) as pool, tracing.trace("root") as root:
+
+        def work(i):
+            with span("shard", i=i):
+                pass
+
+        for f in [pool.submit(propagate(work), i) for i in range(2)]:
+            f.result()
+
+    chrome = root.to_chrome()["traceEvents"]
+    assert [e["name"] for e in chrome] == ["root", "shard", "shard"]
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in chrome)
+
+
+def test_agent_chat_trace_and_profile_headers(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(tracing, "PROFILE_DIR", tmp_path)
+    client = TestClient(create_app())
+
+    plain = client.post("/agent/chat", json={"message": "calculate 2*3"}).json()
+    assert "spans" not in plain and "profile" not in plain
+    # /// trace entries keep the integer elapsed_ms; sub-ms timing lives in the spans
+    assert isinstance(plain["trace"][0]["elapsed_ms"], int)
+
+    data = client.post(
+        "/agent/chat", json={"message": "calculate 2*3"}, headers={"X-Trace": "1", "X-Profile": "1"}
+    ).json()
+    names = _names(data["spans"])
+    assert names[:2] == ["agent.chat", "agent.run"]
+    assert "tool.calculator" in names
+    assert data["profile"]["top"] and data["profile"]["total_calls"] > 0
+    assert (tmp_path / f"{data['trace_id']}.prof").exists()
+
+
+def test_profile_header_rejected_unless_enabled(monkeypatch):
+    monkeypatch.setattr(tracing, "PROFILE_ENABLED", False)
+    client = TestClient(create_app())
+    r = client.post("/agent/chat", json={"message": "calculate 2*3"}, headers={"X-Profile": "1"})
+    assert r.status_code == 403
+
+
+def test_profile_dir_keeps_newest_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(tracing, "PROFILE_KEEP", 3)
+    for i in range(5):
+        with tracing.profile(f"p{i}"):
+            pass
+        # /// distinct mtimes even on coarse-grained filesystems
+        os.utime(tmp_path / f"p{i}.prof", ns=(i * 10**9, i * 10**9))
+    assert sorted(p.name for p in tmp_path.glob("*.prof")) == ["p2.prof", "p3.prof", "p4.prof"]
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.tools import web_tool
+from app.tools.web_cache import WebCacheIndex
+from app.tools.web_http import CircuitBreaker, LiveSearchClient, LiveSearchError, SearchProvider
+from app.tools.web_parse import get_parser, lxml_html, parse_bs4, parse_lxml, parse_stream
+from app.tools.web_store import WebResultStore
+from app.tools.web_tool import WebTool, _parse_ddg_html
+from benchmarks.fixtures import ddg_result_pages, start_mock_search_server
+
+
+def _item(title):
+    return {"title": title, "url": f"https://example.com/{title}", "snippet": title}
+
+
+def test_cached_mode_uses_bundled_cache():
+    out = WebTool().run({"query": "Latest news about OpenAI", "mode": "cached"})
+    assert out["mode"] == "cached"
+    assert out["count"] == 2
+
+
+def test_index_exact_ranked_fuzzy_and_hot_reload(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text(json.dumps({
+        "python news": [_item("generic")],
+        "python asyncio release news": [_item("asyncio")],
+    }))
+    idx = WebCacheIndex(path)
+
+    assert idx.lookup("  Python   NEWS ")[0] == "python news"
+    # old code returned the first containing key; ranking prefers the closer key
+    assert idx.lookup("latest python asyncio release news today")[0] == "python asyncio release news"
+    assert idx.lookup("rust borrow checker") == (None, [])
+
+    path.write_text(json.dumps({"rust borrow checker": [_item("rust")]}))
+    os.utime(path, ns=(1, 1))
+    assert idx.lookup("rust borrow checker")[1][0]["title"] == "rust"
+    assert idx.reloads == 2
+
+
+@pytest.fixture
+def mock_search(monkeypatch):
+    server, base, hits = start_mock_search_server(slow_s=1.0)
+    monkeypatch.setattr(web_tool, "_live_client", web_tool.make_live_client([f"{base}/ok/"]))
+    yield base, hits
+    server.shutdown()
+
+
+def test_live_results_written_through_and_served_stale(tmp_path, mock_search):
+    _base, hits = mock_search
+    store = WebResultStore(tmp_path / "live.sqlite")
+    tool = WebTool(live_store=store)
+
+    first = tool.run({"query": "Vector DB news", "mode": "live", "max_results": 2})
+    again = tool.run({"query": "vector db   NEWS", "mode": "live", "max_results": 2})
+    assert (first["cache"]["state"], again["cache"]["state"]) == ("miss", "fresh")
+    assert again["results"] == first["results"] and first["count"] == 2
+    assert hits == ["/ok/?Vector DB news"]
+
+    # persisted: a new store on the same file still has it
+    assert WebResultStore(tmp_path / "live.sqlite").get("vector db news") is not None
+
+    # expired but inside the stale window: served immediately, refreshed in the background
+    entry = store.get("vector db news")
+    store.put("vector db news", entry.items, entry.fetch_limit, ttl_s=-1)
+    stale = tool.run({"query": "vector db news", "mode": "live", "max_results": 2})
+    assert stale["cache"]["state"] == "stale"
+    store._refresher.shutdown(wait=True)
+    assert len(hits) == 2
+    assert store.get("vector db news").state(time.time()) == "fresh"
+
+
+def test_live_store_lru_eviction(tmp_path):
+    store = WebResultStore(tmp_path / "live.sqlite", max_entries=2)
+    item = [{"title": "t", "url": "https://example.com", "snippet": "s"}]
+    store.put("a", item, 5, now=1)
+    store.put("b", item, 5, now=2)
+    store.get("a", now=3)
+    store.put("c", item, 5, now=4)
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def _client(base, paths, **kw):
+    providers = [SearchProvider(p.strip("/"), f"{base}{p}", CircuitBreaker(failures=2, cooldown_s=60)) for p in paths]
+    return LiveSearchClient(providers, parse=_parse_ddg_html, **kw)
+
+
+def test_first_good_provider_wins_over_slow_and_failing(mock_search):
+    base, _hits = mock_search
+    client = _client(base, ["/slow/", "/fail/", "/ok/"])
+    t0 = time.perf_counter()
+    out = client.search("vector db", 3)
+    assert out["provider"] == "ok" and len(out["results"]) == 3
+    assert time.perf_counter() - t0 < 0.9  # did not wait for /slow/
+    status = {a["provider"]: a["status"] for a in out["attempts"]}
+    assert status["fail"] in ("error", "abandoned")  # may lose the race to /ok/ either way
+
+
+def test_breaker_opens_and_failures_are_negatively_cached(mock_search):
+    base, hits = mock_search
+    client = _client(base, ["/fail/"])
+
+    assert client.search("q1", 3)["results"] == []
+    assert client.search("q1", 3).get("negative_cache") is True
+    client.search("q2", 3)
+    assert client.breaker_states()["fail"]["state"] == "open"
+
+    before = len(hits)
+    out = client.search("q3", 3)
+    assert out["attempts"] == [{"provider": "fail", "status": "circuit_open"}]
+    assert len(hits) == before  # failed fast, no request sent
+
+
+def test_negative_cache_is_bounded_and_live_failures_raise(mock_search, tmp_path, monkeypatch):
+    base, _hits = mock_search
+    client = _client(base, ["/fail/"], negative_max=3)
+    client.providers[0].breaker = CircuitBreaker(failures=100, cooldown_s=60)
+    for i in range(10):
+        assert client.search(f"q{i}", 3)["failed"] is True
+    assert list(client._negative) == ["q7", "q8", "q9"]
+
+    client.negative_ttl_s = 0.05
+    client._negative.clear()
+    client.search("a", 3)
+    client.search("b", 3)
+    time.sleep(0.1)
+    client.search("c", 3)  # expired keys are pruned on insert, not only when looked up again
+    assert list(client._negative) == ["c"]
+
+    monkeypatch.setattr(web_tool, "_live_client", _client(base, ["/fail/"]))
+    with pytest.raises(LiveSearchError):
+        WebTool(live_store=WebResultStore(tmp_path / "live.sqlite")).run({"query": "x", "mode": "live"})
+
+
+def test_saturated_host_waits_briefly_and_busy_is_not_failure(mock_search):
+    base, _hits = mock_search
+    client = _client(base, ["/ok/"], per_host_limit=2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outs = list(pool.map(lambda i: client.search(f"burst {i}", 3), range(8)))
+    # /// more queries than slots: the extra ones wait for a free slot instead of being turned away
+    assert all(o["provider"] == "ok" for o in outs)
+    assert client.stats["host_busy"] == 0
+
+    client = _client(base, ["/slow/"], per_host_limit=1, host_wait_s=0.1)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        outs = list(pool.map(lambda i: client.search(f"slow {i}", 3), range(3)))
+    busy = [o for o in outs if o["attempts"] == [{"provider": "slow", "status": "host_busy"}]]
+    assert len(busy) == 2 and sum(o["provider"] == "slow" for o in outs) == 1
+    assert not any(o["failed"] for o in outs)
+    assert not client._negative
+
+
+_ODD_MARKUP = [
+    '<div class="result"><a class="result__a" href="https://a">A<p>unclosed</div><div class="result"><a class="result__a" href="https://b">B</a></div>',
+    '<div class="result outer"><a class="result__a" href="https://o">Outer</a>'
+    '<div class="result"><a class="result__a" href="https://i">Inner</a><span class="result__snippet">S<rt>x</rt></span></div></div>',
+    '<div class="result"><a class="result__a zz" class="result__a" href="ftp://x" href="https://dup">D <![CDATA[cd]]> <!--c--> e</a></div>',
+    '<div class="result"><a class="result__a" href="https://t"/>tail<a class="result__a" href="https://u">U</a></div>',
+    '<div class="result"><a class="result__a" href="https://noend">never closed',
+]
+
+
+@pytest.mark.parametrize("max_results", [1, 5, 30])
+def test_parsers_match_bs4_on_saved_pages(max_results):
+    parsers = [parse_stream] + ([parse_lxml] if lxml_html is not None else [])
+    for html in ddg_result_pages(pages=10):
+        ref = parse_bs4(html, max_results)
+        for parse in parsers:
+            assert parse(html, max_results) == ref
+
+
+def test_default_parser_matches_bs4_on_odd_markup():
+    # /// auto never resolves to lxml: libxml2 rebuilds this markup differently
+    assert get_parser("auto") is parse_stream
+    for html in _ODD_MARKUP:
+        assert parse_stream(html, 10) == parse_bs4(html, 10)